@@ -0,0 +1,302 @@
+# analitica.py
+# Motor analítico en memoria sobre el snapshot de data/ (el mismo de tables.py).
+#
+# Las tablas se codifican una vez por snapshot como arrays de NumPy con la
+# posición de cada fila en su dimensión (-1 si la cadena de joins se rompe), y
+# cada agregado es un np.bincount sobre esos códigos: ventas por género,
+# plataforma, publisher y año, juegos por plataforma y años con más
+# lanzamientos, sin ir a la base de datos. Los resultados reproducen los de las
+# consultas SQL de routes.py y visualizations.py (mismas columnas, NULL y
+# orden; las sumas se redondean a los 2 decimales de num_sales, como el SUM
+# de DECIMAL de MySQL).
+#
+# Cada endpoint elige su backend: ANALITICA_BACKEND (sql por defecto) para todos
+# y ANALITICA_BACKENDS="/games/platform-count=memory,..." para alguno en
+# concreto; también se cambia en caliente con POST /analitica (requiere
+# ADMIN_TOKEN). Con memory los datos son los de la última exportación a data/,
+# no los de la base: las escrituras de /games no se ven hasta la siguiente
+# exportación.
+#
+#   python analitica.py comparar   # los dos backends deben dar lo mismo (sale con 1 si no)
+import os
+import sys
+import math
+import weakref
+import argparse
+import threading
+
+from database import en_hilo
+from metricas import span
+from tables import gestor_snapshot
+
+BACKENDS = ("sql", "memory")
+ANALITICA_BACKEND = os.getenv('ANALITICA_BACKEND', 'sql')
+ANALITICA_BACKENDS = os.getenv('ANALITICA_BACKENDS', '')
+
+
+class MotorAnalitico:
+    """Dimensiones codificadas de un snapshot y los agregados calculados sobre ellas."""
+
+    def __init__(self, data):
+        import numpy as np
+        from indice_ventas import DIMENSIONES, _posiciones, _tomar
+
+        rs = data['region_sales']
+        gpl = data['game_platform']
+        gp = data['game_publisher']
+        game = data['game']
+
+        # Grano game_platform (conteos de lanzamientos)
+        gpl_gp = _posiciones(gp['id'], gpl['game_publisher_id'])
+        gpl_game = _tomar(_posiciones(game['id'], gp['game_id']), gpl_gp)
+        anios = gpl['release_year'].to_numpy(dtype=float, na_value=np.nan)
+        self.anios = np.unique(anios[~np.isnan(anios)])
+        gpl_anio = np.where(np.isnan(anios), -1, np.searchsorted(self.anios, anios))
+        self.lanzamientos = {
+            'platform': _posiciones(data['platform']['id'], gpl['platform_id']),
+            'year': gpl_anio,
+            'game': gpl_game,
+        }
+
+        # Grano region_sales (ventas)
+        rs_gpl = _posiciones(gpl['id'], rs['game_platform_id'])
+        rs_gp = _tomar(gpl_gp, rs_gpl)
+        rs_game = _tomar(gpl_game, rs_gpl)
+        self.ventas = rs['num_sales'].to_numpy(dtype=float, na_value=np.nan)
+        self.hechos = {
+            'game_platform': rs_gpl,
+            'platform': _tomar(self.lanzamientos['platform'], rs_gpl),
+            'publisher': _tomar(_posiciones(data['publisher']['id'], gp['publisher_id']), rs_gp),
+            'genre': _tomar(_posiciones(data['genre']['id'], game['genre_id']), rs_game),
+            'year': _tomar(gpl_anio, rs_gpl),
+        }
+        self.etiquetas = {dim: data[tabla][col].to_numpy() for dim, (tabla, col) in DIMENSIONES.items()
+                          if dim in ('genre', 'platform', 'publisher')}
+        self._resultados = {}
+        self._lock = threading.Lock()
+
+    def _sumas(self, codigos, validos, n):
+        """(filas, suma de ventas, ventas no nulas) por código, para los códigos >= 0 de `validos`."""
+        import numpy as np
+        codigos, ventas = codigos[validos], self.ventas[validos]
+        nulas = np.isnan(ventas)
+        filas = np.bincount(codigos, minlength=n)
+        sumas = np.bincount(codigos, weights=np.where(nulas, 0.0, ventas), minlength=n)
+        no_nulas = np.bincount(codigos[~nulas], minlength=n)
+        return filas, sumas, no_nulas
+
+    def ventas_por(self, dim, columnas):
+        """SUM(num_sales) por nombre de la dimensión, de mayor a menor."""
+        import numpy as np
+        codigos = self.hechos[dim]
+        etiquetas = self.etiquetas[dim]
+        filas, sumas, no_nulas = self._sumas(codigos, codigos >= 0, len(etiquetas))
+        # GROUP BY nombre: filas con el mismo nombre se suman en un grupo
+        grupos = {}
+        for i in np.flatnonzero(filas):
+            suma, n = grupos.get(etiquetas[i], (0.0, 0))
+            grupos[etiquetas[i]] = (suma + sumas[i], n + no_nulas[i])
+        resultado = [(str(nombre), round(float(suma), 2) if n else None) for nombre, (suma, n) in grupos.items()]
+        resultado.sort(key=lambda f: (f[1] is None, -(f[1] or 0.0)))
+        return columnas, resultado
+
+    def ventas_por_anio(self):
+        """SUM(num_sales) por release_year, NULL incluido (primero, como en ORDER BY release_year)."""
+        import numpy as np
+        anios = self.hechos['year']
+        # Código len(anios) = año NULL de un game_platform que sí existe
+        codigos = np.where(anios >= 0, anios, len(self.anios))
+        filas, sumas, no_nulas = self._sumas(codigos, self.hechos['game_platform'] >= 0, len(self.anios) + 1)
+        resultado = [(None if i == len(self.anios) else int(self.anios[i]), round(float(sumas[i]), 2) if no_nulas[i] else None)
+                     for i in np.flatnonzero(filas)]
+        resultado.sort(key=lambda f: (f[0] is not None, f[0] or 0))
+        return ("release_year", "num_sales"), resultado
+
+    def juegos_por_plataforma(self):
+        """COUNT(*) de game_platform por nombre de plataforma, de mayor a menor."""
+        import numpy as np
+        codigos = self.lanzamientos['platform']
+        etiquetas = self.etiquetas['platform']
+        cuentas = np.bincount(codigos[codigos >= 0], minlength=len(etiquetas))
+        grupos = {}
+        for i in np.flatnonzero(cuentas):
+            grupos[etiquetas[i]] = grupos.get(etiquetas[i], 0) + int(cuentas[i])
+        resultado = sorted(((str(n), c) for n, c in grupos.items()), key=lambda f: -f[1])
+        return ("platform_name", "total_games"), resultado
+
+    def anios_con_mas_lanzamientos(self, limite=20):
+        """COUNT(*) por release_year de los game_platform con juego, los `limite` años con más."""
+        import numpy as np
+        anios, juegos = self.lanzamientos['year'], self.lanzamientos['game']
+        cuentas = np.bincount(anios[(anios >= 0) & (juegos >= 0)], minlength=len(self.anios))
+        presentes = np.flatnonzero(cuentas)
+        orden = presentes[np.lexsort((self.anios[presentes], -cuentas[presentes]))][:limite]
+        return ("release_year", "total_games"), [(int(self.anios[i]), int(cuentas[i])) for i in orden]
+
+    def resultado(self, endpoint):
+        """Resultado (columnas, filas) de un endpoint; el snapshot no cambia, así que se calcula una vez."""
+        if endpoint not in self._resultados:
+            with self._lock:
+                if endpoint not in self._resultados:
+                    self._resultados[endpoint] = CONSULTAS_MEMORIA[endpoint](self)
+        return self._resultados[endpoint]
+
+
+# Endpoint (el mismo nombre con el que su SQL está en database.CONSULTAS) -> cálculo en memoria
+CONSULTAS_MEMORIA = {
+    "/games/publisher-sales": lambda m: m.ventas_por('publisher', ("publisher_name", "total_sales")),
+    "/games/platform-count": MotorAnalitico.juegos_por_plataforma,
+    "/games/top-release-year": MotorAnalitico.anios_con_mas_lanzamientos,
+    "/Graficas_panda/ventas_por_genero": lambda m: m.ventas_por('genre', ("genre_name", "num_sales")),
+    "/Graficas_panda/ventas_por_plataforma": lambda m: m.ventas_por('platform', ("platform_name", "num_sales")),
+    "/Graficas_panda/ventas_por_año": MotorAnalitico.ventas_por_anio,
+}
+
+
+class SelectorBackend:
+    """Backend (sql | memory) de cada endpoint analítico."""
+
+    def __init__(self, defecto=ANALITICA_BACKEND, por_endpoint=ANALITICA_BACKENDS):
+        self.defecto = defecto if defecto in BACKENDS else "sql"
+        self.por_endpoint = {}
+        for par in por_endpoint.split(","):
+            endpoint, _, backend = par.strip().rpartition("=")
+            if endpoint in CONSULTAS_MEMORIA and backend in BACKENDS:
+                self.por_endpoint[endpoint] = backend
+
+    def backend(self, endpoint):
+        return self.por_endpoint.get(endpoint, self.defecto)
+
+    def en_memoria(self, endpoint):
+        return self.backend(endpoint) == "memory"
+
+    def configurar(self, endpoint, backend):
+        if endpoint not in CONSULTAS_MEMORIA:
+            raise KeyError(endpoint)
+        self.por_endpoint[endpoint] = backend
+
+    def estado(self):
+        return {"defecto": self.defecto, "endpoints": {e: self.backend(e) for e in CONSULTAS_MEMORIA},
+                "motor_cargado": gestor_snapshot.cargado and gestor_snapshot.actual() in _motores}
+
+
+selector = SelectorBackend()
+
+# Un motor por snapshot; cuando el gestor recarga data/ el anterior se libera
+_motores = weakref.WeakKeyDictionary()
+_lock_motores = threading.Lock()
+
+
+def motor():
+    snapshot = gestor_snapshot.actual()
+    motor_ = _motores.get(snapshot)
+    if motor_ is None:
+        with _lock_motores:
+            motor_ = _motores.get(snapshot)
+            if motor_ is None:
+                motor_ = _motores[snapshot] = MotorAnalitico(snapshot.data)
+    return motor_
+
+
+def en_uso():
+    return any(selector.en_memoria(e) for e in CONSULTAS_MEMORIA)
+
+
+def precargar():
+    """Construye el motor del snapshot actual si algún endpoint lo usa (para la precarga de arranque.py)."""
+    if en_uso():
+        motor()
+
+
+def cargado():
+    return not en_uso() or (gestor_snapshot.cargado and gestor_snapshot.actual() in _motores)
+
+
+def calcular(endpoint):
+    with span("memory"):
+        return motor().resultado(endpoint)
+
+
+async def leer_filas(endpoint):
+    """(columnas, filas) del endpoint calculado en memoria, fuera del event loop."""
+    return await en_hilo(calcular, endpoint)
+
+
+async def leer_df(endpoint):
+    """Como `leer_filas`, en DataFrame (para las gráficas de visualizations.py)."""
+    import pandas as pd
+    columnas, filas = await leer_filas(endpoint)
+    return pd.DataFrame.from_records(filas, columns=columnas)
+
+
+# --- Comparación de backends --------------------------------------------------
+
+def _normalizar(resultado):
+    """Filas en un orden canónico: el orden entre empates no lo fija el SQL."""
+    columnas, filas = resultado
+    filas = [tuple(float(v) if hasattr(v, "as_tuple") else v for v in fila) for fila in filas]
+    return tuple(columnas), sorted(filas, key=lambda f: tuple((v is None, str(type(v)), v if v is not None else 0) for v in f))
+
+
+def _iguales(a, b):
+    if isinstance(a, float) or isinstance(b, float):
+        return a is not None and b is not None and math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+    return a == b
+
+
+def comparar(endpoint, sql):
+    """Lista de diferencias entre el SQL y el motor en memoria para un endpoint."""
+    from database import filas_crudas
+    columnas_sql, filas_sql = _normalizar(filas_crudas(sql))
+    columnas_mem, filas_mem = _normalizar(calcular(endpoint))
+    if columnas_sql != columnas_mem:
+        return [f"columnas: sql={columnas_sql} memory={columnas_mem}"]
+    diferencias = []
+    if len(filas_sql) != len(filas_mem):
+        diferencias.append(f"filas: sql={len(filas_sql)} memory={len(filas_mem)}")
+    for fila_sql, fila_mem in zip(filas_sql, filas_mem):
+        if not all(_iguales(a, b) for a, b in zip(fila_sql, fila_mem)):
+            diferencias.append(f"sql={fila_sql} memory={fila_mem}")
+    return diferencias
+
+
+def consultas_comparables(con_rollups=False):
+    """[(endpoint, origen, consulta)] que `comparar` contrasta con el motor en memoria."""
+    from database import CONSULTAS
+    import rollups
+    from migraciones import registrar_consultas_api
+    registrar_consultas_api()
+    consultas = [(e, "sql", CONSULTAS[e][0]) for e in CONSULTAS_MEMORIA]
+    if con_rollups:
+        consultas += [(e, "rollup", q) for e, q in (
+            ("/games/publisher-sales", rollups.VENTAS_POR_PUBLISHER),
+            ("/Graficas_panda/ventas_por_genero", rollups.VENTAS_POR_GENERO),
+            ("/Graficas_panda/ventas_por_plataforma", rollups.VENTAS_POR_PLATAFORMA),
+            ("/Graficas_panda/ventas_por_año", rollups.VENTAS_POR_ANIO))]
+    return consultas
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="Motor analítico en memoria")
+    sub = parser.add_subparsers(dest="orden", required=True)
+    p = sub.add_parser("comparar", help="compara el backend sql con el de memoria en todos los endpoints")
+    p.add_argument("--rollups", action="store_true", help="compara también las lecturas de rollup_ventas")
+    args = parser.parse_args()
+
+    consultas = consultas_comparables(args.rollups)
+    errores = 0
+    for endpoint, origen, sql in consultas:
+        try:
+            diferencias = comparar(endpoint, sql)
+        except Exception as e:
+            diferencias = [f"error: {e.__class__.__name__}: {str(e).splitlines()[0]}"]
+        errores += bool(diferencias)
+        print(f"{'ok' if not diferencias else 'DISTINTO':9}{origen:8}{endpoint}")
+        for d in diferencias[:10]:
+            print(f"{'':17}{d}")
+    print(f"{errores} endpoint(s) con diferencias de {len(consultas)}")
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == "__main__":
+    _main()
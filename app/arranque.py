@@ -0,0 +1,102 @@
+# arranque.py
+# Arranque perezoso de la API.
+#
+# Importar main solo carga FastAPI y SQLAlchemy: pandas, matplotlib, el snapshot
+# de data/ y el índice de búsqueda se cargan con la primera petición que los
+# necesita. Con PRECARGA=1 el lifespan los carga además en segundo plano, uno
+# tras otro y fuera del event loop, mientras el worker ya atiende peticiones.
+# /ready responde 200 cuando están cargados los subsistemas de LISTO_REQUIERE
+# (503 mientras tanto), para que el balanceador no envíe tráfico antes.
+import os
+import time
+import asyncio
+import inspect
+import logging
+
+from database import en_hilo
+
+logger = logging.getLogger(__name__)
+
+PRECARGA = os.getenv('PRECARGA', '1') == '1'
+LISTO_REQUIERE = tuple(s.strip() for s in os.getenv(
+    'LISTO_REQUIERE', 'base_de_datos,pandas,graficas,snapshot').split(',') if s.strip())
+
+
+class Subsistema:
+    def __init__(self, nombre, cargar, cargado):
+        self.nombre = nombre
+        self.cargar = cargar    # función (o corrutina) que lo deja listo; None si lo carga otro hilo
+        self.cargado = cargado  # () -> bool, por si lo cargó una petición antes que la precarga
+        self.completado = False
+        self.segundos = None
+        self.error = None
+
+
+class Arranque:
+    """Registro de subsistemas que se cargan bajo demanda y su precarga en segundo plano."""
+
+    def __init__(self, precarga=PRECARGA, requeridos=LISTO_REQUIERE):
+        self.precarga = precarga
+        self.requeridos = requeridos
+        self.subsistemas = {}
+        self.importado_en = time.time()
+        self._tarea = None
+
+    def registrar(self, nombre, cargar, cargado):
+        self.subsistemas[nombre] = Subsistema(nombre, cargar, cargado)
+
+    def _esta_cargado(self, subsistema):
+        if subsistema.completado:
+            return True
+        try:
+            return bool(subsistema.cargado())
+        except Exception:
+            return False
+
+    async def precargar(self):
+        for subsistema in self.subsistemas.values():
+            if subsistema.cargar is None or self._esta_cargado(subsistema):
+                continue
+            inicio = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(subsistema.cargar):
+                    await subsistema.cargar()
+                else:
+                    await en_hilo(subsistema.cargar)
+                subsistema.completado = True
+                subsistema.error = None
+            except Exception as e:
+                # La petición que lo necesite lo reintentará; /ready muestra el error
+                subsistema.error = str(e)
+                logger.exception("No se pudo precargar %s", subsistema.nombre)
+            subsistema.segundos = round(time.perf_counter() - inicio, 3)
+
+    def iniciar(self):
+        if self.precarga and self._tarea is None:
+            self._tarea = asyncio.create_task(self.precargar())
+
+    async def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    def estado(self):
+        subsistemas = {
+            nombre: {"cargado": self._esta_cargado(s), "segundos": s.segundos, "error": s.error}
+            for nombre, s in self.subsistemas.items()
+        }
+        return {
+            "listo": all(subsistemas[n]["cargado"] for n in self.requeridos if n in subsistemas),
+            "requeridos": list(self.requeridos),
+            "precarga": self.precarga,
+            "precargando": self._tarea is not None and not self._tarea.done(),
+            "segundos_desde_arranque": round(time.time() - self.importado_en, 3),
+            "subsistemas": subsistemas,
+        }
+
+
+arranque = Arranque()
@@ -0,0 +1,108 @@
+# Benchmark del arranque en frío: tiempo de `import main`, tiempo hasta /ready y
+# latencia de la primera petición a cada ruta, cada medida en un proceso nuevo.
+# Con --app-dir se mide otro checkout (por ejemplo el commit anterior con
+# `git worktree add /tmp/antes HEAD~1`) sobre la misma réplica.
+#   python -m benchmarks.arranque [--app-dir /tmp/antes/app] [--repeticiones 3]
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.standin import construir_sqlite, url_sqlite
+
+APP_DIR = Path(__file__).resolve().parents[1]
+
+RUTAS = [
+    "/games/1",
+    "/games/publisher-sales",
+    "/games/search?q=mario",
+    "/Tablas/tabla/genres",
+    "/Graficas_panda/ventas_por_genero",
+]
+
+
+async def _peticiones(app, ruta, esperar_listo):
+    import httpx
+    medidas = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                     timeout=None) as cliente:
+            inicio = time.perf_counter()
+            if esperar_listo:
+                # Sin /ready (versiones anteriores) el 404 termina la espera
+                while (await cliente.get("/ready")).status_code == 503:
+                    await asyncio.sleep(0.02)
+                medidas["listo_s"] = time.perf_counter() - inicio
+            for clave in ("primera_ms", "segunda_ms"):
+                t = time.perf_counter()
+                resp = await cliente.get(ruta)
+                medidas[clave] = (time.perf_counter() - t) * 1000
+                medidas["status"] = resp.status_code
+    return medidas
+
+
+def hijo(args):
+    """Proceso nuevo: importa la API de --app-dir y mide una ruta."""
+    sys.path.insert(0, args.app_dir)
+    os.chdir(args.datos)
+    inicio = time.perf_counter()
+    from main import app
+    medidas = {"import_s": time.perf_counter() - inicio}
+    medidas.update(asyncio.run(_peticiones(app, args.ruta, args.precarga)))
+    print(json.dumps(medidas))
+
+
+def medir(app_dir, db, datos, ruta, precarga):
+    env = dict(os.environ, DATABASE_URL=url_sqlite(db), PRECARGA="1" if precarga else "0",
+               PYTHONPATH=str(APP_DIR), VENTAS_ROLLUP="0")
+    comando = [sys.executable, "-m", "benchmarks.arranque", "--hijo", "--app-dir", str(app_dir),
+               "--datos", str(datos), "--ruta", ruta] + (["--precarga"] if precarga else [])
+    salida = subprocess.run(comando, cwd=APP_DIR, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arranque en frío de la API")
+    parser.add_argument("--app-dir", default=str(APP_DIR))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--datos", help=argparse.SUPPRESS)
+    parser.add_argument("--ruta", help=argparse.SUPPRESS)
+    parser.add_argument("--precarga", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.hijo:
+        hijo(args)
+        return
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db = construir_sqlite(Path(tmp) / "video_games.sqlite")
+        subprocess.run([sys.executable, "database.py", "--destino", str(Path(tmp) / "data")], cwd=APP_DIR,
+                       env=dict(os.environ, DATABASE_URL=url_sqlite(db)), check=True, stdout=subprocess.DEVNULL)
+        for precarga in (False, True):
+            for ruta in RUTAS:
+                medidas = [medir(args.app_dir, db, tmp, ruta, precarga) for _ in range(args.repeticiones)]
+                fila = {"ruta": ruta, "precarga": precarga, "status": medidas[-1]["status"]}
+                for clave in ("import_s", "listo_s", "primera_ms", "segunda_ms"):
+                    if clave in medidas[0]:
+                        fila[clave] = round(statistics.median(m[clave] for m in medidas), 3)
+                resultados.append(fila)
+
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+        return
+    print(f"{'ruta':<36}{'precarga':>9}{'import s':>10}{'/ready s':>10}{'1ª ms':>10}{'2ª ms':>10}")
+    for f in resultados:
+        print(f"{f['ruta']:<36}{'sí' if f['precarga'] else 'no':>9}{f['import_s']:>10}{f.get('listo_s', ''):>10}"
+              f"{f['primera_ms']:>10}{f['segunda_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Benchmark de escrituras: una petición por fila (POST/PUT/DELETE /games/{id})
+# frente a los endpoints /games/bulk, contra un uvicorn servido sobre la réplica SQLite.
+#   python -m benchmarks.bulk --filas 2000 --latencia-ms 1
+import argparse
+import json
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+from benchmarks.carga import ejecutar_servidor
+from benchmarks.standin import construir_sqlite
+
+
+def peticion(base, metodo, ruta, cuerpo=None):
+    datos = None if cuerpo is None else json.dumps(cuerpo).encode()
+    req = urllib.request.Request(base + ruta, data=datos, method=metodo,
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=300) as resp:
+        return json.loads(resp.read())
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escrituras fila a fila frente a /games/bulk")
+    parser.add_argument("--filas", type=int, default=2000)
+    parser.add_argument("--latencia-ms", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=8775)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = construir_sqlite(Path(tmp) / "video_games.sqlite")
+
+        with ejecutar_servidor(db, tmp, args.port, args.latencia_ms) as base:
+            n = args.filas
+            nuevo = lambda i: {"game_name": f"Bench {i}", "genre_id": 1}
+            max_id = max(g["id"] for g in peticion(base, "GET", "/games?fields=id")["games"])
+
+            filas = []
+            t, _ = cronometrar(lambda: [peticion(base, "POST", "/games", nuevo(i)) for i in range(n)])
+            filas.append(("crear", "fila a fila", t))
+            ids = [g["id"] for g in peticion(base, "GET", f"/games?fields=id&after_id={max_id}")["games"]]
+            t, _ = cronometrar(lambda: [peticion(base, "PUT", f"/games/{i}", {"game_name": "U"}) for i in ids])
+            filas.append(("actualizar", "fila a fila", t))
+            t, _ = cronometrar(lambda: [peticion(base, "DELETE", f"/games/{i}") for i in ids])
+            filas.append(("borrar", "fila a fila", t))
+
+            t, r = cronometrar(lambda: peticion(base, "POST", "/games/bulk", [nuevo(i) for i in range(n)]))
+            assert r["ok"] == n, r["errors"]
+            filas.append(("crear", "bulk", t))
+            ids = [g["id"] for g in peticion(base, "GET", f"/games?fields=id&after_id={max_id}")["games"]]
+            t, r = cronometrar(lambda: peticion(base, "PATCH", "/games/bulk", [{"id": i, "game_name": "U"} for i in ids]))
+            assert r["ok"] == n, r["errors"]
+            filas.append(("actualizar", "bulk", t))
+            t, r = cronometrar(lambda: peticion(base, "DELETE", "/games/bulk", [{"id": i} for i in ids]))
+            assert r["ok"] == n, r["errors"]
+            filas.append(("borrar", "bulk", t))
+
+    print(f"{'operación':<12}{'modo':<14}{'filas/s':>10}{'total s':>10}   ({n} filas, {args.latencia_ms} ms de latencia)")
+    for operacion, modo, t in filas:
+        print(f"{operacion:<12}{modo:<14}{n / t:>10.0f}{t:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# Benchmark de /games/search: latencia de IndiceJuegos.buscar sobre el catálogo
+# completo, con términos muy comunes, prefijos y errores de tecleo. Sale con
+# código 1 si la consulta más lenta pasa de --maximo-ms.
+#   python -m benchmarks.busqueda --maximo-ms 1
+import argparse
+import sqlite3
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+from benchmarks.standin import construir_sqlite
+
+CONSULTAS = [
+    # Términos que aparecen en miles de nombres
+    "a", "s", "the", "of", "2",
+    # Exactos y prefijos
+    "mario", "halo", "star wars", "pokemon red", "gran",
+    # Errores de tecleo: letra de más, de menos, cambiada o cambiadas de sitio
+    "zelada", "pokemn", "marjo", "final fantsy", "fianl fantasy", "grnad theft auto", "super marjo bros",
+    "lgend zelda", "metriod", "casltevania", "strret fighter", "kingdom harts", "crash bandicot", "call of duyt",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de la búsqueda de juegos")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--rondas", type=int, default=5, help="se queda con la mejor ronda de cada consulta")
+    parser.add_argument("--maximo-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    from busqueda import IndiceJuegos
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(construir_sqlite(Path(tmp) / "vg.sqlite"))
+        filas = conn.execute("SELECT id, game_name FROM game").fetchall()
+        conn.close()
+
+    construccion = timeit.timeit(lambda: IndiceJuegos(filas), number=1)
+    indice = IndiceJuegos(filas)
+    print(f"{len(indice)} juegos, construcción del índice: {construccion * 1000:.0f} ms")
+    print(f"{'consulta':<20}{'ms':>8}  primer resultado")
+    tiempos = {}
+    for consulta in CONSULTAS:
+        tiempos[consulta] = min(timeit.repeat(lambda: indice.buscar(consulta), number=args.repeticiones,
+                                              repeat=args.rondas)) / args.repeticiones * 1000
+        primero = indice.buscar(consulta, limite=1)
+        print(f"{consulta:<20}{tiempos[consulta]:>8.3f}  {primero[0][1] if primero else '-'}")
+
+    peor = max(tiempos, key=tiempos.get)
+    print(f"más lenta: {peor} ({tiempos[peor]:.3f} ms, máximo {args.maximo_ms:g} ms)")
+    if tiempos[peor] > args.maximo_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
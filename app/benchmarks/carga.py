@@ -0,0 +1,134 @@
+# Test de carga: tráfico mixto concurrente contra un worker de uvicorn servido
+# sobre la réplica SQLite. Compara las consultas en el event loop (DB_THREADS=0,
+# comportamiento anterior) con las consultas en el pool de hilos.
+#   python -m benchmarks.carga --clientes 16 --peticiones 600 --latencia-ms 20
+import argparse
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.standin import construir_sqlite
+
+APP_DIR = Path(__file__).resolve().parents[1]
+
+RUTAS = [
+    "/games/publisher-sales",
+    "/games/platform-count",
+    "/games/top-release-year",
+    "/games/genre?genre=Sports",
+    "/games/year?year=2008&platform=Wii",
+    "/games/1",
+]
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    i = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[i]
+
+
+def esperar_servidor(base, timeout=60):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        try:
+            urllib.request.urlopen(base + "/docs", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"El servidor en {base} no respondió")
+
+
+def pedir(base, ruta):
+    inicio = time.perf_counter()
+    with urllib.request.urlopen(base + ruta, timeout=120) as resp:
+        resp.read()
+    return ruta, time.perf_counter() - inicio
+
+
+def medir(base, clientes, peticiones, semilla=0):
+    rng = random.Random(semilla)
+    rutas = [rng.choice(RUTAS) for _ in range(peticiones)]
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clientes) as pool:
+        resultados = list(pool.map(lambda r: pedir(base, r), rutas))
+    total = time.perf_counter() - inicio
+    latencias = [t for _, t in resultados]
+    por_ruta = {}
+    for ruta, t in resultados:
+        por_ruta.setdefault(ruta, []).append(t)
+    return {
+        "peticiones": peticiones,
+        "clientes": clientes,
+        "rps": round(peticiones / total, 1),
+        "p50_ms": round(percentil(latencias, 50) * 1000, 1),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 1),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 1),
+        "p99_ms_por_ruta": {r: round(percentil(ts, 99) * 1000, 1) for r, ts in sorted(por_ruta.items())},
+    }
+
+
+@contextlib.contextmanager
+def ejecutar_servidor(db, datos, port, latencia_ms=0.0, env_extra=None, workers=None, nucleos=None):
+    """Arranca benchmarks.servidor en un subproceso y devuelve su URL base."""
+    env = dict(os.environ, **(env_extra or {}))
+    comando = [sys.executable, "-m", "benchmarks.servidor", "--db", str(db), "--datos", str(datos),
+               "--port", str(port), "--latencia-ms", str(latencia_ms)]
+    if workers is not None:
+        comando += ["--workers", str(workers)] + (["--nucleos", str(nucleos)] if nucleos else [])
+    proc = subprocess.Popen(comando, cwd=APP_DIR, env=env)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        esperar_servidor(base)
+        yield base
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def ejecutar_escenario(nombre, env_extra, args, db, datos, port):
+    with ejecutar_servidor(db, datos, port, args.latencia_ms, env_extra) as base:
+        medir(base, args.clientes, min(50, args.peticiones))  # calentamiento
+        return dict(escenario=nombre, **medir(base, args.clientes, args.peticiones))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de carga antes/después del pool de hilos")
+    parser.add_argument("--clientes", type=int, default=16)
+    parser.add_argument("--peticiones", type=int, default=600)
+    parser.add_argument("--latencia-ms", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = construir_sqlite(Path(tmp) / "video_games.sqlite")
+        escenarios = [("antes (event loop)", {"DB_THREADS": "0"}), ("despues (pool de hilos)", {})]
+        resultados = [
+            ejecutar_escenario(nombre, env, args, db, tmp, args.port + i)
+            for i, (nombre, env) in enumerate(escenarios)
+        ]
+
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+        return
+    print(f"{'escenario':<26}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for r in resultados:
+        print(f"{r['escenario']:<26}{r['rps']:>8}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}")
+    print("\np99 por ruta (ms)")
+    for ruta in RUTAS:
+        fila = "".join(f"{r['p99_ms_por_ruta'].get(ruta, 0):>12}" for r in resultados)
+        print(f"{ruta:<40}{fila}")
+
+
+if __name__ == "__main__":
+    main()
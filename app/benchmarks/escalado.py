@@ -0,0 +1,105 @@
+# Réplicas SQLite escaladas: los dumps de database_game/ multiplicados por N.
+#
+# Las tablas de referencia (genre, platform, publisher, region) no cambian; cada
+# copia i de game, game_publisher, game_platform y region_sales desplaza los ids
+# en i veces el máximo original, añade " #i" al nombre del juego y varía las
+# ventas en ±10 % de forma determinista, así que dos construcciones con la misma
+# escala dan exactamente los mismos datos.
+#   python -m benchmarks.escalado --escala 10 /tmp/vg_x10.sqlite
+import argparse
+import hashlib
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+
+from benchmarks.standin import DUMPS_DIR, construir_sqlite
+
+# (tabla, columnas con ids que se desplazan -> tabla de la que sale el desplazamiento)
+COPIAS = [
+    ("game", {"id": "game"}),
+    ("game_publisher", {"id": "game_publisher", "game_id": "game"}),
+    ("game_platform", {"id": "game_platform", "game_publisher_id": "game_publisher"}),
+    ("region_sales", {"game_platform_id": "game_platform"}),
+]
+
+
+def huella_dumps(dumps_dir=DUMPS_DIR):
+    h = hashlib.sha1()
+    for dump in sorted(Path(dumps_dir).glob("*.sql")):
+        h.update(dump.name.encode())
+        h.update(dump.read_bytes())
+    return h.hexdigest()[:12]
+
+
+def _columnas(conn, tabla):
+    return [fila[1] for fila in conn.execute(f"PRAGMA table_info({tabla})")]
+
+
+def escalar(conn, escala):
+    """Añade escala - 1 copias de las tablas de hechos a la réplica abierta en `conn`."""
+    maximos = {t: conn.execute(f"SELECT MAX(id) FROM {t}").fetchone()[0]
+               for t in ("game", "game_publisher", "game_platform")}
+    originales = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t, _ in COPIAS}
+    for tabla, desplazar in COPIAS:
+        columnas = _columnas(conn, tabla)
+        for i in range(1, escala):
+            expresiones = []
+            for c in columnas:
+                if c in desplazar:
+                    expresiones.append(f"{c} + {i * maximos[desplazar[c]]}")
+                elif tabla == "game" and c == "game_name":
+                    expresiones.append(f"game_name || ' #{i}'")
+                elif tabla == "region_sales" and c == "num_sales":
+                    expresiones.append(f"ROUND(num_sales * (1 + ((game_platform_id * 7 + region_id * 3 + {i} * 13) % 21 - 10) / 100.0), 2)")
+                else:
+                    expresiones.append(c)
+            # Solo las filas originales (region_sales no tiene id: sus rowid son el orden de inserción)
+            filtro = f"rowid <= {originales[tabla]}" if tabla == "region_sales" else f"id <= {maximos[tabla]}"
+            conn.execute(f"INSERT INTO {tabla} ({', '.join(columnas)}) "
+                         f"SELECT {', '.join(expresiones)} FROM {tabla} WHERE {filtro}")
+    conn.commit()
+
+
+def construir_escalado(ruta, escala=1, dumps_dir=DUMPS_DIR) -> Path:
+    """Réplica con los dumps multiplicados por `escala`."""
+    ruta = construir_sqlite(ruta, dumps_dir)
+    conn = sqlite3.connect(ruta)
+    try:
+        if escala > 1:
+            escalar(conn, escala)
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return ruta
+
+
+def replica_cacheada(carpeta, escala, dumps_dir=DUMPS_DIR) -> Path:
+    """Devuelve una réplica de la escala pedida, reutilizando la de una ejecución anterior si los dumps no cambiaron."""
+    carpeta = Path(carpeta)
+    carpeta.mkdir(parents=True, exist_ok=True)
+    ruta = carpeta / f"video_games_x{escala}_{huella_dumps(dumps_dir)}.sqlite"
+    if not ruta.exists():
+        temporal = ruta.with_suffix(".tmp")
+        construir_escalado(temporal, escala, dumps_dir)
+        shutil.move(temporal, ruta)
+    return ruta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Réplica SQLite con los dumps multiplicados")
+    parser.add_argument("destino")
+    parser.add_argument("--escala", type=int, default=10)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    ruta = construir_escalado(args.destino, args.escala)
+    conn = sqlite3.connect(ruta)
+    filas = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t, _ in COPIAS}
+    conn.close()
+    print(f"{ruta} (x{args.escala}) en {time.perf_counter() - inicio:.1f} s: {filas}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Microbenchmark de la serialización de routes.py: pd.read_sql + to_dict + JSONResponse
+# (ruta anterior) frente a filas del cursor + respuestas.py, por endpoint.
+# Mide la consulta más la serialización y, aparte, solo la serialización con los
+# datos ya leídos. Comprueba además que los dos caminos dan el mismo JSON.
+#   python -m benchmarks.json_respuestas [--db /ruta/video_games.sqlite]
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+from benchmarks.standin import construir_sqlite, url_sqlite
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialización anterior frente a respuestas.py")
+    parser.add_argument("--db", help="réplica SQLite ya construida; si falta se genera desde los dumps")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(args.db) if args.db else construir_sqlite(Path(tmp) / "vg.sqlite")
+        os.environ["DATABASE_URL"] = url_sqlite(db)
+        os.environ["VENTAS_ROLLUP"] = "0"
+        sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+        import pandas as pd
+        from fastapi.responses import JSONResponse
+        from fastapi.encoders import jsonable_encoder
+        import routes
+        from database import engine, filas_crudas
+        from respuestas import responder, RespuestaJSON, registros
+
+        casos = [
+            ("/games/genre", routes.GAMES_BY_GENRE, {"genre_ids": [1, 2, 3], "limit": 500, "offset": 0}),
+            ("/games/year", routes.GAMES_BY_YEAR_AND_PLATFORM, {"year": 2008, "platform_ids": [1, 2, 3], "limit": 500, "offset": 0}),
+            ("/games/publisher-sales", routes.SALES_BY_PUBLISHER, {}),
+            ("/games/platform-count", routes.GAME_COUNT_PER_PLATFORM, {}),
+            ("/games/top-release-year", routes.YEAR_WITH_MOST_RELEASES, {}),
+        ]
+
+        def anterior(query, params):
+            df = pd.read_sql(query, con=engine, params=params)
+            return JSONResponse(content=df.to_dict(orient="records")).body
+
+        def nuevo(query, params, formato="records"):
+            return responder(filas_crudas(query, params), formato).body
+
+        def medir(funcion):
+            return timeit.timeit(funcion, number=args.repeticiones) / args.repeticiones * 1000
+
+        print(f"{'endpoint':<26}{'filas':>7}{'antes ms':>10}{'ahora ms':>10}{'x':>6}"
+              f"{'ser. antes':>12}{'ser. ahora':>12}{'x':>6}{'columns ms':>12}")
+        for nombre, query, params in casos:
+            try:
+                esperado = json.loads(anterior(query, params))
+            except ValueError:
+                # JSONResponse no admite NaN: con un NULL en una columna numérica la ruta anterior fallaba
+                esperado = None
+            resultado = filas_crudas(query, params)
+            if esperado is not None:
+                assert json.loads(nuevo(query, params)) == esperado, nombre
+
+            t_antes = medir(lambda: anterior(query, params))
+            t_ahora = medir(lambda: nuevo(query, params))
+            t_columnas = medir(lambda: nuevo(query, params, "columns"))
+
+            # Solo serialización, con los datos ya en memoria
+            df = pd.read_sql(query, con=engine, params=params)
+            s_antes = medir(lambda: JSONResponse(content=df.to_dict(orient="records")).body)
+            s_ahora = medir(lambda: responder(resultado).body)
+            print(f"{nombre:<26}{len(resultado[1]):>7}{t_antes:>10.2f}{t_ahora:>10.2f}{t_antes / t_ahora:>6.1f}"
+                  f"{s_antes:>12.3f}{s_ahora:>12.3f}{s_antes / s_ahora:>6.1f}{t_columnas:>12.2f}")
+
+        # GET /games sin paginar: antes lista de dicts + jsonable_encoder de FastAPI
+        query = "SELECT id, genre_id, game_name FROM game ORDER BY id"
+        columnas, filas = filas_crudas(query)
+        juegos = registros(columnas, filas)
+        s_antes = medir(lambda: JSONResponse(content=jsonable_encoder({"games": juegos, "next_cursor": None})).body)
+        s_ahora = medir(lambda: RespuestaJSON({"games": registros(columnas, filas), "next_cursor": None}).body)
+        print(f"{'/games (serialización)':<26}{len(filas):>7}{'':>10}{'':>10}{'':>6}"
+              f"{s_antes:>12.3f}{s_ahora:>12.3f}{s_antes / s_ahora:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# Escalado por núcleos: peticiones por segundo con prefork.py a 1, 2, 4 y N
+# núcleos (N = los de la máquina), un worker por núcleo y el servidor limitado a
+# esos núcleos con sched_setaffinity. La carga es la mezcla de lecturas de
+# benchmarks.suite, lanzada desde varios procesos cliente para que el cliente no
+# sea el cuello de botella; por defecto sin cachés, para medir el trabajo de CPU.
+# Con más núcleos pedidos que los disponibles, el servidor tiene más workers que
+# núcleos (se indica en la columna "núcleos").
+#   python -m benchmarks.nucleos [--nucleos 1 2 4 8] [--escala 10] [--graficas-procesos 2]
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from benchmarks.carga import ejecutar_servidor
+from benchmarks.escalado import replica_cacheada
+from benchmarks.suite import CACHE_REPLICAS, _entorno, _pedir_http, mezcla, preparar, resumen
+
+
+def disponibles():
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+
+
+def _lanzar(base, peticiones, hilos, max_id):
+    """Proceso cliente: (latencia, ok) de cada petición, con `hilos` conexiones a la vez."""
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        return [(t, ok) for _, t, ok in pool.map(lambda p: _pedir_http(base, p[1][0], p[1][1], p[0], max_id), peticiones)]
+
+
+def medir(base, args, max_id):
+    procesos = max(1, min(args.procesos_cliente, args.clientes))
+    hilos = max(1, args.clientes // procesos)
+    with ProcessPoolExecutor(max_workers=procesos) as clientes:
+        def carga(peticiones):
+            lotes = [list(enumerate(peticiones))[i::procesos] for i in range(procesos)]
+            futuros = [clientes.submit(_lanzar, base, lote, hilos, max_id) for lote in lotes]
+            return [m for f in futuros for m in f.result()]
+
+        carga(mezcla(args.clientes * 2, args.semilla + 1))  # calentamiento
+        inicio = time.perf_counter()
+        medidas = carga(mezcla(args.peticiones, args.semilla))
+        duracion = time.perf_counter() - inicio
+    return resumen([t for t, _ in medidas], duracion, sum(not ok for _, ok in medidas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peticiones por segundo de prefork.py según el número de núcleos")
+    parser.add_argument("--nucleos", type=int, nargs="+", help="por defecto 1 2 4 y los de la máquina")
+    parser.add_argument("--escala", type=int, default=1)
+    parser.add_argument("--peticiones", type=int, default=400)
+    parser.add_argument("--clientes", type=int, default=32)
+    parser.add_argument("--procesos-cliente", type=int, default=4)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--graficas-procesos", type=int, default=0, help="GRAFICAS_PROCESOS de cada worker")
+    parser.add_argument("--con-cache", action="store_true")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--cache", default=str(CACHE_REPLICAS))
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    n = disponibles()
+    nucleos = sorted(set(args.nucleos or [1, 2, 4, n]))
+    env = dict(_entorno(args), GRAFICAS_PROCESOS=str(args.graficas_procesos))
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db, _, max_id = preparar(replica_cacheada(args.cache, args.escala), tmp, env)
+        for i, k in enumerate(nucleos):
+            with ejecutar_servidor(db, tmp, args.port + i, env_extra=env, workers=k, nucleos=k) as base:
+                fila = dict(workers=k, nucleos=min(k, n), **medir(base, args, max_id))
+            print(f"{k} workers: {fila['rps']} rps", file=sys.stderr)
+            resultados.append(fila)
+    base_rps = resultados[0]["rps"] if resultados and resultados[0]["workers"] == 1 else None
+    for fila in resultados:
+        if base_rps:
+            fila["aceleracion"] = round(fila["rps"] / base_rps, 2)
+            fila["eficiencia"] = round(fila["aceleracion"] / fila["workers"], 2)
+
+    salida = {"cpus": n, "escala": args.escala, "peticiones": args.peticiones, "clientes": args.clientes,
+              "graficas_procesos": args.graficas_procesos, "con_cache": args.con_cache, "resultados": resultados}
+    if args.json:
+        print(json.dumps(salida, indent=2))
+        return
+    print(f"{'workers':>8}{'núcleos':>9}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'errores':>9}{'aceler.':>9}{'efic.':>8}")
+    for f in resultados:
+        print(f"{f['workers']:>8}{f['nucleos']:>9}{f['rps']:>10}{f['p50_ms']:>10}{f['p95_ms']:>10}{f['errores']:>9}"
+              f"{f.get('aceleracion', ''):>9}{f.get('eficiencia', ''):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Levanta la API contra la réplica SQLite, con latencia de red simulada opcional.
+# Con --workers se sirve con prefork.py, limitado a los primeros --nucleos núcleos.
+#   python -m benchmarks.servidor --db /tmp/video_games.sqlite --port 8765 --latencia-ms 5
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API contra la réplica SQLite")
+    parser.add_argument("--db", required=True, help="archivo SQLite creado por benchmarks.standin")
+    parser.add_argument("--datos", required=True, help="carpeta de trabajo; los CSV se exportan a <datos>/data")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latencia-ms", type=float, default=0.0,
+                        help="espera añadida a cada sentencia, simula el viaje de red a MySQL")
+    parser.add_argument("--workers", type=int, help="servir con prefork.py y este número de workers")
+    parser.add_argument("--nucleos", type=int, help="núcleos a los que se limita el servidor (con --workers)")
+    args = parser.parse_args()
+
+    from benchmarks.standin import url_sqlite
+    os.environ["DATABASE_URL"] = url_sqlite(args.db)
+    sys.path.insert(0, str(APP_DIR))
+
+    import database
+    from sqlalchemy import event
+
+    if args.latencia_ms > 0:
+        @event.listens_for(database.engine, "before_cursor_execute")
+        def _latencia(*_):
+            time.sleep(args.latencia_ms / 1000)
+
+    # tables.py lee ./data/*.csv al importarse
+    carpeta = Path(args.datos)
+    if not (carpeta / "data" / "region_sales.csv").exists():
+        database.extraer_tablas(database.tablas, str(carpeta / "data"))
+    os.chdir(carpeta)
+
+    if args.workers is not None:
+        import prefork
+        if args.nucleos:
+            os.sched_setaffinity(0, sorted(os.sched_getaffinity(0))[:args.nucleos])
+        prefork.servir(argparse.Namespace(workers=args.workers, host="127.0.0.1", port=args.port,
+                                          app="main", log_level="warning"))
+        return
+
+    import uvicorn
+    from main import app
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
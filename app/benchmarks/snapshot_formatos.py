@@ -0,0 +1,74 @@
+# Benchmark de carga del snapshot: CSV frente a columnar (.npy con mmap).
+# Lanza N procesos "worker" que cargan los datos a la vez y mide, por worker,
+# el tiempo de carga, el RSS y el PSS (memoria proporcional: las páginas
+# compartidas entre procesos se reparten entre ellos).
+#   python -m benchmarks.snapshot_formatos --datos /ruta/que/contiene/data --workers 4
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1]
+
+
+def _memoria():
+    valores = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for linea in f:
+            partes = linea.split()
+            if partes[0] in ("Rss:", "Pss:"):
+                valores[partes[0][:-1].lower()] = int(partes[1]) / 1024
+    return valores
+
+
+def _worker(datos, formato, barrera, cola):
+    sys.path.insert(0, str(APP_DIR))
+    import pandas as pd
+    import columnar
+    tablas = sorted(p.name for p in (Path(datos) / columnar.CARPETA_COLUMNAR).iterdir() if not p.name.startswith("."))
+    base = _memoria()
+    inicio = time.perf_counter()
+    if formato == "csv":
+        data = {t: pd.read_csv(Path(datos) / f"{t}.csv") for t in tablas}
+    else:
+        data = {t: columnar.leer_tabla(datos, t) for t in tablas}
+    # Tocar todas las columnas, como hace IndiceVentas al construirse
+    for df in data.values():
+        for columna in df.columns:
+            df[columna].to_numpy().sum() if df[columna].dtype.kind in "if" else len(df[columna])
+    carga = time.perf_counter() - inicio
+    barrera.wait()  # todos los workers con los datos cargados a la vez
+    mem = _memoria()
+    cola.put({"carga_ms": carga * 1000, "rss_mb": mem["rss"] - base["rss"], "pss_mb": mem["pss"] - base["pss"]})
+    barrera.wait()
+
+
+def medir(datos, formato, workers):
+    ctx = mp.get_context("spawn")
+    barrera, cola = ctx.Barrier(workers, timeout=120), ctx.Queue()
+    procesos = [ctx.Process(target=_worker, args=(datos, formato, barrera, cola)) for _ in range(workers)]
+    for p in procesos:
+        p.start()
+    resultados = [cola.get(timeout=180) for _ in procesos]
+    for p in procesos:
+        p.join()
+    return {k: round(sum(r[k] for r in resultados) / workers, 1) for k in resultados[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV frente a columnar con mmap")
+    parser.add_argument("--datos", required=True, help="carpeta que contiene data/ (CSV y columnar/)")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    datos = str(Path(args.datos) / "data")
+
+    print(f"{'formato':<10}{'carga ms':>10}{'RSS MB':>10}{'PSS MB':>10}   (media por worker, {args.workers} workers)")
+    for formato in ("csv", "columnar"):
+        r = medir(datos, formato, args.workers)
+        print(f"{formato:<10}{r['carga_ms']:>10}{r['rss_mb']:>10}{r['pss_mb']:>10}")
+
+
+if __name__ == "__main__":
+    main()
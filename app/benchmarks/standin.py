@@ -0,0 +1,59 @@
+# Réplica local de la base de datos para benchmarks: carga los dumps de
+# database_game/*.sql en un archivo SQLite, sin necesidad de MySQL ni Docker.
+import re
+import sqlite3
+from pathlib import Path
+
+DUMPS_DIR = Path(__file__).resolve().parents[2] / "database_game"
+
+# Sentencias propias de MySQL que SQLite no entiende
+_IGNORAR = re.compile(r"^\s*(DROP DATABASE|CREATE DATABASE|USE |COMMIT)", re.IGNORECASE)
+_CREATE_TABLE = re.compile(r"CREATE TABLE[^;]*;", re.IGNORECASE)
+
+
+def _ddl_a_sqlite(ddl: str) -> str:
+    # La clave AUTO_INCREMENT de MySQL es un INTEGER PRIMARY KEY en SQLite
+    ddl = re.sub(r"(\w+)\s+INT NOT NULL AUTO_INCREMENT", r"\1 INTEGER PRIMARY KEY", ddl)
+    ddl = re.sub(r"\s*CONSTRAINT \w+ PRIMARY KEY \(\w+\),?", "", ddl)
+    return re.sub(r",(\s*\))", r"\1", ddl)
+
+
+def _a_sqlite(sql: str) -> str:
+    lineas = [linea for linea in sql.splitlines() if not _IGNORAR.match(linea)]
+    sql = "\n".join(lineas)
+    sql = sql.replace("video_games.", "")
+    sql = _CREATE_TABLE.sub(lambda m: _ddl_a_sqlite(m.group(0)), sql)
+    # MySQL escapa comillas con \' y SQLite con ''
+    return sql.replace("\\'", "''")
+
+
+# InnoDB crea un índice por cada FOREIGN KEY; SQLite no, así que se añaden a mano
+INDICES_FK = [
+    ("game", "genre_id"),
+    ("game_publisher", "game_id"),
+    ("game_publisher", "publisher_id"),
+    ("game_platform", "game_publisher_id"),
+    ("game_platform", "platform_id"),
+    ("region_sales", "game_platform_id"),
+    ("region_sales", "region_id"),
+]
+
+
+def construir_sqlite(ruta, dumps_dir=DUMPS_DIR) -> Path:
+    """Crea (o recrea) la réplica SQLite en `ruta` a partir de los dumps."""
+    ruta = Path(ruta)
+    ruta.unlink(missing_ok=True)
+    conn = sqlite3.connect(ruta)
+    try:
+        for dump in sorted(Path(dumps_dir).glob("*.sql")):
+            conn.executescript(_a_sqlite(dump.read_text(encoding="utf-8")))
+        for tabla, columna in INDICES_FK:
+            conn.execute(f"CREATE INDEX fk_{tabla}_{columna} ON {tabla} ({columna})")
+        conn.commit()
+    finally:
+        conn.close()
+    return ruta
+
+
+def url_sqlite(ruta) -> str:
+    return f"sqlite:///{Path(ruta).resolve()}"
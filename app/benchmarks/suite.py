@@ -0,0 +1,382 @@
+# Suite de benchmarks de todas las rutas de la API sobre réplicas SQLite de los
+# dumps (x1, x10, x100, ver benchmarks.escalado), sin MySQL ni Docker.
+#
+# Por cada escala se mide:
+#   secuencial   cada ruta por separado, en proceso (httpx + ASGITransport, sin red)
+#   concurrente  mezcla de lecturas con --clientes peticiones a la vez, en proceso
+#   http         la misma mezcla contra un uvicorn (benchmarks.servidor)
+#   escrituras   POST/PUT/DELETE /games y /games/bulk, en proceso, al final
+# Se aplican las migraciones (migraciones.py) a una copia de la réplica y, por
+# defecto, las cachés de resultados y de gráficas se desactivan para medir el
+# trabajo de cada petición (--con-cache mide con la configuración de despliegue).
+# La salida es JSON con p50/p95/p99 y peticiones por segundo por ruta, junto con
+# el commit, para comparar dos ejecuciones:
+#   python -m benchmarks.suite --escalas 1 10 100 --salida bench_$(git rev-parse --short HEAD).json
+#   python -m benchmarks.suite --comparar bench_a.json bench_b.json [--umbral 0.2]
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.carga import ejecutar_servidor, percentil
+from benchmarks.escalado import COPIAS, replica_cacheada
+from benchmarks.standin import url_sqlite
+
+APP_DIR = Path(__file__).resolve().parents[1]
+CACHE_REPLICAS = Path(tempfile.gettempdir()) / "api_consultas_bench"
+
+# La ruta /grafica de main.py consulta una tabla que no existe y las de
+# monitoreo.py no son de la API, así que no se miden.
+LECTURAS = [
+    ("GET", "/games/genre?genre=Sports"),
+    ("GET", "/games/year?year=2008&platform=Wii"),
+    ("GET", "/games/publisher-sales"),
+    ("GET", "/games/publisher-sales?format=columns"),
+    ("GET", "/games/platform-count"),
+    ("GET", "/games/top-release-year"),
+    ("GET", "/games/search?q=mario"),
+    ("GET", "/sales/query?group_by=genre,year&region_ids=1&year_from=2000&year_to=2010"),
+    ("GET", "/sales/query?group_by=publisher,platform&genre_ids=1&genre_ids=2&top=20"),
+    ("GET", "/games?limit=1000"),
+    ("GET", "/games/{id}"),
+    ("GET", "/Graficas_panda/ventas_por_genero"),
+    ("GET", "/Graficas_panda/ventas_por_plataforma"),
+    ("GET", "/Graficas_panda/ventas_por_año"),
+    ("GET", "/Tablas/tabla/publishers"),
+    ("GET", "/Tablas/tabla/platforms"),
+    ("GET", "/Tablas/tabla/genres"),
+    ("GET", "/Tablas/tabla/regions"),
+    ("GET", "/Tablas/tabla/games"),
+]
+
+ESCRITURAS = [
+    ("POST", "/games"),
+    ("PUT", "/games/{id}"),
+    ("DELETE", "/games/{id}"),
+    ("POST", "/games/bulk"),
+    ("PATCH", "/games/bulk"),
+    ("DELETE", "/games/bulk"),
+]
+
+BULK_FILAS = 100
+
+
+def peticion(metodo, plantilla, i, max_id):
+    """(url, cuerpo JSON) de la i-ésima petición a una ruta; siempre los mismos para el mismo i."""
+    juego = 1 + (i * 7919) % max_id
+    url = plantilla.replace("{id}", str(max_id - i if metodo == "DELETE" else juego))
+    nuevo = {"game_name": f"Bench {i}", "genre_id": 1 + i % 12}
+    if plantilla != "/games/bulk":
+        return url, nuevo if metodo in ("POST", "PUT") else None
+    if metodo == "POST":
+        return url, [dict(nuevo, game_name=f"Bench {i}-{j}") for j in range(BULK_FILAS)]
+    if metodo == "PATCH":
+        return url, [{"id": 1 + (juego + j) % max_id, "game_name": f"Bench {i}-{j}"} for j in range(BULK_FILAS)]
+    # Los DELETE sueltos empiezan por max_id; los masivos, por debajo de ellos
+    base = max_id - 10_000 - i * BULK_FILAS
+    return url, [{"id": base - j} for j in range(BULK_FILAS)]
+
+
+def resumen(latencias, duracion, errores):
+    return {
+        "peticiones": len(latencias),
+        "errores": errores,
+        "rps": round(len(latencias) / duracion, 2) if duracion else 0.0,
+        "media_ms": round(sum(latencias) / len(latencias) * 1000, 3) if latencias else 0.0,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 3),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 3),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 3),
+    }
+
+
+def por_ruta(modo, resultados, duracion):
+    """Filas de salida de una mezcla: una por ruta y una con el total (ruta "*")."""
+    rutas = {}
+    for clave, t, ok in resultados:
+        rutas.setdefault(clave, []).append((t, ok))
+    filas = [dict(modo=modo, metodo="*", ruta="*", **resumen([t for _, t, _ in resultados], duracion,
+                                                          sum(not ok for _, _, ok in resultados)))]
+    for (metodo, ruta), medidas in sorted(rutas.items()):
+        # En una mezcla las peticiones de una ruta se reparten por toda la duración
+        filas.append(dict(modo=modo, metodo=metodo, ruta=ruta,
+                          **resumen([t for t, _ in medidas], duracion, sum(not ok for _, ok in medidas))))
+    return filas
+
+
+def mezcla(n, semilla):
+    rng = random.Random(semilla)
+    return [rng.choice(LECTURAS) for _ in range(n)]
+
+
+# --- En proceso -------------------------------------------------------------
+
+async def _esperar_rollups(gestor, timeout=600):
+    limite = time.monotonic() + timeout
+    while gestor.activo and not gestor.listo and gestor.errores == 0 and time.monotonic() < limite:
+        await asyncio.sleep(0.1)
+
+
+async def _medir_ruta(cliente, metodo, plantilla, inicio_i, n, max_id):
+    latencias, errores = [], 0
+    inicio = time.perf_counter()
+    for i in range(inicio_i, inicio_i + n):
+        url, cuerpo = peticion(metodo, plantilla, i, max_id)
+        t = time.perf_counter()
+        resp = await cliente.request(metodo, url, json=cuerpo)
+        latencias.append(time.perf_counter() - t)
+        errores += resp.status_code >= 400
+    return latencias, time.perf_counter() - inicio, errores
+
+
+async def _medir_concurrente(cliente, peticiones, clientes, max_id):
+    resultados, pendientes = [], list(enumerate(peticiones))
+    pendientes.reverse()
+
+    async def trabajador():
+        while pendientes:
+            i, (metodo, plantilla) = pendientes.pop()
+            url, cuerpo = peticion(metodo, plantilla, i, max_id)
+            t = time.perf_counter()
+            resp = await cliente.request(metodo, url, json=cuerpo)
+            resultados.append(((metodo, plantilla), time.perf_counter() - t, resp.status_code < 400))
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(clientes)))
+    return resultados, time.perf_counter() - inicio
+
+
+async def _ejecutar_inproceso(args, max_id):
+    import httpx
+    from main import app
+    from rollups import gestor_rollups
+
+    filas = []
+    async with app.router.lifespan_context(app):
+        await _esperar_rollups(gestor_rollups)
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=None) as cliente:
+            if "secuencial" in args.modos:
+                for metodo, plantilla in LECTURAS:
+                    await _medir_ruta(cliente, metodo, plantilla, 0, args.calentamiento, max_id)
+                    latencias, duracion, errores = await _medir_ruta(
+                        cliente, metodo, plantilla, args.calentamiento, args.peticiones, max_id)
+                    filas.append(dict(modo="secuencial", metodo=metodo, ruta=plantilla,
+                                      **resumen(latencias, duracion, errores)))
+            if "concurrente" in args.modos:
+                await _medir_concurrente(cliente, mezcla(args.clientes * 2, args.semilla + 1), args.clientes, max_id)
+                resultados, duracion = await _medir_concurrente(
+                    cliente, mezcla(args.peticiones_carga, args.semilla), args.clientes, max_id)
+                filas += por_ruta("concurrente", resultados, duracion)
+            # Al final: modifican los datos que leen las demás rutas
+            if "escrituras" in args.modos:
+                for metodo, plantilla in ESCRITURAS:
+                    latencias, duracion, errores = await _medir_ruta(cliente, metodo, plantilla, 0, args.peticiones, max_id)
+                    filas.append(dict(modo="escrituras", metodo=metodo, ruta=plantilla,
+                                      **resumen(latencias, duracion, errores)))
+    return filas
+
+
+def inproceso(args):
+    """Proceso hijo: importa la API contra --db y escribe las filas medidas en --salida-interna."""
+    os.environ["DATABASE_URL"] = url_sqlite(args.db)
+    sys.path.insert(0, str(APP_DIR))
+    import database
+
+    # tables.py lee ./data al importarse
+    carpeta = Path(args.datos)
+    if not (carpeta / "data" / "region_sales.csv").exists():
+        database.extraer_tablas(database.tablas, str(carpeta / "data"))
+    os.chdir(carpeta)
+    filas = asyncio.run(_ejecutar_inproceso(args, args.max_id))
+    Path(args.salida_interna).write_text(json.dumps(filas))
+
+
+# --- HTTP ---------------------------------------------------------------------
+
+def _pedir_http(base, metodo, plantilla, i, max_id):
+    url, cuerpo = peticion(metodo, plantilla, i, max_id)
+    datos = None if cuerpo is None else json.dumps(cuerpo).encode()
+    req = urllib.request.Request(base + urllib.parse.quote(url, safe="/?=&"), data=datos, method=metodo,
+                                 headers={"Content-Type": "application/json"})
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=300) as resp:
+            resp.read()
+        ok = True
+    except urllib.error.HTTPError:
+        ok = False
+    return (metodo, plantilla), time.perf_counter() - inicio, ok
+
+
+def medir_http(base, args, max_id):
+    def lanzar(peticiones):
+        with ThreadPoolExecutor(max_workers=args.clientes) as pool:
+            return list(pool.map(lambda p: _pedir_http(base, p[1][0], p[1][1], p[0], max_id), enumerate(peticiones)))
+
+    lanzar(mezcla(args.clientes * 2, args.semilla + 1))  # calentamiento
+    inicio = time.perf_counter()
+    resultados = lanzar(mezcla(args.peticiones_carga, args.semilla))
+    return por_ruta("http", resultados, time.perf_counter() - inicio)
+
+
+# --- Orquestación -------------------------------------------------------------
+
+def _git(*comando):
+    try:
+        return subprocess.run(["git", *comando], cwd=APP_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _entorno(args):
+    env = dict(os.environ, PYTHONPATH=str(APP_DIR))
+    if not args.con_cache:
+        env.update(CACHE_TTL="0", GRAFICAS_CACHE_MAX="0")
+    return env
+
+
+def preparar(replica, tmp, env):
+    """Copia la réplica y le aplica las migraciones del árbol actual. Devuelve (db, filas, max_id)."""
+    db = Path(tmp) / "video_games.sqlite"
+    shutil.copyfile(replica, db)
+    subprocess.run([sys.executable, "migraciones.py", "aplicar"], cwd=APP_DIR, check=True,
+                   env=dict(env, DATABASE_URL=url_sqlite(db)), stdout=subprocess.DEVNULL)
+    conn = sqlite3.connect(db)
+    filas = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t, _ in COPIAS}
+    max_id = conn.execute("SELECT MAX(id) FROM game").fetchone()[0]
+    conn.close()
+    return db, filas, max_id
+
+
+def medir_escala(escala, args):
+    env = _entorno(args)
+    replica = replica_cacheada(args.cache, escala)
+    filas = []
+    with tempfile.TemporaryDirectory() as tmp:
+        inicio = time.perf_counter()
+        db, conteos, max_id = preparar(replica, tmp, env)
+        print(f"x{escala}: réplica lista en {time.perf_counter() - inicio:.1f} s {conteos}", file=sys.stderr)
+
+        # HTTP primero y las escrituras al final, para que todas las lecturas vean los mismos datos
+        if "http" in args.modos:
+            with ejecutar_servidor(db, tmp, args.port, env_extra=env) as base:
+                filas += medir_http(base, args, max_id)
+        modos = [m for m in args.modos if m != "http"]
+        if modos:
+            salida = Path(tmp) / "inproceso.json"
+            comando = [sys.executable, "-m", "benchmarks.suite", "--interno", "--db", str(db), "--datos", tmp,
+                       "--max-id", str(max_id), "--salida-interna", str(salida), "--modos", *modos,
+                       "--peticiones", str(args.peticiones), "--peticiones-carga", str(args.peticiones_carga),
+                       "--clientes", str(args.clientes), "--calentamiento", str(args.calentamiento),
+                       "--semilla", str(args.semilla)]
+            subprocess.run(comando, cwd=APP_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+            filas += json.loads(salida.read_text())
+    for fila in filas:
+        fila["escala"] = escala
+    return conteos, filas
+
+
+def ejecutar(args):
+    resultado = {
+        "commit": _git("rev-parse", "HEAD"),
+        "cambios_sin_commit": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {k: v for k, v in vars(args).items() if k in (
+            "escalas", "modos", "peticiones", "peticiones_carga", "clientes", "calentamiento", "semilla", "con_cache")},
+        "filas": {},
+        "resultados": [],
+    }
+    for escala in args.escalas:
+        conteos, filas = medir_escala(escala, args)
+        resultado["filas"][f"x{escala}"] = conteos
+        resultado["resultados"] += filas
+    return resultado
+
+
+def imprimir(resultado):
+    print(f"{'escala':>6} {'modo':<12}{'ruta':<46}{'n':>6}{'err':>5}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}",
+          file=sys.stderr)
+    for f in resultado["resultados"]:
+        ruta = f"{f['metodo']} {f['ruta']}" if f["ruta"] != "*" else "(total)"
+        print(f"{'x' + str(f['escala']):>6} {f['modo']:<12}{ruta:<46}{f['peticiones']:>6}{f['errores']:>5}"
+              f"{f['rps']:>10}{f['p50_ms']:>10}{f['p95_ms']:>10}{f['p99_ms']:>10}", file=sys.stderr)
+
+
+def comparar(antes, despues, umbral):
+    """Compara dos salidas; devuelve el número de filas cuyo p95 empeora más que `umbral`."""
+    clave = lambda f: (f["escala"], f["modo"], f["metodo"], f["ruta"])
+    base = {clave(f): f for f in antes["resultados"]}
+    print(f"{(antes['commit'] or '?')[:10]} -> {(despues['commit'] or '?')[:10]}")
+    print(f"{'escala':>6} {'modo':<12}{'ruta':<46}{'p50':>9}{'p95':>9}{'p99':>9}{'rps':>9}")
+    regresiones = 0
+    for f in despues["resultados"]:
+        a = base.get(clave(f))
+        if a is None:
+            continue
+        cambio = lambda k: (f[k] - a[k]) / a[k] if a[k] else 0.0
+        regresion = cambio("p95_ms") > umbral
+        regresiones += regresion
+        ruta = f"{f['metodo']} {f['ruta']}" if f["ruta"] != "*" else "(total)"
+        print(f"{'x' + str(f['escala']):>6} {f['modo']:<12}{ruta:<46}{cambio('p50_ms'):>+9.0%}{cambio('p95_ms'):>+9.0%}"
+              f"{cambio('p99_ms'):>+9.0%}{cambio('rps'):>+9.0%}{'  <-' if regresion else ''}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de todas las rutas sobre réplicas SQLite escaladas")
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--modos", nargs="+", default=["secuencial", "concurrente", "http", "escrituras"],
+                        choices=["secuencial", "concurrente", "http", "escrituras"])
+    parser.add_argument("--peticiones", type=int, default=30, help="peticiones por ruta en secuencial y escrituras")
+    parser.add_argument("--peticiones-carga", type=int, default=600, help="peticiones de la mezcla concurrente")
+    parser.add_argument("--clientes", type=int, default=16)
+    parser.add_argument("--calentamiento", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--con-cache", action="store_true", help="mantiene las cachés de resultados y de gráficas")
+    parser.add_argument("--cache", default=str(CACHE_REPLICAS), help="carpeta donde se guardan las réplicas escaladas")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto, stdout)")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DESPUES"))
+    parser.add_argument("--umbral", type=float, default=0.2, help="empeoramiento de p95 que cuenta como regresión")
+    # Uso interno: el proceso hijo que mide en proceso
+    parser.add_argument("--interno", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--datos", help=argparse.SUPPRESS)
+    parser.add_argument("--max-id", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--salida-interna", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        inproceso(args)
+        return
+    if args.comparar:
+        antes, despues = (json.loads(Path(p).read_text()) for p in args.comparar)
+        sys.exit(1 if comparar(antes, despues, args.umbral) else 0)
+
+    resultado = ejecutar(args)
+    imprimir(resultado)
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        Path(args.salida).write_text(texto)
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Benchmark de las tablas HTML: cadena de pd.merge (ruta anterior) frente a los
+# rollups de IndiceVentas. Comprueba además que ambos caminos dan lo mismo.
+#   python -m benchmarks.tablas --datos /ruta/que/contiene/data
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.standin import construir_sqlite, url_sqlite
+
+
+# Ruta anterior: los merges que hacían los endpoints de tables.py
+def publishers_merge(data):
+    merged = pd.merge(data['publisher'], data['game_publisher'], left_on='id', right_on='publisher_id')
+    merged = pd.merge(merged, data['game_platform'], left_on='id_y', right_on='game_publisher_id')
+    merged = pd.merge(merged, data['region_sales'], left_on='id', right_on='game_platform_id')
+    return merged.groupby('publisher_name')['num_sales'].sum().sort_values(ascending=False).head(20)
+
+
+def platforms_merge(data):
+    merged = pd.merge(data['platform'], data['game_platform'], left_on='id', right_on='platform_id')
+    merged = pd.merge(merged, data['region_sales'], left_on='id_y', right_on='game_platform_id')
+    return merged.groupby('platform_name')['num_sales'].sum().sort_values(ascending=False).head(20)
+
+
+def genres_merge(data):
+    step1 = pd.merge(data['genre'], data['game'], left_on='id', right_on='genre_id', suffixes=('_genre', '_game'))
+    step2 = pd.merge(step1, data['game_publisher'], left_on='id_game', right_on='game_id', suffixes=('_prev', '_gp'))
+    step3 = pd.merge(step2, data['game_platform'], left_on='id', right_on='game_publisher_id', suffixes=('_prev', '_gpl'))
+    final = pd.merge(step3, data['region_sales'], left_on='id_gpl', right_on='game_platform_id')
+    return final.groupby('genero')['num_sales'].sum().sort_values(ascending=False).head(20)
+
+
+def regions_merge(data):
+    merged = pd.merge(data['region_sales'], data['region'], left_on='region_id', right_on='id')
+    return merged.groupby('name')['num_sales'].sum().sort_values(ascending=False)
+
+
+CASOS = [
+    ('publishers', publishers_merge, 'publisher', 20),
+    ('platforms', platforms_merge, 'platform', 20),
+    ('genres', genres_merge, 'genre', 20),
+    ('regions', regions_merge, 'region', None),
+]
+
+
+def cargar(datos):
+    # tables.py lee ./data/*.csv al importarse
+    os.chdir(datos)
+    import tables
+    return tables.gestor_snapshot.actual().data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merges frente a IndiceVentas")
+    parser.add_argument("--datos", help="carpeta que contiene data/*.csv; si falta se genera desde los dumps")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        datos = args.datos
+        if datos is None:
+            os.environ["DATABASE_URL"] = url_sqlite(construir_sqlite(Path(tmp) / "vg.sqlite"))
+            import database
+            datos = tmp
+            database.extraer_tablas(database.tablas, str(Path(tmp) / "data"))
+        sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+        from indice_ventas import IndiceVentas
+        data = cargar(datos)
+
+        construccion = timeit.timeit(lambda: IndiceVentas(data), number=3) / 3
+        indice = IndiceVentas(data)
+        print(f"construcción del índice: {construccion * 1000:.1f} ms")
+        print(f"{'tabla':<12}{'merge ms':>12}{'índice ms':>12}{'x':>8}")
+        for nombre, anterior, dim, top in CASOS:
+            esperado = anterior(data)
+            obtenido = indice.ventas_por(dim, top=top)
+            assert list(esperado.index) == list(obtenido['nombre']), nombre
+            assert np.allclose(esperado.to_numpy(), obtenido['total'].to_numpy()), nombre
+            t_old = timeit.timeit(lambda: anterior(data), number=args.repeticiones) / args.repeticiones
+            t_new = timeit.timeit(lambda: indice.ventas_por(dim, top=top), number=args.repeticiones) / args.repeticiones
+            print(f"{nombre:<12}{t_old * 1000:>12.3f}{t_new * 1000:>12.3f}{t_old / t_new:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Benchmark del HTML de /Tablas: página completa con df.to_html (ruta anterior)
+# frente al streaming de tablas_html.py. Mide el tiempo hasta el primer trozo, el
+# tiempo total y el pico de memoria (tracemalloc) para tablas sintéticas de
+# distintos tamaños.
+#   python -m benchmarks.tablas_html [--filas 1000 10000 100000]
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def tabla_sintetica(filas):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "game_name": [f"Juego {i}" for i in range(filas)],
+        "total_sales": rng.random(filas) * 100,
+    })
+
+
+def html_anterior(df, titulo):
+    # Lo que hacía tables.generate_html_response
+    html = df.to_html(index=False, classes='table', border=0)
+    return f"<html><head><title>{titulo}</title></head><body><h2>{titulo}</h2>{html}</body></html>".encode()
+
+
+async def consumir(respuesta):
+    """(segundos hasta el primer trozo, bytes totales)."""
+    inicio = time.perf_counter()
+    primero, total = None, 0
+    async for trozo in respuesta.body_iterator:
+        if primero is None:
+            primero = time.perf_counter() - inicio
+        total += len(trozo)
+    return primero, total
+
+
+def medir(funcion):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcion()
+    duracion = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return resultado, duracion, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description="to_html frente a tablas_html en streaming")
+    parser.add_argument("--filas", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    from starlette.requests import Request
+    from tablas_html import ParametrosTabla, tabla_html
+
+    request = Request({"type": "http", "path": "/Tablas/tabla/games", "query_string": b"", "headers": []})
+    print(f"{'filas':>8}{'antes 1er byte ms':>19}{'antes MB':>10}"
+          f"{'ahora 1er byte ms':>19}{'ahora total ms':>16}{'ahora MB':>10}")
+    for filas in args.filas:
+        df = tabla_sintetica(filas)
+        _, t_antes, pico_antes = medir(lambda: html_anterior(df, "Ventas por Juego"))
+        parametros = ParametrosTabla(page=1, page_size=0, sort="total_sales", order="desc")
+        (primero, _), t_ahora, pico_ahora = medir(
+            lambda: asyncio.run(consumir(tabla_html(request, df, "Ventas por Juego", parametros))))
+        # Sin streaming el primer byte sale cuando la página entera está hecha
+        print(f"{filas:>8}{t_antes * 1000:>19.1f}{pico_antes / 2**20:>10.1f}"
+              f"{primero * 1000:>19.1f}{t_ahora * 1000:>16.1f}{pico_ahora / 2**20:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
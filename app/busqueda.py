@@ -0,0 +1,373 @@
+# busqueda.py
+# Índices de búsqueda en memoria:
+# - términos de género y plataforma -> ids, con n-gramas sobre las tablas de
+#   dimensión, para filtrar con "IN (ids)" en lugar de LIKE '%term%';
+# - índice invertido de nombres de juego para /games/search.
+import os
+import re
+import math
+import time
+import heapq
+import bisect
+import asyncio
+import itertools
+import unicodedata
+from collections import Counter, defaultdict
+
+from database import consultar, en_hilo
+from cache import generaciones
+
+DIMENSIONES_TTL = float(os.getenv('DIMENSIONES_TTL', '300'))
+
+# dimensión -> (tabla, columna con el nombre)
+DIMENSIONES = {
+    'genre': ('genre', 'genre_name'),
+    'platform': ('platform', 'platform_name'),
+}
+
+
+def normalizar(texto):
+    return (texto or "").casefold()
+
+
+def ngramas(texto, n):
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+
+class IndiceNgramas:
+    """Índice de 1, 2 y 3-gramas con la misma semántica que LIKE '%term%' (sin mayúsculas)."""
+
+    N = 3
+
+    def __init__(self, filas):
+        self.nombres = {id_: normalizar(nombre) for id_, nombre in filas}
+        self._postings = defaultdict(set)
+        for id_, nombre in self.nombres.items():
+            for n in range(1, self.N + 1):
+                for gram in ngramas(nombre, n):
+                    self._postings[gram].add(id_)
+
+    def buscar(self, termino):
+        """Ids cuyo nombre contiene `termino`, ordenados."""
+        termino = normalizar(termino)
+        if not termino:
+            return sorted(self.nombres)
+        if len(termino) <= self.N:
+            return sorted(self._postings.get(termino, ()))
+        # Intersección de los trigramas del término y verificación final
+        grams = sorted(ngramas(termino, self.N), key=lambda g: len(self._postings.get(g, ())))
+        candidatos = set(self._postings.get(grams[0], ()))
+        for gram in grams[1:]:
+            candidatos &= self._postings.get(gram, set())
+            if not candidatos:
+                break
+        return sorted(id_ for id_ in candidatos if termino in self.nombres[id_])
+
+
+class ResolutorDimensiones:
+    """Carga genre y platform bajo demanda y los recarga cada DIMENSIONES_TTL segundos
+    o cuando algún worker invalida su tabla (cache.generaciones)."""
+
+    def __init__(self, ttl=DIMENSIONES_TTL):
+        self.ttl = ttl
+        self._indices = {}  # dimensión -> (cargado_en, IndiceNgramas, generación de la tabla)
+        self._locks = defaultdict(asyncio.Lock)
+
+    def _vigente(self, entrada, tabla):
+        return (entrada is not None and time.monotonic() - entrada[0] <= self.ttl
+                and generaciones.leer((tabla,)) == entrada[2])
+
+    async def indice(self, dimension) -> IndiceNgramas:
+        tabla, columna = DIMENSIONES[dimension]
+        entrada = self._indices.get(dimension)
+        if not self._vigente(entrada, tabla):
+            async with self._locks[dimension]:
+                entrada = self._indices.get(dimension)
+                if not self._vigente(entrada, tabla):
+                    marca = generaciones.leer((tabla,))
+                    filas = await consultar(f"SELECT id, {columna} AS nombre FROM {tabla}")
+                    entrada = (time.monotonic(), IndiceNgramas((f["id"], f["nombre"]) for f in filas), marca)
+                    self._indices[dimension] = entrada
+        return entrada[1]
+
+    async def resolver(self, dimension, termino):
+        return (await self.indice(dimension)).buscar(termino)
+
+    def invalidar(self, dimension=None):
+        if dimension is None:
+            self._indices.clear()
+        else:
+            self._indices.pop(dimension, None)
+
+
+resolutor = ResolutorDimensiones()
+
+
+# Búsqueda de texto completo sobre game.game_name
+TOKEN = re.compile(r"\w+")
+
+
+def tokenizar(texto):
+    # Sin acentos: "pokemon" tiene que encontrar "Pokémon"
+    texto = unicodedata.normalize("NFKD", normalizar(texto))
+    return TOKEN.findall("".join(c for c in texto if not unicodedata.combining(c)))
+
+
+def _trigramas_token(token):
+    return ngramas(f"${token}$", 3)
+
+
+def _borrados(token):
+    """El token y sus variantes con una letra menos."""
+    return {token} | {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def distancia_edicion(a, b, maximo):
+    """Distancia de Levenshtein entre a y b, o maximo + 1 si es mayor que maximo."""
+    fuera = maximo + 1
+    if abs(len(a) - len(b)) > maximo:
+        return fuera
+    # El prefijo y el sufijo comunes no cuentan
+    i = 0
+    while i < len(a) and i < len(b) and a[i] == b[i]:
+        i += 1
+    a, b = a[i:], b[i:]
+    while a and b and a[-1] == b[-1]:
+        a, b = a[:-1], b[:-1]
+    if not a or not b:
+        return len(a) + len(b) if len(a) + len(b) <= maximo else fuera
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        # Fuera de la banda |i - j| <= maximo la distancia ya supera el límite
+        desde, hasta = max(1, i - maximo), min(len(b), i + maximo)
+        actual = [fuera] * (len(b) + 1)
+        if desde == 1:
+            actual[0] = i
+        mejor = actual[0]
+        for j in range(desde, hasta + 1):
+            coste = anterior[j - 1] + (ca != b[j - 1])
+            if anterior[j] + 1 < coste:
+                coste = anterior[j] + 1
+            if actual[j - 1] + 1 < coste:
+                coste = actual[j - 1] + 1
+            actual[j] = coste
+            if coste < mejor:
+                mejor = coste
+        if mejor > maximo:
+            return fuera
+        anterior = actual
+    return anterior[-1] if anterior[-1] <= maximo else fuera
+
+
+class IndiceJuegos:
+    """Índice invertido de nombres de juego con tolerancia a errores tipográficos.
+
+    Cada término de la consulta se expande a los tokens del vocabulario que
+    coinciden exactamente, que empiezan por él (para buscar mientras se escribe)
+    o que se le parecen (errores de tecleo): los candidatos son los tokens que
+    comparten una variante con una letra menos y los que más trigramas comparten,
+    y se aceptan los que están a una distancia de edición corta o tienen muchos
+    trigramas en común. La puntuación suma, por término, el mejor peso de cada
+    juego multiplicado por el idf del término.
+    """
+
+    SIMILITUD_MINIMA = 0.4
+    # Ediciones toleradas: 1 en términos de hasta 4 letras, 2 en los más largos
+    EDICIONES_MAXIMAS = ((4, 1), (None, 2))
+    # Además de los vecinos con una letra menos, candidatos por trigramas comunes a los
+    # que se calcula la distancia de edición
+    CANDIDATOS_EDICION = 16
+
+    def __init__(self, filas=()):
+        self.nombres = {}                     # id -> nombre original
+        self._tokens_doc = {}                 # id -> tokens
+        self._frases = {}                     # id -> nombre tokenizado, para el desempate
+        self._postings = defaultdict(set)     # token -> ids
+        self._trigramas = defaultdict(set)    # trigrama -> tokens del vocabulario
+        self._variantes = defaultdict(set)    # token con una letra menos -> tokens del vocabulario
+        self._vocabulario = []                # tokens ordenados, para prefijos
+        for id_, nombre in filas:
+            self.agregar(id_, nombre)
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def agregar(self, id_, nombre):
+        if id_ in self.nombres:
+            self.eliminar(id_)
+        lista = tokenizar(nombre)
+        tokens = set(lista)
+        self.nombres[id_] = nombre
+        self._frases[id_] = " ".join(lista)
+        self._tokens_doc[id_] = tokens
+        for token in tokens:
+            if token not in self._postings:
+                bisect.insort(self._vocabulario, token)
+                for gram in _trigramas_token(token):
+                    self._trigramas[gram].add(token)
+                for variante in _borrados(token):
+                    self._variantes[variante].add(token)
+            self._postings[token].add(id_)
+
+    def eliminar(self, id_):
+        if id_ not in self.nombres:
+            return
+        del self.nombres[id_]
+        del self._frases[id_]
+        for token in self._tokens_doc.pop(id_):
+            docs = self._postings[token]
+            docs.discard(id_)
+            if not docs:
+                del self._postings[token]
+                del self._vocabulario[bisect.bisect_left(self._vocabulario, token)]
+                for gram in _trigramas_token(token):
+                    self._trigramas[gram].discard(token)
+                for variante in _borrados(token):
+                    self._variantes[variante].discard(token)
+
+    actualizar = agregar
+
+    def _expandir(self, termino, es_ultimo):
+        """{token del vocabulario: peso} para un término de la consulta."""
+        pesos = {}
+        if termino in self._postings:
+            pesos[termino] = 1.0
+        if es_ultimo:
+            i = bisect.bisect_left(self._vocabulario, termino)
+            for token in itertools.islice(self._vocabulario, i, i + 50):
+                if not token.startswith(termino):
+                    break
+                pesos.setdefault(token, 0.9)
+        if not pesos and len(termino) >= 3:
+            grams = _trigramas_token(termino)
+            comunes = Counter(itertools.chain.from_iterable(self._trigramas.get(gram, ()) for gram in grams))
+            maximo = next(e for largo, e in self.EDICIONES_MAXIMAS if largo is None or len(termino) <= largo)
+            # Candidatos para la distancia de edición: los que comparten una variante con
+            # una letra menos (toda edición simple y las letras cambiadas de sitio) y los
+            # que más trigramas comparten. Cada edición rompe como mucho 3 trigramas, así
+            # que a `maximo` ediciones se comparten al menos len(grams) - 3*maximo
+            candidatos = set()
+            for variante in _borrados(termino):
+                candidatos.update(self._variantes.get(variante, ()))
+            minimo = len(grams) - 3 * maximo
+            cercanos = 0
+            # Los empates, en orden alfabético (el orden de los sets cambia entre procesos)
+            for token in sorted(sorted(comunes), key=comunes.get, reverse=True):
+                if comunes[token] < minimo or cercanos == self.CANDIDATOS_EDICION:
+                    break
+                if abs(len(token) - len(termino)) <= maximo:
+                    candidatos.add(token)
+                    cercanos += 1
+            for token in candidatos:
+                ediciones = distancia_edicion(termino, token, maximo)
+                if ediciones <= maximo:
+                    # "zelada" -> "zelda" comparte pocos trigramas pero está a una edición
+                    n = comunes.get(token, 0)
+                    pesos[token] = 0.7 * max(n / (len(grams) + len(token) - n), 1 - ediciones / max(len(termino), len(token)))
+            for token, n in comunes.items():
+                similitud = n / (len(grams) + len(token) - n)  # Jaccard de trigramas
+                if similitud >= self.SIMILITUD_MINIMA:
+                    pesos[token] = max(pesos.get(token, 0.0), 0.7 * similitud)
+        return pesos
+
+    def buscar(self, consulta, limite=20):
+        """Lista de (id, nombre, puntuación) ordenada por relevancia."""
+        terminos = tokenizar(consulta)
+        if not terminos:
+            return []
+        total = len(self.nombres) or 1
+        puntuaciones = {}
+        for posicion, termino in enumerate(terminos):
+            expansiones = self._expandir(termino, posicion == len(terminos) - 1)
+            # El idf es el del término de la consulta (todas sus expansiones juntas),
+            # así un prefijo raro como "mar" no gana a "mario" por ser exacto
+            documentos = len(set().union(*(self._postings[token] for token in expansiones)))
+            if not documentos:
+                continue
+            idf = math.log(1 + total / documentos)
+            # De menor a mayor peso: cada juego se queda con su mejor expansión
+            mejores = {}
+            for token, peso in sorted(expansiones.items(), key=lambda kv: kv[1]):
+                mejores.update(dict.fromkeys(self._postings[token], peso * idf))
+            # Se suma el diccionario pequeño sobre el grande ("of", "the" tienen miles de juegos)
+            if len(mejores) > len(puntuaciones):
+                puntuaciones, mejores = mejores, puntuaciones
+            for id_, peso in mejores.items():
+                puntuaciones[id_] = puntuaciones.get(id_, 0.0) + peso
+        # Desempate entre los mejores: el nombre que empieza por la consulta o la contiene
+        frase = " ".join(terminos)
+        candidatos = [(id_, p + self._bonus(id_, frase)) for id_, p in self._mejores(puntuaciones, limite * 4)]
+        candidatos.sort(key=lambda kv: (-kv[1], kv[0]))
+        return [(id_, self.nombres[id_], round(p, 4)) for id_, p in candidatos[:limite]]
+
+    @staticmethod
+    def _mejores(puntuaciones, k):
+        """Las k puntuaciones más altas; en los empates, los ids más bajos."""
+        if len(puntuaciones) <= k:
+            return list(puntuaciones.items())
+        # Ordenar solo los valores es mucho más rápido que un nlargest con clave por elemento
+        corte = sorted(puntuaciones.values(), reverse=True)[k - 1]
+        arriba = [(id_, p) for id_, p in puntuaciones.items() if p > corte]
+        empatados = sorted([id_ for id_, p in puntuaciones.items() if p == corte])[:k - len(arriba)]
+        return arriba + [(id_, corte) for id_ in empatados]
+
+    def _bonus(self, id_, frase):
+        nombre = self._frases[id_]
+        if nombre.startswith(frase):
+            return 1.0
+        return 0.5 if frase in nombre else 0.0
+
+
+class GestorIndiceJuegos:
+    """Construye el índice de juegos bajo demanda y lo mantiene al día con las escrituras de crud.py.
+
+    Con varios workers (prefork.py) cada uno tiene su índice: si otro worker
+    escribió en game desde que se construyó, se reconstruye en la siguiente búsqueda.
+    """
+
+    def __init__(self):
+        self._indice = None
+        self._lock = None
+        self._marca = ()
+
+    @property
+    def cargado(self):
+        return self._indice is not None
+
+    async def indice(self) -> IndiceJuegos:
+        if self._indice is not None and generaciones.leer(("indice_juegos",)) != self._marca:
+            self._indice = None
+        if self._indice is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self._indice is None:
+                    marca = generaciones.leer(("indice_juegos",))
+                    filas = await consultar("SELECT id, game_name FROM game")
+                    self._indice = await en_hilo(lambda: IndiceJuegos((f["id"], f["game_name"]) for f in filas))
+                    self._marca = marca
+        return self._indice
+
+    def _publicar(self):
+        # Si nadie más había escrito, este índice sigue al día tras su propia escritura
+        antes, despues = generaciones.incrementar("indice_juegos")
+        if antes == self._marca:
+            self._marca = despues
+
+    # Las escrituras solo tocan el índice si ya está construido
+    def agregar(self, id_, nombre):
+        if self._indice is not None:
+            self._indice.agregar(id_, nombre)
+        self._publicar()
+
+    def eliminar(self, id_):
+        if self._indice is not None:
+            self._indice.eliminar(id_)
+        self._publicar()
+
+    def invalidar(self):
+        self._indice = None
+        generaciones.incrementar("indice_juegos")
+
+
+indice_juegos = GestorIndiceJuegos()
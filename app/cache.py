@@ -0,0 +1,154 @@
+# cache.py
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from coalescencia import Coalescedor
+
+# Configuración de la caché de resultados
+CACHE_TTL = float(os.getenv('CACHE_TTL', '300'))
+CACHE_MAX_ENTRADAS = int(os.getenv('CACHE_MAX_ENTRADAS', '256'))
+
+
+class GeneracionesCompartidas:
+    """Contadores de escrituras por tabla compartidos entre los workers de prefork.py.
+
+    El proceso maestro llama a `activar()` antes de hacer fork; cada escritura
+    incrementa el contador de sus tablas y los demás workers comparan con el
+    valor que vieron al cachear. En un solo proceso no hacen nada.
+    """
+
+    def __init__(self, nombres):
+        self._indices = {n: i for i, n in enumerate(nombres)}
+        self._valores = None
+
+    @property
+    def activas(self):
+        return self._valores is not None
+
+    def activar(self):
+        import multiprocessing
+        self._valores = multiprocessing.Array('q', len(self._indices))
+
+    def leer(self, nombres):
+        if self._valores is None:
+            return ()
+        return tuple(self._valores[self._indices[n]] for n in nombres if n in self._indices)
+
+    def incrementar(self, *nombres):
+        """Suma 1 a cada nombre; devuelve (antes, después) de sus contadores."""
+        if self._valores is None:
+            return (), ()
+        with self._valores.get_lock():
+            antes = self.leer(nombres)
+            for n in nombres:
+                if n in self._indices:
+                    self._valores[self._indices[n]] += 1
+            return antes, self.leer(nombres)
+
+
+# Tablas de la base de datos, rollup_ventas y el índice de búsqueda de juegos
+generaciones = GeneracionesCompartidas(['genre', 'game', 'game_platform', 'game_publisher', 'platform', 'publisher',
+                                        'region', 'region_sales', 'rollup_ventas', 'indice_juegos'])
+
+
+class CacheResultados:
+    """Caché LRU con TTL para resultados de consultas agregadas.
+
+    Cada entrada recuerda de qué tablas depende; al escribir en una tabla se
+    invalidan solo las entradas que la usan. Los fallos simultáneos de una
+    misma clave esperan a un único cálculo (coalescencia.py).
+    """
+
+    def __init__(self, max_entradas=CACHE_MAX_ENTRADAS, ttl=CACHE_TTL):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._entradas = OrderedDict()  # clave -> (expira, tablas, valor, generaciones de las tablas)
+        self._lock = threading.Lock()
+        self._generacion = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidaciones = 0
+        self.coalescedor = Coalescedor("resultados")
+
+    @staticmethod
+    def clave(endpoint, params=None):
+        return (endpoint, tuple(sorted((params or {}).items())))
+
+    def obtener(self, clave):
+        """Devuelve (True, valor) si la entrada existe y no ha caducado."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            # Con varios workers, otro proceso pudo escribir en alguna de sus tablas
+            if entrada is not None and entrada[0] > time.monotonic() and generaciones.leer(entrada[1]) == entrada[3]:
+                self._entradas.move_to_end(clave)
+                self.hits += 1
+                return True, entrada[2]
+            if entrada is not None:
+                del self._entradas[clave]
+            self.misses += 1
+            return False, None
+
+    def guardar(self, clave, valor, tablas, ttl=None, generacion=None, marca=None):
+        tablas = tuple(sorted(set(tablas)))
+        with self._lock:
+            # Si hubo una invalidación mientras se calculaba, el valor puede estar obsoleto
+            if generacion is not None and generacion != self._generacion:
+                return
+            expira = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self._entradas[clave] = (expira, tablas, valor, generaciones.leer(tablas) if marca is None else marca)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    async def obtener_o_calcular(self, endpoint, params, tablas, calcular, ttl=None):
+        """Devuelve el valor cacheado o ejecuta `await calcular()` y lo guarda."""
+        clave = self.clave(endpoint, params)
+        encontrado, valor = self.obtener(clave)
+        if encontrado:
+            return valor
+
+        generacion = self._generacion
+        marca = generaciones.leer(sorted(set(tablas)))
+
+        async def _calcular():
+            valor = await calcular()
+            self.guardar(clave, valor, tablas, ttl=ttl, generacion=generacion, marca=marca)
+            return valor
+        # Tras una invalidación la generación cambia: quien llega después de una
+        # escritura no se une al cálculo que empezó antes y ve los datos nuevos
+        return await self.coalescedor.ejecutar(clave + (generacion, marca), _calcular)
+
+    def invalidar(self, *tablas):
+        """Elimina las entradas que dependen de alguna de las tablas indicadas."""
+        tablas = set(tablas)
+        generaciones.incrementar(*tablas)
+        with self._lock:
+            self._generacion += 1
+            afectadas = [c for c, entrada in self._entradas.items() if tablas.intersection(entrada[1])]
+            for c in afectadas:
+                del self._entradas[c]
+            self.invalidaciones += len(afectadas)
+
+    def limpiar(self):
+        with self._lock:
+            self._generacion += 1
+            self._entradas.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / consultas, 4) if consultas else 0.0,
+                "invalidaciones": self.invalidaciones,
+            }
+
+
+# Caché compartida por routes.py y visualizations.py
+cache_resultados = CacheResultados()
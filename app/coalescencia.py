@@ -0,0 +1,75 @@
+# coalescencia.py
+# Coalescencia de peticiones (single-flight): las peticiones idénticas que
+# llegan mientras otra igual se está calculando esperan a ese cálculo y
+# comparten su resultado (o su excepción) en lugar de repetirlo.
+#
+# El cálculo corre en su propia tarea: si la petición que lo lanzó se cancela
+# o deja de esperar, las demás siguen recibiendo el resultado. Cada petición
+# espera como mucho COALESCENCIA_TIMEOUT segundos (0 = sin límite).
+#
+# La clave tiene que identificar también la versión de los datos (cache.py
+# añade la generación de las tablas): si no, una petición posterior a una
+# escritura se uniría a un cálculo empezado antes y recibiría datos viejos.
+import os
+import asyncio
+
+COALESCENCIA_TIMEOUT = float(os.getenv('COALESCENCIA_TIMEOUT', '30'))
+
+# Todos los coalescedores, para /coalescencia y /metrics
+COALESCEDORES = {}
+
+
+class Coalescedor:
+    """Un cálculo en curso por clave; las peticiones repetidas esperan a ese."""
+
+    def __init__(self, nombre, timeout=COALESCENCIA_TIMEOUT):
+        self.nombre = nombre
+        self.timeout = timeout
+        self._vuelos = {}  # clave -> tarea en curso
+        self.ejecuciones = 0
+        self.compartidas = 0  # ejecuciones duplicadas evitadas
+        self.errores = 0
+        self.timeouts = 0
+        COALESCEDORES[nombre] = self
+
+    def _terminar(self, clave, tarea):
+        if self._vuelos.get(clave) is tarea:
+            del self._vuelos[clave]
+        # Recoge la excepción aunque ya nadie espere (sin avisos de "never retrieved")
+        if not tarea.cancelled() and tarea.exception() is not None:
+            self.errores += 1
+
+    async def ejecutar(self, clave, calcular, timeout=None):
+        """Devuelve `await calcular()`, compartiendo el cálculo con las peticiones con la misma clave."""
+        tarea = self._vuelos.get(clave)
+        if tarea is None or tarea.get_loop() is not asyncio.get_running_loop():
+            tarea = asyncio.ensure_future(calcular())
+            self._vuelos[clave] = tarea
+            tarea.add_done_callback(lambda t: self._terminar(clave, t))
+            self.ejecuciones += 1
+        else:
+            self.compartidas += 1
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            # shield: el timeout o la cancelación de una petición no cancelan el cálculo compartido
+            return await asyncio.wait_for(asyncio.shield(tarea), timeout if timeout > 0 else None)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise TimeoutError(f"{self.nombre}: sin resultado para {clave[0] if isinstance(clave, tuple) else clave} "
+                               f"tras {timeout:g} s") from None
+
+    def estadisticas(self):
+        peticiones = self.ejecuciones + self.compartidas
+        return {
+            "en_curso": len(self._vuelos),
+            "ejecuciones": self.ejecuciones,
+            "compartidas": self.compartidas,
+            "ratio_compartidas": round(self.compartidas / peticiones, 4) if peticiones else 0.0,
+            "errores": self.errores,
+            "timeouts": self.timeouts,
+            "timeout_s": self.timeout,
+        }
+
+
+def estadisticas():
+    return {nombre: c.estadisticas() for nombre, c in COALESCEDORES.items()}
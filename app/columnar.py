@@ -0,0 +1,106 @@
+# columnar.py
+# Formato columnar binario para el snapshot: un .npy por columna y un _esquema.json
+# por tabla. Los .npy se abren con mmap, así que varios workers comparten la misma
+# copia en la caché de páginas del sistema y no hay que parsear texto al arrancar.
+#
+# numpy y pandas se importan al usarlos: tables.py importa este módulo al
+# arrancar la API y no debe cargarlos (arranque.py).
+import os
+import json
+import shutil
+
+CARPETA_COLUMNAR = "columnar"
+ARCHIVO_ESQUEMA = "_esquema.json"
+
+
+def _columna(serie: "pd.Series", dtype: str) -> "np.ndarray":
+    import numpy as np
+    if dtype.startswith("int"):
+        # Una columna entera con NULL no cabe en int32: se guarda como float64 con NaN
+        if serie.isna().any():
+            return serie.to_numpy(dtype="float64", na_value=np.nan)
+        return serie.to_numpy(dtype=dtype)
+    if dtype == "str":
+        # Texto de ancho fijo (mapeable); un NULL se guarda como cadena vacía
+        valores = serie.fillna("").astype(str).to_numpy()
+        ancho = max(1, max((len(v) for v in valores), default=1))
+        return valores.astype(f"U{ancho}")
+    return serie.to_numpy(dtype=dtype, na_value=np.nan)
+
+
+def publicar_directorio(temporal, destino):
+    """Sustituye `destino` por `temporal` con renombrados, sin dejar nunca una tabla a medias."""
+    anterior = os.path.join(os.path.dirname(destino), f".{os.path.basename(destino)}.old")
+    shutil.rmtree(anterior, ignore_errors=True)
+    if os.path.exists(destino):
+        os.replace(destino, anterior)
+    os.replace(temporal, destino)
+    shutil.rmtree(anterior, ignore_errors=True)
+
+
+class EscritorTabla:
+    """Escribe una tabla por bloques en <carpeta>/columnar/<tabla>/.
+
+    Cada bloque se convierte enseguida a arrays tipados, así que no hace falta
+    tener la tabla entera como DataFrame. Todo se escribe en una carpeta
+    temporal que se publica al cerrar.
+    """
+
+    def __init__(self, carpeta, tabla, dtypes):
+        base = os.path.join(carpeta, CARPETA_COLUMNAR)
+        self.destino = os.path.join(base, tabla)
+        self.temporal = os.path.join(base, f".{tabla}.tmp")
+        self.dtypes = dtypes
+        self.filas = 0
+        self._bloques = {}  # columna -> [arrays]
+        shutil.rmtree(self.temporal, ignore_errors=True)
+        os.makedirs(self.temporal)
+
+    def agregar(self, df: "pd.DataFrame"):
+        for nombre in df.columns:
+            self._bloques.setdefault(nombre, []).append(_columna(df[nombre], self.dtypes.get(nombre, "float64")))
+        self.filas += len(df)
+
+    def cerrar(self):
+        import numpy as np
+        esquema = {"filas": self.filas, "columnas": {}}
+        for nombre, bloques in self._bloques.items():
+            # np.concatenate unifica anchos de texto y pasa a float64 si algún bloque tenía NULL
+            array = np.concatenate(bloques)
+            np.save(os.path.join(self.temporal, f"{nombre}.npy"), array, allow_pickle=False)
+            esquema["columnas"][nombre] = array.dtype.str
+        self._bloques.clear()
+        with open(os.path.join(self.temporal, ARCHIVO_ESQUEMA), "w") as f:
+            json.dump(esquema, f)
+        publicar_directorio(self.temporal, self.destino)
+        return self.destino
+
+    def abortar(self):
+        shutil.rmtree(self.temporal, ignore_errors=True)
+
+
+def escribir_tabla(df: "pd.DataFrame", carpeta, tabla, dtypes):
+    """Escribe `df` completo en <carpeta>/columnar/<tabla>/ con los dtypes indicados."""
+    escritor = EscritorTabla(carpeta, tabla, dtypes)
+    escritor.agregar(df)
+    return escritor.cerrar()
+
+
+def leer_tabla(carpeta, tabla, mmap=True) -> "pd.DataFrame":
+    """Carga una tabla columnar; con mmap las columnas numéricas no se copian."""
+    import numpy as np
+    import pandas as pd
+    ruta = os.path.join(carpeta, CARPETA_COLUMNAR, tabla)
+    with open(os.path.join(ruta, ARCHIVO_ESQUEMA)) as f:
+        esquema = json.load(f)
+    columnas = {
+        nombre: np.load(os.path.join(ruta, f"{nombre}.npy"), mmap_mode="r" if mmap else None, allow_pickle=False)
+        for nombre in esquema["columnas"]
+    }
+    # copy=False mantiene las columnas sobre el mmap en lugar de consolidarlas en memoria propia
+    return pd.DataFrame(columnas, copy=False)
+
+
+def disponible(carpeta, tablas) -> bool:
+    base = os.path.join(carpeta, CARPETA_COLUMNAR)
+    return all(os.path.exists(os.path.join(base, t, ARCHIVO_ESQUEMA)) for t in tablas)
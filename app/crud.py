@@ -1,120 +1,308 @@
 import os
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from sqlalchemy import create_engine, text
+import json
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import bindparam, text
+from database import engine, en_hilo, consultar, leer_filas, insertar, columnas_tabla, registrar_consulta
+from cache import cache_resultados
+from busqueda import indice_juegos
+from rollups import gestor_rollups
+from respuestas import RespuestaJSON, registros, dumps
 
 
 
-# Conexión a base de datos
-MYSQL_HOST = os.getenv('MYSQL_HOST', 'mysql')
-MYSQL_USER = os.getenv('MYSQL_USER', 'user')
-MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', 'password')
-MYSQL_DB = os.getenv('MYSQL_DB', 'video_games')
-
-engine = create_engine(f'mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}')
-
 # Crear un router para el CRUD
 router = APIRouter()
 
 # Modelos de datos (Pydantic) para entrada de datos
+# Solo columnas de game (database_game/02_game.sql): el publisher y el año de
+# lanzamiento están en game_publisher y game_platform
 class GameCreate(BaseModel):
     game_name: str
     genre_id: int
-    publisher_id: int
-    release_year: int
 
 class GameUpdate(BaseModel):
     game_name: str | None = None
     genre_id: int | None = None
-    publisher_id: int | None = None
-    release_year: int | None = None
+
+class GameBulkUpdate(GameUpdate):
+    id: int
+
+class GameBulkDelete(BaseModel):
+    id: int
+
+# Filas por executemany (y por transacción) en los endpoints /games/bulk
+BULK_CHUNK = int(os.getenv('BULK_CHUNK', '500'))
+
+INSERT_GAME = """
+    INSERT INTO game (game_name, genre_id)
+    VALUES (:game_name, :genre_id)
+    """
+
+UPDATE_GAME = """
+    UPDATE game
+    SET game_name = COALESCE(:game_name, game_name),
+        genre_id = COALESCE(:genre_id, genre_id)
+    WHERE id = :game_id
+    """
+
+DELETE_GAME = "DELETE FROM game WHERE id = :game_id"
+
+SELECT_GAME = "SELECT * FROM game WHERE id = :game_id"
+
+# Formas que toman las lecturas de crud.py, para el revisor de planes (migraciones.py)
+registrar_consulta("/games/{game_id}", SELECT_GAME, {"game_id": 1})
+registrar_consulta("/games?after_id", "SELECT id, game_name FROM game WHERE id > :after_id ORDER BY id LIMIT :limit",
+                   {"after_id": 1000, "limit": 100})
 
 # Crear juego
 @router.post("/games", tags=["?"])
 async def create_game(game: GameCreate):
-    query = """
-    INSERT INTO game (game_name, genre_id, publisher_id, release_year)
-    VALUES (:game_name, :genre_id, :publisher_id, :release_year)
-    """
+    query = INSERT_GAME
     try:
-        with engine.begin() as conn:
-            conn.execute(text(query), {
-                "game_name": game.game_name,
-                "genre_id": game.genre_id,
-                "publisher_id": game.publisher_id,
-                "release_year": game.release_year
-            })
-            return {"message": "Game created successfully!"}
+        game_id = await insertar(query, {
+            "game_name": game.game_name,
+            "genre_id": game.genre_id
+        })
+        cache_resultados.invalidar("game")
+        indice_juegos.agregar(game_id, game.game_name)
+        return {"message": "Game created successfully!"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating game: {e}")
 
 
 
 # Obtener todos los juegos
+# Paginación por cursor: ?limit=100 y después ?after_id=<next_cursor> (orden por id).
+# ?fields=id,game_name selecciona solo esas columnas; ?stream=true devuelve NDJSON
+# fila a fila desde un cursor del lado del servidor, con memoria constante.
 @router.get("/games", tags=["Consultas"])
-async def get_all_games():
-    query = "SELECT * FROM game"
+async def get_all_games(
+    limit: int | None = Query(None, ge=1, le=10000),
+    after_id: int | None = None,
+    fields: str | None = None,
+    stream: bool = False,
+):
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text(query))
-            games = [dict(row._mapping) for row in result]
-            return {"games": games}
+        columnas = await columnas_tabla("game")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching games: {e}")
+
+    seleccion = columnas
+    if fields:
+        seleccion = [f.strip() for f in fields.split(",") if f.strip()]
+        desconocidas = [f for f in seleccion if f not in columnas]
+        if desconocidas:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(desconocidas)}")
+        if "id" not in seleccion:
+            seleccion = ["id"] + seleccion  # el cursor necesita el id
+
+    query = f"SELECT {', '.join(seleccion)} FROM game"
+    params = {}
+    if after_id is not None:
+        query += " WHERE id > :after_id"
+        params["after_id"] = after_id
+    query += " ORDER BY id"
+    if limit is not None:
+        query += " LIMIT :limit"
+        params["limit"] = limit
+
+    if stream:
+        return StreamingResponse(_filas_ndjson(query, params), media_type="application/x-ndjson")
+
+    try:
+        columnas, filas = await leer_filas(query, params)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching games: {e}")
+    next_cursor = filas[-1][columnas.index("id")] if limit is not None and len(filas) == limit else None
+    return RespuestaJSON({"games": registros(columnas, filas), "next_cursor": next_cursor})
+
+
+def _filas_ndjson(query, params, lote=500):
+    # Starlette itera los generadores síncronos en un hilo, fuera del event loop
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=lote).execute(text(query), params)
+        for filas in result.partitions():
+            yield b"".join(dumps(dict(fila._mapping)) + b"\n" for fila in filas)
+
 
+# Operaciones masivas
+# El cuerpo es un array JSON o NDJSON (Content-Type: application/x-ndjson, una
+# operación por línea). Los elementos se agrupan en lotes de BULK_CHUNK que se
+# ejecutan con executemany, cada lote en su propia transacción. Si un lote
+# falla se repite fila a fila con savepoints para dar el resultado de cada una.
+async def _elementos(request: Request):
+    """Genera (índice, dict | error) a partir del cuerpo JSON o NDJSON."""
+    if "ndjson" in request.headers.get("content-type", ""):
+        indice, resto = 0, b""
+        async for trozo in request.stream():
+            *lineas, resto = (resto + trozo).split(b"\n")
+            for linea in lineas:
+                if linea.strip():
+                    yield indice, _parsear_linea(linea)
+                    indice += 1
+        if resto.strip():
+            yield indice, _parsear_linea(resto)
+        return
+    try:
+        cuerpo = json.loads(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+    if not isinstance(cuerpo, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array")
+    for indice, elemento in enumerate(cuerpo):
+        yield indice, elemento
+
+
+def _parsear_linea(linea):
+    try:
+        return json.loads(linea)
+    except ValueError as e:
+        return ValueError(f"Invalid JSON line: {e}")
+
+
+def _ids_existentes(conn, ids):
+    query = text("SELECT id FROM game WHERE id IN :ids").bindparams(bindparam("ids", expanding=True))
+    return {fila[0] for fila in conn.execute(query, {"ids": list(ids)})}
+
+
+def _ejecutar_lote(query, lote, comprobar_ids=False):
+    """Ejecuta un lote [(índice, params)] y devuelve {índice: error o None}."""
+    resultados = {}
+    if comprobar_ids:
+        with engine.connect() as conn:
+            existentes = _ids_existentes(conn, {p["game_id"] for _, p in lote})
+        for i, p in lote:
+            if p["game_id"] not in existentes:
+                resultados[i] = "Game not found"
+        lote = [(i, p) for i, p in lote if i not in resultados]
+    if not lote:
+        return resultados
+    try:
+        with engine.begin() as conn:
+            gestor_rollups.escribir(conn, query, [p for _, p in lote])
+        resultados.update({i: None for i, _ in lote})
+        return resultados
+    except Exception:
+        pass
+    with engine.begin() as conn:
+        for i, p in lote:
+            try:
+                with conn.begin_nested():
+                    gestor_rollups.escribir(conn, query, p)
+                resultados[i] = None
+            except Exception as e:
+                resultados[i] = str(e)
+    return resultados
+
+
+async def _bulk(request: Request, modelo, query, parametros, comprobar_ids=False, al_aplicar=None):
+    resultados, lote = [], []
+
+    async def vaciar():
+        errores = await en_hilo(_ejecutar_lote, query, list(lote), comprobar_ids)
+        params = dict(lote)
+        for i, error in sorted(errores.items()):
+            resultados.append({"index": i, "status": "error", "detail": error} if error else {"index": i, "status": "ok"})
+            if error is None and al_aplicar:
+                al_aplicar(params[i])
+        lote.clear()
 
+    async for indice, elemento in _elementos(request):
+        if isinstance(elemento, Exception):
+            resultados.append({"index": indice, "status": "error", "detail": str(elemento)})
+            continue
+        try:
+            item = modelo.model_validate(elemento)
+        except ValidationError as e:
+            resultados.append({"index": indice, "status": "error", "detail": e.errors(include_url=False)})
+            continue
+        lote.append((indice, parametros(item)))
+        if len(lote) >= BULK_CHUNK:
+            await vaciar()
+    if lote:
+        await vaciar()
 
+    resultados.sort(key=lambda r: r["index"])
+    ok = sum(r["status"] == "ok" for r in resultados)
+    if ok:
+        cache_resultados.invalidar("game")
+    return {"ok": ok, "errors": len(resultados) - ok, "results": resultados}
 
 
+@router.post("/games/bulk", tags=["?"])
+async def create_games_bulk(request: Request):
+    # executemany no devuelve los ids generados: el índice de búsqueda se reconstruye
+    respuesta = await _bulk(request, GameCreate, INSERT_GAME, lambda g: g.model_dump())
+    if respuesta["ok"]:
+        indice_juegos.invalidar()
+    return respuesta
 
 
+@router.patch("/games/bulk", tags=["?"])
+async def update_games_bulk(request: Request):
+    return await _bulk(request, GameBulkUpdate, UPDATE_GAME,
+                       lambda g: {**g.model_dump(exclude={"id"}), "game_id": g.id}, comprobar_ids=True,
+                       al_aplicar=_renombrar_en_indice)
+
+
+@router.delete("/games/bulk", tags=["?"])
+async def delete_games_bulk(request: Request):
+    return await _bulk(request, GameBulkDelete, DELETE_GAME, lambda g: {"game_id": g.id}, comprobar_ids=True,
+                       al_aplicar=lambda p: indice_juegos.eliminar(p["game_id"]))
+
+
+def _renombrar_en_indice(params):
+    if params["game_name"] is not None:
+        indice_juegos.agregar(params["game_id"], params["game_name"])
+
+
+
+# Las modificaciones de un juego mueven sus ventas en los rollups (rollups.py)
+def _escribir(query, params):
+    with engine.begin() as conn:
+        return gestor_rollups.escribir(conn, query, params).rowcount
 
 
 # Obtener juego por ID
 @router.get("/games/{game_id}", tags=["?"])
 async def get_game_by_id(game_id: int):
-    query = "SELECT * FROM game WHERE id = :game_id"
+    query = SELECT_GAME
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text(query), {"game_id": game_id}).fetchone()
-            if result:
-                return dict(result)
-            else:
-                raise HTTPException(status_code=404, detail="Game not found")
+        result = await consultar(query, {"game_id": game_id})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching game: {e}")
+    if result:
+        return result[0]
+    else:
+        raise HTTPException(status_code=404, detail="Game not found")
 
 # Actuali?ar juego
 @router.put("/games/{game_id}", tags=["?"])
 async def update_game(game_id: int, game: GameUpdate):
-    query = """
-    UPDATE game
-    SET game_name = COALESCE(:game_name, game_name),
-        genre_id = COALESCE(:genre_id, genre_id),
-        publisher_id = COALESCE(:publisher_id, publisher_id),
-        release_year = COALESCE(:release_year, release_year)
-    WHERE id = :game_id
-    """
+    query = UPDATE_GAME
     try:
-        with engine.begin() as conn:
-            result = conn.execute(text(query), {
-                "game_id": game_id,
-                "game_name": game.game_name,
-                "genre_id": game.genre_id,
-                "publisher_id": game.publisher_id,
-                "release_year": game.release_year
-            })
-            return {"message": "Game updated successfully!"}
+        filas = await en_hilo(_escribir, query, {
+            "game_id": game_id,
+            "game_name": game.game_name,
+            "genre_id": game.genre_id
+        })
+        cache_resultados.invalidar("game")
+        if filas and game.game_name is not None:
+            indice_juegos.agregar(game_id, game.game_name)
+        return {"message": "Game updated successfully!"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating game: {e}")
 
 # Eliminar juego
 @router.delete("/games/{game_id}", tags=["?"])
 async def delete_game(game_id: int):
-    query = "DELETE FROM game WHERE id = :game_id"
+    query = DELETE_GAME
     try:
-        with engine.begin() as conn:
-            conn.execute(text(query), {"game_id": game_id})
-            return {"message": "Game deleted successfully!"}
+        await en_hilo(_escribir, query, {"game_id": game_id})
+        cache_resultados.invalidar("game")
+        indice_juegos.eliminar(game_id)
+        return {"message": "Game deleted successfully!"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting game: {e}")
@@ -0,0 +1,189 @@
+# graficas.py
+# Renderizado de gráficas fuera del event loop, con caché de PNG por contenido.
+# Con GRAFICAS_PROCESOS > 0 se dibujan en un pool de procesos (matplotlib no
+# suelta el GIL: con hilos, las gráficas compiten con el resto de peticiones).
+import os
+import asyncio
+import hashlib
+import threading
+import contextvars
+from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from fastapi import Request, Response
+
+from metricas import span
+from coalescencia import Coalescedor
+
+GRAFICAS_WORKERS = int(os.getenv('GRAFICAS_WORKERS', '2'))
+GRAFICAS_PROCESOS = int(os.getenv('GRAFICAS_PROCESOS', '0'))
+GRAFICAS_CACHE_MAX = int(os.getenv('GRAFICAS_CACHE_MAX', '64'))
+
+
+# Cada función recibe los ejes ya creados y los datos (x, y) como listas.
+# Se usa la API orientada a objetos de Figure: nada de estado global de pyplot.
+def _ventas_por_genero(ax, x, y):
+    ax.bar(x, y, color='coral')
+    ax.set_title('Ventas por Género')
+    ax.set_xlabel('genre_name')
+    ax.set_ylabel("Unidades Vendidas")
+    ax.tick_params(axis='x', labelrotation=45)
+
+
+def _ventas_por_plataforma(ax, x, y):
+    ax.bar(x, y, color='mediumseagreen')
+    ax.set_title('Ventas Totales por Plataforma')
+    ax.set_xlabel('Plataforma')
+    ax.set_ylabel('Ventas')
+    ax.tick_params(axis='x', labelrotation=45)
+
+
+def _ventas_por_anio(ax, x, y):
+    ax.plot(x, y, marker='o', linestyle='-', color='steelblue')
+    ax.set_title('Ventas Totales por Año de Lanzamiento')
+    ax.set_xlabel('Año de Lanzamiento')
+    ax.set_ylabel('Ventas')
+    ax.grid(True)
+
+
+GRAFICAS = {
+    'ventas_por_genero': _ventas_por_genero,
+    'ventas_por_plataforma': _ventas_por_plataforma,
+    'ventas_por_año': _ventas_por_anio,
+}
+
+
+def dibujar_png(tipo, x, y):
+    """Dibuja la gráfica `tipo` y devuelve los bytes del PNG."""
+    # matplotlib tarda en importarse: se carga con la primera gráfica o en precargar()
+    from matplotlib.figure import Figure
+    with span("render"):
+        fig = Figure(figsize=(10, 6))
+        GRAFICAS[tipo](fig.add_subplot(), x, y)
+        fig.tight_layout()
+        buf = BytesIO()
+        fig.savefig(buf, format="png")
+        return buf.getvalue()
+
+
+def precargar():
+    """Importa matplotlib y dibuja una gráfica mínima (fuentes y backend Agg listos)."""
+    dibujar_png('ventas_por_genero', ['-'], [0])
+
+
+def huella(tipo, x, y):
+    """ETag de la gráfica: depende solo del tipo y de los datos."""
+    h = hashlib.sha1(tipo.encode())
+    h.update(repr((x, y)).encode())
+    return f'"{h.hexdigest()}"'
+
+
+def coincide_etag(if_none_match, etag):
+    """If-None-Match con comparación débil (RFC 9110 §13.1.2): lista separada por comas, W/ se ignora."""
+    if if_none_match.strip() == "*":
+        return True
+    opaca = etag[2:] if etag.startswith("W/") else etag
+    for candidata in if_none_match.split(","):
+        candidata = candidata.strip()
+        if candidata.startswith("W/"):
+            candidata = candidata[2:]
+        if candidata == opaca:
+            return True
+    return False
+
+
+def _lista(valores):
+    return valores.tolist() if hasattr(valores, 'tolist') else list(valores)
+
+
+class RenderizadorGraficas:
+    """Pool de hilos (o de procesos) para renderizar y caché LRU de PNG indexada por ETag."""
+
+    def __init__(self, workers=GRAFICAS_WORKERS, max_entradas=GRAFICAS_CACHE_MAX, procesos=GRAFICAS_PROCESOS):
+        self.max_entradas = max_entradas
+        self.procesos = procesos
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="graficas")
+        self._pool_procesos = None
+        self._pid = None
+        # La misma gráfica pedida a la vez por varios clientes se dibuja una vez
+        self.coalescedor = Coalescedor("graficas")
+        self._pngs = OrderedDict()  # etag -> bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.renders = 0
+
+    def _cacheado(self, etag):
+        with self._lock:
+            png = self._pngs.get(etag)
+            if png is not None:
+                self._pngs.move_to_end(etag)
+                self.hits += 1
+            return png
+
+    def _guardar(self, etag, png):
+        with self._lock:
+            self._pngs[etag] = png
+            self._pngs.move_to_end(etag)
+            while len(self._pngs) > self.max_entradas:
+                self._pngs.popitem(last=False)
+
+    def _procesos(self):
+        # El pool es del proceso que lo creó: un worker de prefork.py crea el suyo
+        if self._pool_procesos is None or self._pid != os.getpid():
+            import multiprocessing
+            self._pool_procesos = ProcessPoolExecutor(max_workers=self.procesos, initializer=precargar,
+                                                      mp_context=multiprocessing.get_context("spawn"))
+            self._pid = os.getpid()
+        return self._pool_procesos
+
+    def iniciar(self):
+        """Arranca el pool de procesos (los hijos importan matplotlib mientras llegan peticiones)."""
+        if self.procesos > 0:
+            self._procesos().submit(int)
+
+    def detener(self):
+        if self._pool_procesos is not None and self._pid == os.getpid():
+            self._pool_procesos.shutdown(cancel_futures=True)
+        self._pool_procesos = None
+
+    async def _dibujar(self, tipo, x, y):
+        loop = asyncio.get_running_loop()
+        if self.procesos > 0:
+            # El span del hijo no llega a esta petición: se mide aquí, con el viaje de ida y vuelta
+            with span("render"):
+                return await loop.run_in_executor(self._procesos(), dibujar_png, tipo, x, y)
+        # run_in_executor no copia el contexto: sin esto el span "render" no llega a la petición
+        contexto = contextvars.copy_context()
+        return await loop.run_in_executor(self._pool, contexto.run, dibujar_png, tipo, x, y)
+
+    async def renderizar(self, tipo, x, y):
+        """Devuelve (png, etag); solo dibuja si esos datos no se habían dibujado ya."""
+        x, y = _lista(x), _lista(y)
+        etag = huella(tipo, x, y)
+        png = self._cacheado(etag)
+        if png is None:
+            png = await self.coalescedor.ejecutar(etag, lambda: self._dibujar_y_guardar(tipo, x, y, etag))
+        return png, etag
+
+    async def _dibujar_y_guardar(self, tipo, x, y, etag):
+        png = await self._dibujar(tipo, x, y)
+        with self._lock:
+            self.renders += 1
+        self._guardar(etag, png)
+        return png
+
+    async def respuesta(self, request: Request, tipo, x, y) -> Response:
+        """Respuesta PNG con ETag; 304 si el cliente ya tiene esa versión."""
+        png, etag = await self.renderizar(tipo, x, y)
+        cabeceras = {"ETag": etag, "Cache-Control": "no-cache"}
+        if coincide_etag(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=cabeceras)
+        return Response(content=png, media_type="image/png", headers=cabeceras)
+
+    def estadisticas(self):
+        with self._lock:
+            return {"pngs_cacheados": len(self._pngs), "hits": self.hits, "renders": self.renders}
+
+
+renderizador = RenderizadorGraficas()
@@ -0,0 +1,584 @@
+# importar.py
+# Importación masiva del catálogo en la base de datos, con la API funcionando.
+#
+#   python importar.py ../database_game                  los dumps *.sql (los INSERT; el esquema debe existir)
+#   python importar.py /app/data                         una exportación de database.py (columnar o CSV)
+#   python importar.py juegos.csv --tabla game           un CSV suelto
+#   python importar.py ../database_game --modo reemplazar --lote 10000
+#   python importar.py --estado                          progreso guardado de cada fuente
+#   python importar.py ../database_game --api http://localhost:8000   e invalida las cachés de la API
+#
+# Las fuentes se leen en streaming (los dumps se parsean por bloques, sin
+# cargar el archivo entero) y se insertan en lotes de IMPORTAR_LOTE filas con
+# INSERT de varias filas, cada lote en su propia transacción, con las
+# comprobaciones de claves ajenas y unicidad desactivadas en la sesión (se
+# restauran al terminar, antes de devolver la conexión al pool). Los
+# índices de migraciones.py de las tablas cargadas se quitan antes y se
+# reconstruyen al final (--mantener-indices para no tocarlos); después se
+# comprueban las claves ajenas, se actualizan las estadísticas y se refresca
+# rollup_ventas. Con --api (o IMPORTAR_API_URL) se pide a la API en marcha que
+# descarte lo cacheado de las tablas cargadas; si no, lo sigue sirviendo
+# hasta que caduque.
+#
+# Por defecto (--modo anexar) las filas se añaden a lo que ya hay: los dumps
+# traen los ids, así que sobre una base ya cargada la importación se detiene
+# en el primer id repetido; --modo reemplazar vacía antes cada tabla.
+#
+# El número de filas confirmadas de cada fuente se guarda en importacion_progreso
+# en la misma transacción que el lote: si la importación se corta, volver a
+# lanzarla con los mismos argumentos continúa donde se quedó, sin duplicar
+# filas ni volver a vaciar tablas (--desde-cero para empezar de nuevo). Cuando
+# termina bien, su progreso se borra.
+import os
+import re
+import sys
+import csv
+import time
+import argparse
+from pathlib import Path
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from database import engine, DTYPES
+
+IMPORTAR_LOTE = int(os.getenv('IMPORTAR_LOTE', '5000'))
+IMPORTAR_PROGRESO_S = float(os.getenv('IMPORTAR_PROGRESO_S', '1'))
+# API que tiene que descartar sus cachés al terminar (POST /cache/invalidar con ADMIN_TOKEN)
+IMPORTAR_API_URL = os.getenv('IMPORTAR_API_URL', '')
+
+TABLA_PROGRESO = "importacion_progreso"
+
+# Orden de carga: cada tabla después de aquellas a las que referencia
+ORDEN = ['genre', 'publisher', 'platform', 'region', 'game', 'game_publisher', 'game_platform', 'region_sales']
+
+# (tabla, columna, tabla referenciada) de las claves ajenas de database_game/*.sql
+CLAVES_AJENAS = [
+    ("game", "genre_id", "genre"),
+    ("game_publisher", "game_id", "game"),
+    ("game_publisher", "publisher_id", "publisher"),
+    ("game_platform", "game_publisher_id", "game_publisher"),
+    ("game_platform", "platform_id", "platform"),
+    ("region_sales", "game_platform_id", "game_platform"),
+    ("region_sales", "region_id", "region"),
+]
+
+
+# --- Fuentes ------------------------------------------------------------------
+
+class Fuente:
+    """Filas de una tabla que salen de un archivo. `filas()` es un generador;
+    `avance()` devuelve la fracción leída del archivo (None si no se sabe)."""
+
+    def __init__(self, nombre, tabla, columnas, filas, avance, firma):
+        self.nombre = nombre
+        self.tabla = tabla
+        self.columnas = columnas  # None: las primeras columnas de la tabla, en orden
+        self.filas = filas
+        self.avance = avance
+        self.firma = firma
+
+
+def firma_archivo(ruta):
+    info = os.stat(ruta)
+    return f"{info.st_size}:{int(info.st_mtime)}"
+
+
+_INSERT = re.compile(r"INSERT\s+INTO\s+(?:`?\w+`?\.)?`?(\w+)`?\s*(?:\(([^)]*)\))?\s*VALUES\s*", re.I)
+# Una tupla de valores completa, seguida de "," (siguen más) o ";" (fin del INSERT)
+_TUPLA = re.compile(r"\s*\(((?:[^()'\\]|'(?:[^'\\]|\\.|'')*')*)\)\s*([,;])", re.S)
+_VALOR = re.compile(r"'(?:[^'\\]|\\.|'')*'|[^,']+", re.S)
+_ESCAPES = {"0": "\0", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a", "b": "\b"}
+
+
+def _desescapar(texto):
+    texto = re.sub(r"\\(.)", lambda m: _ESCAPES.get(m.group(1), m.group(1)), texto, flags=re.S)
+    return texto.replace("''", "'")
+
+
+def _valor(literal):
+    literal = literal.strip()
+    if literal.startswith("'"):
+        return _desescapar(literal[1:-1])
+    if literal.upper() == "NULL":
+        return None
+    try:
+        return int(literal)
+    except ValueError:
+        return float(literal)
+
+
+class LectorDump:
+    """Recorre un dump de MySQL por bloques y devuelve los INSERT como fuentes.
+
+    Solo se interpretan los INSERT INTO ... VALUES (...), (...); el resto de
+    sentencias (DROP/CREATE/USE/COMMIT) se ignoran.
+    """
+
+    def __init__(self, ruta, bloque=1 << 20):
+        self.ruta = Path(ruta)
+        self.bloque = bloque
+        self.tamano = self.ruta.stat().st_size
+        self.leidos = 0
+        self._archivo = None
+        self._buffer = ""
+        self._base = 0  # caracteres ya descartados del buffer
+        self._pos = 0
+        self._fin = False
+
+    def _rellenar(self):
+        texto = self._archivo.read(self.bloque)
+        self.leidos = self._archivo.tell()
+        if not texto:
+            self._fin = True
+            return False
+        self._base += self._pos
+        self._buffer = self._buffer[self._pos:] + texto
+        self._pos = 0
+        return True
+
+    def _tuplas(self):
+        while True:
+            m = _TUPLA.match(self._buffer, self._pos)
+            if m is None:
+                if self._fin:
+                    raise ValueError(f"{self.ruta}: INSERT sin terminar cerca del byte {self.leidos}")
+                self._rellenar()
+                continue
+            self._pos = m.end()
+            yield tuple(_valor(v) for v in _VALOR.findall(m.group(1)))
+            if m.group(2) == ";":
+                return
+
+    def fuentes(self):
+        firma = firma_archivo(self.ruta)
+        # mysqldump parte las tablas grandes en varios INSERT: cada uno es una
+        # fuente con su propio progreso ("02_game.sql", "02_game.sql#2", ...)
+        vistos = {}
+        with open(self.ruta, encoding="utf-8", newline="") as self._archivo:
+            while True:
+                m = _INSERT.search(self._buffer, self._pos)
+                if m is None:
+                    # Se conserva el final del bloque por si el INSERT quedó partido
+                    self._pos = max(self._pos, len(self._buffer) - 200)
+                    if not self._rellenar():
+                        return
+                    continue
+                if m.end() == len(self._buffer) and not self._fin:
+                    self._rellenar()
+                    continue
+                self._pos = m.end()
+                columnas = [c.strip(" `") for c in m.group(2).split(",")] if m.group(2) else None
+                n = vistos[m.group(1)] = vistos.get(m.group(1), 0) + 1
+                nombre = self.ruta.name if n == 1 else f"{self.ruta.name}#{n}"
+                yield Fuente(nombre, m.group(1), columnas, self._tuplas(), self.avance, firma)
+
+    def avance(self):
+        return min(1.0, (self._base + self._pos) / self.tamano) if self.tamano else 1.0
+
+
+def _conversor(tabla, columna):
+    tipo = DTYPES.get(tabla, {}).get(columna)
+    if tipo is None or tipo == "str":
+        return lambda v: v if v != "" else None
+    if tipo.startswith("int"):
+        return lambda v: int(float(v)) if v not in ("", "nan", "NaN") else None
+    return lambda v: float(v) if v not in ("", "nan", "NaN") else None
+
+
+def fuente_csv(ruta, tabla):
+    ruta = Path(ruta)
+    tamano = ruta.stat().st_size or 1
+    leido = [0]
+
+    def lineas(archivo):
+        for linea in archivo:
+            leido[0] += len(linea)
+            yield linea
+
+    with open(ruta, encoding="utf-8", newline="") as archivo:
+        columnas = next(csv.reader([archivo.readline()]))
+    conversores = [_conversor(tabla, c) for c in columnas]
+
+    def filas():
+        with open(ruta, encoding="utf-8", newline="") as archivo:
+            lector = csv.reader(lineas(archivo))
+            next(lector)
+            for fila in lector:
+                yield tuple(f(v) for f, v in zip(conversores, fila))
+
+    return Fuente(ruta.name, tabla, columnas, filas(), lambda: min(1.0, leido[0] / tamano), firma_archivo(ruta))
+
+
+def fuente_columnar(carpeta, tabla, lote=IMPORTAR_LOTE):
+    import math
+    import columnar
+    df = columnar.leer_tabla(carpeta, tabla)
+    columnas = list(df.columns)
+    tipos = [DTYPES.get(tabla, {}).get(c, "") for c in columnas]
+    hechas = [0]
+
+    def convertir(valor, tipo):
+        # La exportación columnar guarda NULL como NaN (números) o "" (texto)
+        if tipo == "str":
+            return valor if valor != "" else None
+        if isinstance(valor, float) and math.isnan(valor):
+            return None
+        return int(valor) if tipo.startswith("int") else valor
+
+    def filas():
+        for inicio in range(0, len(df), lote):
+            bloque = df.iloc[inicio:inicio + lote]
+            for fila in zip(*(bloque[c].tolist() for c in columnas)):
+                yield tuple(convertir(v, t) for v, t in zip(fila, tipos))
+            hechas[0] = min(len(df), inicio + lote)
+
+    esquema = os.path.join(carpeta, columnar.CARPETA_COLUMNAR, tabla, columnar.ARCHIVO_ESQUEMA)
+    return Fuente(f"{columnar.CARPETA_COLUMNAR}/{tabla}", tabla, columnas, filas(),
+                  lambda: hechas[0] / len(df) if len(df) else 1.0, firma_archivo(esquema))
+
+
+def _del_dump(ruta, elegida):
+    for fuente in LectorDump(ruta).fuentes():
+        if elegida(fuente.tabla):
+            yield fuente
+        else:
+            # El lector tiene que pasar por las filas para llegar al siguiente INSERT
+            for _ in fuente.filas:
+                pass
+
+
+def fuentes(ruta, tabla=None, tablas=None):
+    """Fuentes de un archivo o carpeta, en el orden de carga."""
+    import columnar
+    ruta = Path(ruta)
+    elegida = lambda t: tablas is None or t in tablas
+    if ruta.is_file():
+        if ruta.suffix == ".sql":
+            yield from _del_dump(ruta, elegida)
+        else:
+            yield fuente_csv(ruta, tabla or ruta.stem)
+        return
+    if not ruta.is_dir():
+        raise FileNotFoundError(f"No existe {ruta}")
+    dumps = sorted(ruta.glob("*.sql"))
+    if dumps:
+        for dump in dumps:
+            yield from _del_dump(dump, elegida)
+        return
+    if ruta.name == columnar.CARPETA_COLUMNAR:
+        ruta = ruta.parent
+    encontradas = 0
+    for t in ORDEN:
+        if not elegida(t):
+            continue
+        if columnar.disponible(ruta, [t]):
+            yield fuente_columnar(ruta, t)
+        elif (ruta / f"{t}.csv").exists():
+            yield fuente_csv(ruta / f"{t}.csv", t)
+        else:
+            continue
+        encontradas += 1
+    if not encontradas:
+        raise FileNotFoundError(f"{ruta}: no hay dumps .sql, CSV ni exportación columnar que importar")
+
+
+# --- Carga --------------------------------------------------------------------
+
+def _preparar(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {TABLA_PROGRESO} ("
+        "fuente VARCHAR(200) NOT NULL, tabla VARCHAR(64) NOT NULL, firma VARCHAR(64) NOT NULL, "
+        "filas BIGINT NOT NULL DEFAULT 0, completada INT NOT NULL DEFAULT 0, "
+        "actualizada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (fuente, tabla))"
+    ))
+
+
+def _desactivar_comprobaciones(conn, dialecto):
+    """Desactiva las comprobaciones en la sesión; devuelve las sentencias que las dejan como estaban."""
+    if dialecto == "mysql":
+        claves, unicidad = conn.exec_driver_sql("SELECT @@SESSION.FOREIGN_KEY_CHECKS, @@SESSION.UNIQUE_CHECKS").one()
+        conn.exec_driver_sql("SET FOREIGN_KEY_CHECKS = 0")
+        conn.exec_driver_sql("SET UNIQUE_CHECKS = 0")
+        restaurar = [f"SET FOREIGN_KEY_CHECKS = {int(claves)}", f"SET UNIQUE_CHECKS = {int(unicidad)}"]
+    else:
+        claves = conn.exec_driver_sql("PRAGMA foreign_keys").scalar()
+        conn.exec_driver_sql("PRAGMA foreign_keys = OFF")
+        restaurar = [f"PRAGMA foreign_keys = {'ON' if claves else 'OFF'}"]
+    conn.commit()
+    return restaurar
+
+
+def _restaurar_comprobaciones(conn, restaurar):
+    # La conexión vuelve al pool: sin esto la siguiente sesión que la use seguiría sin comprobaciones
+    conn.rollback()
+    for sentencia in restaurar:
+        conn.exec_driver_sql(sentencia)
+    conn.commit()
+
+
+def _indices_migraciones(motor, tablas):
+    """Migraciones de índices aplicadas sobre `tablas` (las que se quitan durante la carga)."""
+    from migraciones import MIGRACIONES, aplicadas
+    hechas = aplicadas(motor)
+    return [m for m in MIGRACIONES if m.nombre.startswith("indice_") and m.nombre in hechas and set(m.tablas) & tablas]
+
+
+def huerfanas(conn, tablas):
+    """{(tabla, columna): filas cuya clave ajena no existe} para las claves que tocan `tablas`."""
+    resultado = {}
+    existentes = set(inspect(conn).get_table_names())
+    for tabla, columna, referida in CLAVES_AJENAS:
+        # Con --tablas sobre un esquema a medias, la otra tabla puede no existir todavía
+        if (tabla in tablas or referida in tablas) and {tabla, referida} <= existentes:
+            n = conn.execute(text(
+                f"SELECT COUNT(*) FROM {tabla} t LEFT JOIN {referida} r ON r.id = t.{columna} "
+                f"WHERE t.{columna} IS NOT NULL AND r.id IS NULL")).scalar()
+            if n:
+                resultado[(tabla, columna)] = n
+    return resultado
+
+
+class Importador:
+    def __init__(self, motor=engine, lote=IMPORTAR_LOTE, modo="anexar", salida=sys.stderr, api_url=IMPORTAR_API_URL):
+        self.motor = motor
+        self.api_url = api_url
+        self.dialecto = motor.dialect.name
+        self.lote = lote
+        self.modo = modo
+        self.salida = salida
+        self.resumen = []  # (fuente, tabla, filas, segundos)
+        self._columnas = {}
+        self._vaciadas = set()
+        self._revisadas = set()  # tablas ya comprobadas en modo anexar
+
+    def _columnas_tabla(self, conn, tabla):
+        if tabla not in self._columnas:
+            self._columnas[tabla] = [c["name"] for c in inspect(conn).get_columns(tabla)]
+        return self._columnas[tabla]
+
+    def _insert(self, tabla, columnas):
+        marcador = "?" if self.motor.dialect.paramstyle == "qmark" else "%s"
+        # Con pymysql, executemany de un INSERT ... VALUES se envía como un único INSERT de varias filas
+        return (f"INSERT INTO {tabla} ({', '.join(columnas)}) "
+                f"VALUES ({', '.join([marcador] * len(columnas))})")
+
+    def _progreso(self, conn, fuente):
+        fila = conn.execute(text(f"SELECT firma, filas, completada FROM {TABLA_PROGRESO} "
+                                 "WHERE fuente = :fuente AND tabla = :tabla"),
+                            {"fuente": fuente.nombre, "tabla": fuente.tabla}).first()
+        if fila is None:
+            return 0, False
+        if fila[0] != fuente.firma:
+            raise RuntimeError(f"{fuente.nombre} ({fuente.tabla}) cambió desde la importación a medias: "
+                               "usa --desde-cero")
+        return int(fila[1]), bool(fila[2])
+
+    def _vaciar(self, conn, tabla):
+        """Vacía la tabla la primera vez que se carga, salvo que se esté reanudando su carga."""
+        if tabla in self._vaciadas:
+            return
+        self._vaciadas.add(tabla)
+        with conn.begin():
+            # Solo se reanuda si hay filas confirmadas (un anexar que falló en el primer lote no cuenta)
+            if conn.execute(text(f"SELECT COUNT(*) FROM {TABLA_PROGRESO} WHERE tabla = :tabla AND filas > 0"),
+                            {"tabla": tabla}).scalar():
+                return
+        with conn.begin():
+            conn.exec_driver_sql(f"TRUNCATE TABLE {tabla}" if self.dialecto == "mysql" else f"DELETE FROM {tabla}")
+
+    def _avisar(self, fuente, filas, inicio, final=False):
+        segundos = time.perf_counter() - inicio
+        avance = fuente.avance()
+        porcentaje = f" ({avance:.0%})" if avance is not None and not final else ""
+        velocidad = filas / segundos if segundos > 0 else 0.0
+        print(f"{'✓' if final else ' '} {fuente.nombre} -> {fuente.tabla}: {filas} filas{porcentaje} "
+              f"en {segundos:.1f} s, {velocidad:,.0f} filas/s", file=self.salida, flush=True)
+
+    def cargar(self, conn, fuente):
+        with conn.begin():
+            hechas, completada = self._progreso(conn, fuente)
+            todas = self._columnas_tabla(conn, fuente.tabla)
+        if completada:
+            print(f"  {fuente.nombre} -> {fuente.tabla}: ya importada ({hechas} filas)", file=self.salida)
+            for _ in fuente.filas:  # el lector del dump tiene que avanzar hasta el siguiente INSERT
+                pass
+            return
+        if self.modo == "reemplazar":
+            self._vaciar(conn, fuente.tabla)
+        elif not hechas and fuente.tabla not in self._revisadas:
+            self._revisadas.add(fuente.tabla)
+            with conn.begin():
+                con_filas = conn.execute(text(f"SELECT 1 FROM {fuente.tabla} LIMIT 1")).first() is not None
+            if con_filas:
+                print(f"  {fuente.tabla} ya tiene filas: se añaden las de {fuente.nombre} "
+                      "(--modo reemplazar para sustituirlas)", file=self.salida)
+        if hechas:
+            print(f"  {fuente.nombre} -> {fuente.tabla}: se reanuda tras {hechas} filas", file=self.salida)
+
+        columnas = fuente.columnas
+        insert = None
+        guardar = text(
+            f"UPDATE {TABLA_PROGRESO} SET filas = :filas, completada = :completada, actualizada_en = CURRENT_TIMESTAMP "
+            "WHERE fuente = :fuente AND tabla = :tabla")
+        with conn.begin():
+            if hechas == 0:
+                conn.execute(text(f"DELETE FROM {TABLA_PROGRESO} WHERE fuente = :fuente AND tabla = :tabla"),
+                             {"fuente": fuente.nombre, "tabla": fuente.tabla})
+                conn.execute(text(f"INSERT INTO {TABLA_PROGRESO} (fuente, tabla, firma) VALUES (:fuente, :tabla, :firma)"),
+                             {"fuente": fuente.nombre, "tabla": fuente.tabla, "firma": fuente.firma})
+
+        inicio = time.perf_counter()
+        ultimo_aviso = inicio
+        filas, lote, saltadas = hechas, [], 0
+
+        def confirmar(completada=False):
+            try:
+                with conn.begin():
+                    if lote:
+                        conn.exec_driver_sql(insert, lote)
+                    conn.execute(guardar, {"filas": filas, "completada": int(completada),
+                                           "fuente": fuente.nombre, "tabla": fuente.tabla})
+            except IntegrityError as e:
+                if self.modo != "anexar":
+                    raise
+                # Los dumps traen los ids: sobre una base ya cargada chocan con las filas que existen
+                raise RuntimeError(f"{fuente.nombre} -> {fuente.tabla}: {e.orig}. En modo anexar las filas cuyo id "
+                                   f"ya existe en {fuente.tabla} no se pueden insertar: usa --modo reemplazar "
+                                   "para sustituir el contenido de la tabla") from e
+            lote.clear()
+
+        for fila in fuente.filas:
+            if saltadas < hechas:
+                saltadas += 1
+                continue
+            if insert is None:
+                columnas = columnas or todas[:len(fila)]
+                insert = self._insert(fuente.tabla, columnas)
+            lote.append(fila)
+            filas += 1
+            if len(lote) >= self.lote:
+                confirmar()
+                if time.perf_counter() - ultimo_aviso >= IMPORTAR_PROGRESO_S:
+                    ultimo_aviso = time.perf_counter()
+                    self._avisar(fuente, filas - hechas, inicio)
+        confirmar(completada=True)
+        self._avisar(fuente, filas - hechas, inicio, final=True)
+        self.resumen.append((fuente.nombre, fuente.tabla, filas - hechas, time.perf_counter() - inicio))
+
+    def importar(self, lista_fuentes, reconstruir_indices=True, desde_cero=False):
+        """Carga las fuentes y deja la base lista: índices, estadísticas, claves ajenas y rollups."""
+        from migraciones import actualizar_estadisticas
+        inicio = time.perf_counter()
+        cargadas = set()
+        indices = []
+        procesadas = []
+        with self.motor.connect() as conn:
+            with conn.begin():
+                _preparar(conn)
+                if desde_cero:
+                    conn.execute(text(f"DELETE FROM {TABLA_PROGRESO}"))
+            restaurar = _desactivar_comprobaciones(conn, self.dialecto)
+            try:
+                for fuente in lista_fuentes:
+                    if reconstruir_indices and fuente.tabla not in cargadas:
+                        nuevos = [m for m in _indices_migraciones(self.motor, {fuente.tabla}) if m not in indices]
+                        for m in nuevos:
+                            with self.motor.begin() as c:
+                                m.bajar(c, self.dialecto)
+                        indices += nuevos
+                    cargadas.add(fuente.tabla)
+                    self.cargar(conn, fuente)
+                    procesadas.append((fuente.nombre, fuente.tabla))
+            finally:
+                _restaurar_comprobaciones(conn, restaurar)
+                # También si la carga falla: la API no debe quedarse sin sus índices
+                for m in indices:
+                    t = time.perf_counter()
+                    with self.motor.begin() as c:
+                        m.subir(c, self.dialecto)
+                    print(f"  índice {m.nombre} reconstruido en {time.perf_counter() - t:.1f} s", file=self.salida)
+
+        # Todo cargado: el progreso ya no sirve para reanudar
+        with self.motor.begin() as conn:
+            for nombre, tabla in procesadas:
+                conn.execute(text(f"DELETE FROM {TABLA_PROGRESO} WHERE fuente = :fuente AND tabla = :tabla"),
+                             {"fuente": nombre, "tabla": tabla})
+        actualizar_estadisticas(self.motor, cargadas)
+        with self.motor.connect() as conn:
+            sin_referencia = huerfanas(conn, cargadas)
+        for (tabla, columna), n in sin_referencia.items():
+            print(f"  ¡{n} filas de {tabla}.{columna} apuntan a filas que no existen!", file=self.salida)
+        rollup = self._refrescar_rollups(cargadas)
+        self.avisar_api(cargadas | ({rollup} if rollup else set()), self.api_url)
+        total = sum(r[2] for r in self.resumen)
+        segundos = time.perf_counter() - inicio
+        print(f"{total} filas en {segundos:.1f} s ({total / segundos if segundos else 0:,.0f} filas/s)", file=self.salida)
+        return sin_referencia
+
+    def avisar_api(self, tablas, url=IMPORTAR_API_URL):
+        """Pide a la API que descarte lo cacheado de `tablas`; sin `url` solo avisa de que seguirá sirviéndolo."""
+        if not tablas:
+            return
+        if not url:
+            print(f"  la API sigue sirviendo {', '.join(sorted(tablas))} desde sus cachés hasta que caduquen "
+                  "(CACHE_TTL): usa --api o POST /cache/invalidar", file=self.salida)
+            return
+        import urllib.parse
+        import urllib.request
+        consulta = urllib.parse.urlencode([("tablas", t) for t in sorted(tablas)])
+        peticion = urllib.request.Request(f"{url.rstrip('/')}/cache/invalidar?{consulta}", method="POST",
+                                          headers={"X-Admin-Token": os.getenv('ADMIN_TOKEN', '')})
+        try:
+            with urllib.request.urlopen(peticion, timeout=30):
+                pass
+            print(f"  cachés de la API invalidadas ({url})", file=self.salida)
+        except Exception as e:
+            print(f"  ¡no se pudieron invalidar las cachés de {url}: {e}!", file=self.salida)
+
+    def _refrescar_rollups(self, tablas):
+        """Recalcula rollup_ventas; devuelve su nombre si la ha recalculado."""
+        from rollups import gestor_rollups, TABLA_ROLLUP
+        if not tablas or not gestor_rollups.existe():
+            return None
+        t = time.perf_counter()
+        gestor_rollups.refrescar()
+        print(f"  {TABLA_ROLLUP} refrescada en {time.perf_counter() - t:.1f} s", file=self.salida)
+        return TABLA_ROLLUP
+
+
+def estado(motor=engine):
+    with motor.begin() as conn:
+        _preparar(conn)
+        return conn.execute(text(f"SELECT fuente, tabla, filas, completada, actualizada_en FROM {TABLA_PROGRESO} "
+                                 "ORDER BY actualizada_en")).all()
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="Importación masiva de dumps SQL, CSV o exportaciones columnares")
+    parser.add_argument("ruta", nargs="?", help="dump .sql, CSV o carpeta (database_game/ o una exportación data/)")
+    parser.add_argument("--tabla", help="tabla de destino de un CSV suelto (por defecto, el nombre del archivo)")
+    parser.add_argument("--tablas", nargs="+", choices=ORDEN, help="importar solo estas tablas")
+    parser.add_argument("--modo", choices=("anexar", "reemplazar"), default="anexar",
+                        help="reemplazar vacía cada tabla antes de cargarla; anexar falla si un id ya existe")
+    parser.add_argument("--lote", type=int, default=IMPORTAR_LOTE, help="filas por INSERT y por transacción")
+    parser.add_argument("--mantener-indices", action="store_true", help="no quitar los índices durante la carga")
+    parser.add_argument("--desde-cero", action="store_true", help="olvida el progreso guardado de importaciones anteriores")
+    parser.add_argument("--estado", action="store_true", help="muestra el progreso guardado y sale")
+    parser.add_argument("--api", default=IMPORTAR_API_URL,
+                        help="URL de la API cuyas cachés se invalidan al terminar (usa ADMIN_TOKEN)")
+    args = parser.parse_args()
+
+    if args.estado:
+        for fuente, tabla, filas, completada, cuando in estado():
+            print(f"{'✓' if completada else '…'} {fuente:<30}{tabla:<16}{filas:>12} filas  {cuando}")
+        return
+    if not args.ruta:
+        parser.error("falta la ruta a importar")
+    importador = Importador(lote=args.lote, modo=args.modo, api_url=args.api)
+    sin_referencia = importador.importar(fuentes(args.ruta, args.tabla, set(args.tablas) if args.tablas else None),
+                                         reconstruir_indices=not args.mantener_indices, desde_cero=args.desde_cero)
+    sys.exit(1 if sin_referencia else 0)
+
+
+if __name__ == "__main__":
+    _main()
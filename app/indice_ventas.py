@@ -0,0 +1,93 @@
+# indice_ventas.py
+# Esquema en estrella precalculado sobre las tablas cargadas en memoria (tables.data).
+import numpy as np
+import pandas as pd
+
+from metricas import span
+
+# dimensión -> (tabla, columna con el nombre)
+DIMENSIONES = {
+    'genre': ('genre', 'genero'),
+    'publisher': ('publisher', 'publisher_name'),
+    'platform': ('platform', 'platform_name'),
+    'region': ('region', 'name'),
+    'game': ('game', 'game_name'),
+}
+
+
+def _posiciones(ids_tabla, valores):
+    """Posición de cada valor dentro de `ids_tabla` (-1 si no existe o es nulo)."""
+    return pd.Index(ids_tabla).get_indexer(valores)
+
+
+def _tomar(array, posiciones, vacio=-1):
+    """array[posiciones], propagando -1 para las posiciones que no existen."""
+    resultado = np.full(len(posiciones), vacio, dtype=array.dtype)
+    validas = posiciones >= 0
+    resultado[validas] = array[posiciones[validas]]
+    return resultado
+
+
+class IndiceVentas:
+    """Tabla de hechos desnormalizada (una fila por region_sales) y rollups por dimensión.
+
+    Las dimensiones se guardan como códigos enteros (posición de la fila en su
+    tabla, -1 si la cadena de joins se rompe), así que cada consulta de las
+    tablas HTML es una lectura de O(grupos) en vez de una cadena de merges.
+    """
+
+    def __init__(self, data):
+        rs = data['region_sales']
+        gpl = data['game_platform']
+        gp = data['game_publisher']
+        game = data['game']
+
+        # region_sales -> game_platform -> game_publisher -> game
+        pos_gpl = _posiciones(gpl['id'], rs['game_platform_id'])
+        pos_gp = _tomar(_posiciones(gp['id'], gpl['game_publisher_id']), pos_gpl)
+        pos_game = _tomar(_posiciones(game['id'], gp['game_id']), pos_gp)
+
+        codigos = {
+            'game': pos_game,
+            'region': _posiciones(data['region']['id'], rs['region_id']),
+            'platform': _tomar(_posiciones(data['platform']['id'], gpl['platform_id']), pos_gpl),
+            'publisher': _tomar(_posiciones(data['publisher']['id'], gp['publisher_id']), pos_gp),
+            'genre': _tomar(_posiciones(data['genre']['id'], game['genre_id']), pos_game),
+        }
+
+        # El año se codifica contra la lista ordenada de años distintos
+        anios = gpl['release_year'].to_numpy(dtype=float)
+        self.anios = np.unique(anios[~np.isnan(anios)]).astype(int)
+        anio_fila = _tomar(anios, pos_gpl, vacio=np.nan)
+        codigos['year'] = np.where(np.isnan(anio_fila), -1, np.searchsorted(self.anios, anio_fila)).astype(np.int32)
+
+        self.hechos = pd.DataFrame({dim: c.astype(np.int32) for dim, c in codigos.items()})
+        self.hechos['num_sales'] = rs['num_sales'].to_numpy(dtype=float)
+
+        self.etiquetas = {dim: data[tabla][col].to_numpy() for dim, (tabla, col) in DIMENSIONES.items()}
+        self.etiquetas['year'] = self.anios
+        self.rollups = {dim: self._rollup(dim) for dim in self.etiquetas}
+
+    def _rollup(self, dim):
+        codigos = self.hechos[dim].to_numpy()
+        ventas = self.hechos['num_sales'].to_numpy()
+        validos = codigos >= 0
+        n = len(self.etiquetas[dim])
+        filas = np.bincount(codigos[validos], minlength=n)
+        totales = np.bincount(codigos[validos], weights=np.nan_to_num(ventas[validos]), minlength=n)
+        presentes = filas > 0
+        # Agrupar por nombre (como hacía el groupby original) y ordenar por ventas
+        rollup = (
+            pd.DataFrame({'nombre': self.etiquetas[dim][presentes], 'total': totales[presentes]})
+            .groupby('nombre', sort=True)['total'].sum()
+            .sort_values(ascending=False, kind='stable')
+        )
+        return rollup
+
+    def ventas_por(self, dim, columnas=('nombre', 'total'), top=None):
+        """Ventas totales por dimensión, ordenadas de mayor a menor."""
+        with span("dataframe"):
+            rollup = self.rollups[dim] if top is None else self.rollups[dim].head(top)
+            result = rollup.reset_index()
+            result.columns = list(columnas)
+            return result
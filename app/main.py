@@ -1,30 +1,75 @@
+import sys
+from contextlib import asynccontextmanager
 from fastapi import APIRouter, FastAPI
-import pandas as pd
-import matplotlib.pyplot as plt
 from io import BytesIO
 from fastapi.responses import StreamingResponse
-from database import obtener_datos
+from database import obtener_datos, comprobar_conexion, engine
 from visualizations import router as vis_router
-from fastapi import FastAPI
 from routes import router as routes_router
+from ventas import router as ventas_router
 from crud import router as crud_router
-from tables import router as tables_router
+from tables import router as tables_router, gestor_snapshot
+from monitoreo import router as monitoreo_router
+from rollups import gestor_rollups
+from metricas import MiddlewareMetricas, perfilador
+from arranque import arranque
+from busqueda import indice_juegos
+import graficas
+import analitica
 
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Vigilar la carpeta data/ para recargar las tablas sin reiniciar
+    gestor_snapshot.iniciar()
+    # Primer refresco de los rollups de ventas en segundo plano; hasta entonces se calcula en vivo
+    gestor_rollups.iniciar()
+    # Perfilador por muestreo de peticiones lentas (PERFIL_LENTO_MS > 0)
+    if perfilador.activo:
+        perfilador.iniciar()
+    # pandas, matplotlib, el snapshot y el índice de búsqueda, en segundo plano (PRECARGA=1)
+    arranque.iniciar()
+    # Pool de procesos de las gráficas (GRAFICAS_PROCESOS > 0)
+    graficas.renderizador.iniciar()
+    yield
+    graficas.renderizador.detener()
+    await arranque.detener()
+    perfilador.detener()
+    gestor_rollups.detener()
+    gestor_snapshot.detener()
+
+
+# Subsistemas que se cargan bajo demanda, en el orden de la precarga; /ready informa de ellos
+arranque.registrar("base_de_datos", comprobar_conexion, lambda: engine.pool.checkedin() + engine.pool.checkedout() > 0)
+arranque.registrar("pandas", lambda: __import__("pandas"), lambda: "pandas" in sys.modules)
+arranque.registrar("snapshot", gestor_snapshot.actual, lambda: gestor_snapshot.cargado)
+arranque.registrar("indice_busqueda", indice_juegos.indice, lambda: indice_juegos.cargado)
+arranque.registrar("analitica", analitica.precargar, analitica.cargado)
+arranque.registrar("graficas", graficas.precargar, lambda: graficas.renderizador.renders > 0)
+# Los rollups los carga su propio hilo (gestor_rollups.iniciar)
+arranque.registrar("rollups", None, lambda: gestor_rollups.listo)
+
+
 router = APIRouter()
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+# Latencia por ruta y spans de cada petición (se exponen en /metrics)
+app.add_middleware(MiddlewareMetricas)
 
   # este ya estaba
 app.include_router(router)  
 app.include_router(vis_router, prefix="/Graficas_panda")
 app.include_router(routes_router)
+app.include_router(ventas_router)
 app.include_router(crud_router)    # este es el que faltaba
 app.include_router(tables_router, prefix="/Tablas")
+app.include_router(monitoreo_router)
 
 
 @router.get("/grafica")
 async def obtener_grafica():
+    import pandas as pd
+    import matplotlib.pyplot as plt
     datos = obtener_datos()
     df = pd.DataFrame(datos)
 
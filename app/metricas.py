@@ -0,0 +1,284 @@
+# metricas.py
+# Instrumentación por petición: histogramas de latencia por ruta, spans (db,
+# dataframe, memory, render, serialize) y exposición en formato Prometheus en /metrics.
+#
+#   with span("db"):  ...    # suma el tiempo al span "db" de la petición en curso
+#
+# La petición en curso viaja en un ContextVar, que anyio copia a los hilos de
+# to_thread (database.en_hilo, StreamingResponse con generadores síncronos), así
+# que los spans de código que corre fuera del event loop cuentan para su petición.
+# Con PERFIL_LENTO_MS > 0 un perfilador por muestreo vuelca las pilas de las
+# peticiones que superan ese tiempo a PERFIL_DIR.
+import os
+import sys
+import time
+import threading
+from pathlib import Path
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from anyio import to_thread
+
+METRICAS_BUCKETS = tuple(float(b) for b in os.getenv(
+    'METRICAS_BUCKETS', '0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10').split(','))
+PERFIL_LENTO_MS = float(os.getenv('PERFIL_LENTO_MS', '0'))
+PERFIL_INTERVALO_MS = float(os.getenv('PERFIL_INTERVALO_MS', '5'))
+PERFIL_DIR = os.getenv('PERFIL_DIR', '/tmp/perfiles')
+
+
+def _escapar(valor):
+    # Formato de exposición: en los valores de etiqueta se escapan la barra invertida, las comillas y los saltos de línea
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ""
+    pares = ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas)
+    return "{" + pares + "}"
+
+
+class Histograma:
+    """Histograma acumulado por conjunto de etiquetas, como los de Prometheus."""
+
+    def __init__(self, nombre, ayuda, buckets=METRICAS_BUCKETS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = buckets
+        self._series = {}  # etiquetas -> [cuentas por bucket..., suma, total]
+        self._lock = threading.Lock()
+
+    def observar(self, valor, **etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [0] * len(self.buckets) + [0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[i] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for clave, serie in sorted(series.items()):
+            for limite, cuenta in zip(self.buckets, serie):
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(clave + (('le', f'{limite:g}'),))} {cuenta}")
+            lineas.append(f"{self.nombre}_bucket{_etiquetas(clave + (('le', '+Inf'),))} {serie[-1]}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(clave)} {serie[-2]:.6f}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(clave)} {serie[-1]}")
+        return lineas
+
+
+class Contador:
+    def __init__(self, nombre, ayuda):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self._series = Counter()
+        self._lock = threading.Lock()
+
+    def sumar(self, valor=1, **etiquetas):
+        with self._lock:
+            self._series[tuple(sorted(etiquetas.items()))] += valor
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            series = dict(self._series)
+        lineas += [f"{self.nombre}{_etiquetas(k)} {v}" for k, v in sorted(series.items())]
+        return lineas
+
+
+def serie(nombre, ayuda, valores, tipo="gauge"):
+    """Líneas de una métrica leída de otro módulo en el momento: `valores` es [(etiquetas dict, valor)]."""
+    lineas = [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"]
+    lineas += [f"{nombre}{_etiquetas(tuple(sorted(e.items())))} {v}" for e, v in valores]
+    return lineas
+
+
+duracion_peticiones = Histograma("api_request_duration_seconds", "Latencia de las peticiones por ruta")
+duracion_spans = Histograma("api_span_duration_seconds", "Tiempo por petición en cada fase (db, dataframe, memory, render, serialize)")
+espera_pool = Histograma("db_pool_wait_seconds", "Espera para obtener una conexión del pool (sin abrir conexiones nuevas)")
+conexion_pool = Histograma("db_pool_connect_seconds", "Tiempo en abrir las conexiones nuevas del pool")
+peticiones = Contador("api_requests_total", "Peticiones atendidas por ruta y código de estado")
+perfiles_volcados = Contador("api_slow_profiles_total", "Perfiles volcados de peticiones lentas")
+
+
+class Traza:
+    """Tiempo acumulado por span dentro de una petición."""
+
+    def __init__(self):
+        self.spans = {}
+        self._lock = threading.Lock()
+
+    def sumar(self, nombre, segundos):
+        with self._lock:
+            self.spans[nombre] = self.spans.get(nombre, 0.0) + segundos
+
+
+_traza: ContextVar[Traza | None] = ContextVar("traza", default=None)
+
+
+@contextmanager
+def span(nombre):
+    """Mide el bloque y lo suma al span `nombre` de la petición en curso (si la hay)."""
+    traza = _traza.get()
+    if traza is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        traza.sumar(nombre, time.perf_counter() - inicio)
+
+
+class PerfiladorMuestreo:
+    """Muestrea las pilas de todos los hilos y vuelca las de las peticiones lentas.
+
+    El volcado usa el formato "pila;colapsada cuenta" de flamegraph.pl / speedscope.
+    Las muestras son de todo el proceso durante la petición: con peticiones
+    concurrentes el volcado incluye también lo que hacían las demás.
+    """
+
+    OCIOSAS = {"select", "poll", "epoll", "wait", "sleep", "_worker", "get", "accept", "run_forever"}
+
+    def __init__(self, umbral_ms=PERFIL_LENTO_MS, intervalo_ms=PERFIL_INTERVALO_MS, carpeta=PERFIL_DIR):
+        self.umbral_ms = umbral_ms
+        self.intervalo = intervalo_ms / 1000
+        self.carpeta = Path(carpeta)
+        self.volcados = 0
+        self._muestras = deque(maxlen=200_000)  # (instante, pila)
+        self._parar = threading.Event()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    @property
+    def activo(self):
+        return self.umbral_ms > 0
+
+    def configurar(self, umbral_ms):
+        self.umbral_ms = umbral_ms
+        if self.activo:
+            self.iniciar()
+        else:
+            self.detener()
+
+    def _pila(self, frame):
+        nombres = []
+        while frame is not None:
+            codigo = frame.f_code
+            nombres.append(f"{Path(codigo.co_filename).stem}:{codigo.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(nombres))
+
+    def _muestrear(self):
+        propio = threading.get_ident()
+        while not self._parar.wait(self.intervalo):
+            ahora = time.perf_counter()
+            for ident, frame in sys._current_frames().items():
+                if ident == propio or frame.f_code.co_name in self.OCIOSAS:
+                    continue
+                self._muestras.append((ahora, self._pila(frame)))
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilo and self._hilo.is_alive():
+                return
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._muestrear, name="perfilador", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        with self._lock:
+            self._parar.set()
+            if self._hilo:
+                self._hilo.join()
+                self._hilo = None
+
+    def volcar(self, ruta, inicio, fin):
+        """Escribe las pilas muestreadas entre `inicio` y `fin`; devuelve la ruta del archivo."""
+        pilas = Counter(pila for instante, pila in list(self._muestras) if inicio <= instante <= fin)
+        if not pilas:
+            return None
+        self.carpeta.mkdir(parents=True, exist_ok=True)
+        nombre = ruta.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "raiz"
+        archivo = self.carpeta / f"{time.strftime('%Y%m%d-%H%M%S')}_{(fin - inicio) * 1000:.0f}ms_{nombre}.txt"
+        archivo.write_text("".join(f"{pila} {n}\n" for pila, n in pilas.most_common()))
+        with self._lock:
+            self.volcados += 1
+        return archivo
+
+    def estado(self):
+        archivos = sorted(self.carpeta.glob("*.txt")) if self.carpeta.exists() else []
+        return {
+            "activo": self.activo,
+            "umbral_ms": self.umbral_ms,
+            "intervalo_ms": self.intervalo * 1000,
+            "carpeta": str(self.carpeta),
+            "volcados": self.volcados,
+            "ultimos": [a.name for a in archivos[-10:]],
+        }
+
+
+perfilador = PerfiladorMuestreo()
+
+
+def plantilla_ruta(scope):
+    """Plantilla de la ruta atendida (/games/{game_id}), no la URL, para acotar las series."""
+    # Con include_router(prefix=...) FastAPI deja en scope["route"] la ruta sin el
+    # prefijo; la ruta efectiva, con prefijo, está en scope["fastapi"]
+    contexto = scope.get("fastapi", {}).get("effective_route_context")
+    ruta = getattr(contexto, "path", None) or getattr(scope.get("route"), "path", None)
+    return ruta or "sin_ruta"
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI: mide cada petición hasta el último byte del cuerpo (también en streaming)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        traza = Traza()
+        token = _traza.set(traza)
+        estado = {"codigo": 500}
+        inicio = time.perf_counter()
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            fin = time.perf_counter()
+            _traza.reset(token)
+            ruta = plantilla_ruta(scope)
+            metodo = scope.get("method", "")
+            duracion_peticiones.observar(fin - inicio, route=ruta, method=metodo)
+            peticiones.sumar(route=ruta, method=metodo, status=estado["codigo"])
+            for nombre, segundos in traza.spans.items():
+                duracion_spans.observar(segundos, route=ruta, span=nombre)
+            if perfilador.activo and (fin - inicio) * 1000 >= perfilador.umbral_ms:
+                # Recorrer las muestras y escribir el archivo bloquearía el event loop
+                if await to_thread.run_sync(perfilador.volcar, ruta, inicio, fin):
+                    perfiles_volcados.sumar(route=ruta)
+
+
+def exponer(extra=()):
+    """Texto en formato de exposición de Prometheus (0.0.4)."""
+    lineas = []
+    for metrica in (duracion_peticiones, duracion_spans, espera_pool, conexion_pool, peticiones, perfiles_volcados):
+        lineas += metrica.exponer()
+    for bloque in extra:
+        lineas += bloque
+    return "\n".join(lineas) + "\n"
@@ -0,0 +1,274 @@
+# migraciones.py
+# Índices para los caminos de join de la API y revisión de planes con EXPLAIN.
+#
+#   python migraciones.py aplicar          aplica las migraciones pendientes
+#   python migraciones.py deshacer NOMBRE  deshace una migración aplicada
+#   python migraciones.py estado           lista las migraciones y si están aplicadas
+#   python migraciones.py explain          EXPLAIN de cada consulta registrada;
+#                                          sale con código 1 si hay escaneos completos
+import os
+import re
+import sys
+import argparse
+from sqlalchemy import bindparam, inspect, text
+
+from database import engine, CONSULTAS
+from rollups import CREATE_ROLLUP, TABLA_ROLLUP
+
+# Un escaneo completo de una tabla con más filas que esto se marca como problema
+EXPLAIN_FILAS_MAX = int(os.getenv('EXPLAIN_FILAS_MAX', '1000'))
+
+TABLA_MIGRACIONES = "schema_migraciones"
+
+
+class Migracion:
+    """Cambio de esquema con nombre. `subir` y `bajar` reciben (conn, dialecto)."""
+
+    def __init__(self, nombre, subir, bajar, descripcion="", tablas=()):
+        self.nombre = nombre
+        self.subir = subir
+        self.bajar = bajar
+        self.descripcion = descripcion
+        self.tablas = tuple(tablas)
+
+
+def _indices_existentes(conn, tabla):
+    return {i["name"] for i in inspect(conn).get_indexes(tabla)}
+
+
+def indice(nombre, tabla, columnas, descripcion=""):
+    """Migración que crea un índice compuesto; no falla si el índice ya existe."""
+    def subir(conn, dialecto):
+        if nombre not in _indices_existentes(conn, tabla):
+            conn.execute(text(f"CREATE INDEX {nombre} ON {tabla} ({', '.join(columnas)})"))
+
+    def bajar(conn, dialecto):
+        if nombre in _indices_existentes(conn, tabla):
+            conn.execute(text(f"DROP INDEX {nombre} ON {tabla}" if dialecto == "mysql" else f"DROP INDEX {nombre}"))
+
+    return Migracion(f"indice_{nombre}", subir, bajar, descripcion or f"{tabla} ({', '.join(columnas)})", (tabla,))
+
+
+def _clave_region_sales(conn, dialecto):
+    # En SQLite toda tabla tiene ya un rowid, que hace de clave sustituta
+    if dialecto != "mysql":
+        return
+    if "id" not in {c["name"] for c in inspect(conn).get_columns("region_sales")}:
+        conn.execute(text("ALTER TABLE region_sales ADD COLUMN id INT NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST"))
+
+
+def _quitar_clave_region_sales(conn, dialecto):
+    if dialecto != "mysql":
+        return
+    if "id" in {c["name"] for c in inspect(conn).get_columns("region_sales")}:
+        conn.execute(text("ALTER TABLE region_sales DROP PRIMARY KEY, DROP COLUMN id"))
+
+
+def _crear_rollup(conn, dialecto):
+    conn.execute(text(CREATE_ROLLUP))
+
+
+def _borrar_rollup(conn, dialecto):
+    conn.execute(text(f"DROP TABLE IF EXISTS {TABLA_ROLLUP}"))
+
+
+def _rollup_decimal(conn, dialecto):
+    # Las tablas creadas antes guardaban num_sales como DOUBLE; SQLite no cambia
+    # tipos de columna y sus DECIMAL son REAL igualmente
+    if dialecto == "mysql":
+        conn.execute(text(f"ALTER TABLE {TABLA_ROLLUP} MODIFY num_sales DECIMAL(14,2) NOT NULL"))
+
+
+def _rollup_double(conn, dialecto):
+    if dialecto == "mysql":
+        conn.execute(text(f"ALTER TABLE {TABLA_ROLLUP} MODIFY num_sales DOUBLE NOT NULL"))
+
+
+# En orden de aplicación. Los índices incluyen las columnas que leen las consultas
+# para que el join se resuelva solo con el índice (en InnoDB el índice secundario
+# ya lleva la clave primaria, así que `id` no hace falta añadirlo).
+MIGRACIONES = [
+    Migracion("clave_region_sales", _clave_region_sales, _quitar_clave_region_sales,
+              "region_sales.id AUTO_INCREMENT PRIMARY KEY", ("region_sales",)),
+    # region_sales por game_platform_id: todos los SUM(num_sales) de routes.py y visualizations.py
+    indice("idx_rs_gpl_region_ventas", "region_sales", ("game_platform_id", "region_id", "num_sales")),
+    # region_sales agrupado por región
+    indice("idx_rs_region_gpl_ventas", "region_sales", ("region_id", "game_platform_id", "num_sales")),
+    # game_platform por game_publisher_id (join desde game_publisher)
+    indice("idx_gpl_gp_plataforma_anio", "game_platform", ("game_publisher_id", "platform_id", "release_year")),
+    # /games/year (release_year = ? AND platform_id IN ...) y los GROUP BY release_year
+    indice("idx_gpl_anio_plataforma_gp", "game_platform", ("release_year", "platform_id", "game_publisher_id")),
+    # game_publisher en ambos sentidos del join game <-> publisher
+    indice("idx_gp_juego_publisher", "game_publisher", ("game_id", "publisher_id")),
+    indice("idx_gp_publisher_juego", "game_publisher", ("publisher_id", "game_id")),
+    # Ventas por dimensión × año × región (rollups.py la rellena)
+    Migracion("tabla_rollup_ventas", _crear_rollup, _borrar_rollup, f"{TABLA_ROLLUP} (dimensión × año × región)"),
+    # Sumas exactas, como SUM(region_sales.num_sales) en vivo
+    Migracion("rollup_ventas_decimal", _rollup_decimal, _rollup_double, f"{TABLA_ROLLUP}.num_sales DECIMAL(14,2)"),
+]
+
+
+def _preparar(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {TABLA_MIGRACIONES} ("
+        "nombre VARCHAR(100) NOT NULL PRIMARY KEY, aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+
+
+def aplicadas(motor=engine):
+    with motor.begin() as conn:
+        _preparar(conn)
+        return {fila[0] for fila in conn.execute(text(f"SELECT nombre FROM {TABLA_MIGRACIONES}"))}
+
+
+def aplicar(motor=engine, migraciones=MIGRACIONES):
+    """Aplica en orden las migraciones pendientes; cada una en su propia transacción."""
+    hechas = aplicadas(motor)
+    nuevas = []
+    for m in migraciones:
+        if m.nombre in hechas:
+            continue
+        # En MySQL el DDL hace commit implícito: si algo falla, la migración
+        # no queda registrada y `subir` es idempotente para reintentarla.
+        with motor.begin() as conn:
+            m.subir(conn, motor.dialect.name)
+            conn.execute(text(f"INSERT INTO {TABLA_MIGRACIONES} (nombre) VALUES (:nombre)"), {"nombre": m.nombre})
+        nuevas.append(m)
+    if nuevas:
+        actualizar_estadisticas(motor, {t for m in nuevas for t in m.tablas})
+    return [m.nombre for m in nuevas]
+
+
+def actualizar_estadisticas(motor, tablas):
+    """Sin estadísticas recientes el optimizador puede seguir prefiriendo el recorrido completo."""
+    if not tablas:
+        return
+    with motor.begin() as conn:
+        if motor.dialect.name == "mysql":
+            conn.execute(text(f"ANALYZE TABLE {', '.join(sorted(tablas))}"))
+        else:
+            conn.execute(text("ANALYZE"))
+
+
+def deshacer(nombre, motor=engine, migraciones=MIGRACIONES):
+    migracion = next((m for m in migraciones if m.nombre == nombre), None)
+    if migracion is None:
+        raise ValueError(f"Migración desconocida: {nombre}")
+    with motor.begin() as conn:
+        _preparar(conn)
+        migracion.bajar(conn, motor.dialect.name)
+        conn.execute(text(f"DELETE FROM {TABLA_MIGRACIONES} WHERE nombre = :nombre"), {"nombre": nombre})
+
+
+# EXPLAIN
+ALIAS = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|GROUP\b|ORDER\b|LIMIT\b|INNER\b|LEFT\b)(\w+))?", re.I)
+
+
+def _alias(sql):
+    """alias -> tabla para las tablas de FROM/JOIN de una consulta."""
+    alias = {}
+    for tabla, nombre in ALIAS.findall(sql):
+        alias[tabla] = tabla
+        if nombre:
+            alias[nombre] = tabla
+    return alias
+
+
+def _filas_tablas(conn, tablas, cache):
+    for tabla in tablas:
+        if tabla not in cache:
+            cache[tabla] = conn.execute(text(f"SELECT COUNT(*) FROM {tabla}")).scalar()
+    return cache
+
+
+def _sentencia(prefijo, sql, expandir):
+    return text(prefijo + sql.strip().rstrip(";")).bindparams(*[bindparam(p, expanding=True) for p in expandir])
+
+
+def _plan_mysql(conn, sql, params, expandir, filas):
+    """Pasos del plan como (tabla, descripción, escaneo completo)."""
+    pasos = []
+    for fila in conn.execute(_sentencia("EXPLAIN ", sql, expandir), params).mappings():
+        tabla, tipo = fila["table"], fila["type"]
+        descripcion = f"type={tipo} key={fila['key']} rows={fila['rows']} {fila['Extra'] or ''}".strip()
+        # type=ALL es un recorrido de la tabla; type=index recorre un índice completo,
+        # que para un GROUP BY sobre toda la tabla es lo esperado si el índice cubre
+        pasos.append((tabla, descripcion, tipo == "ALL" and (fila["rows"] or 0) > EXPLAIN_FILAS_MAX))
+    return pasos
+
+
+def _plan_sqlite(conn, sql, params, expandir, filas):
+    pasos = []
+    alias = _alias(sql)
+    _filas_tablas(conn, set(alias.values()), filas)
+    for fila in conn.execute(_sentencia("EXPLAIN QUERY PLAN ", sql, expandir), params):
+        detalle = fila[-1]
+        m = re.match(r"SCAN (\w+)", detalle)
+        completo = False
+        if m and "INDEX" not in detalle:
+            tabla = alias.get(m.group(1), m.group(1))
+            completo = filas.get(tabla, 0) > EXPLAIN_FILAS_MAX
+        pasos.append((m.group(1) if m else "", detalle, completo))
+    return pasos
+
+
+def revisar_planes(motor=engine, consultas=None):
+    """{consulta: [(tabla, descripción, escaneo completo)]} para cada consulta registrada."""
+    consultas = CONSULTAS if consultas is None else consultas
+    plan = _plan_mysql if motor.dialect.name == "mysql" else _plan_sqlite
+    filas = {}
+    resultado = {}
+    with motor.connect() as conn:
+        for nombre, (sql, ejemplo, expandir) in consultas.items():
+            try:
+                resultado[nombre] = plan(conn, sql, ejemplo, expandir, filas)
+            except Exception as e:
+                # Una consulta que ya no compila contra el esquema también es una regresión
+                resultado[nombre] = [("", f"error: {getattr(e, 'orig', e)}", True)]
+                conn.rollback()
+    return resultado
+
+
+def registrar_consultas_api():
+    # Importar los routers registra sus consultas en database.CONSULTAS
+    import routes, visualizations, crud, ventas  # noqa: F401
+
+
+def _main():
+    parser = argparse.ArgumentParser(description="Migraciones de índices y revisión de planes")
+    sub = parser.add_subparsers(dest="orden", required=True)
+    sub.add_parser("aplicar", help="aplica las migraciones pendientes")
+    sub.add_parser("estado", help="lista las migraciones")
+    p = sub.add_parser("deshacer", help="deshace una migración")
+    p.add_argument("nombre")
+    p = sub.add_parser("explain", help="EXPLAIN de las consultas registradas de la API")
+    p.add_argument("--todo", action="store_true", help="muestra también los pasos sin escaneo completo")
+    args = parser.parse_args()
+
+    if args.orden == "aplicar":
+        nuevas = aplicar()
+        print("\n".join(f"aplicada {n}" for n in nuevas) or "No hay migraciones pendientes")
+    elif args.orden == "estado":
+        hechas = aplicadas()
+        for m in MIGRACIONES:
+            print(f"[{'x' if m.nombre in hechas else ' '}] {m.nombre:32} {m.descripcion}")
+    elif args.orden == "deshacer":
+        deshacer(args.nombre)
+        print(f"deshecha {args.nombre}")
+    else:
+        registrar_consultas_api()
+        problemas = 0
+        for nombre, pasos in revisar_planes().items():
+            completos = [p for p in pasos if p[2]]
+            problemas += len(completos)
+            etiqueta = "ERROR" if any(d.startswith("error:") for _, d, _ in completos) else "ESCANEO"
+            print(f"{etiqueta if completos else 'ok':8} {nombre}")
+            for tabla, descripcion, completo in pasos:
+                if completo or args.todo:
+                    print(f"{'':8}   {'!' if completo else ' '} {tabla:16} {descripcion}")
+        print(f"{problemas} problema(s) en {len(CONSULTAS)} consultas (umbral {EXPLAIN_FILAS_MAX} filas)")
+        sys.exit(1 if problemas else 0)
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,168 @@
+import os
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+import metricas
+from database import estadisticas_pool, tablas as TABLAS_BD
+from cache import cache_resultados
+from graficas import renderizador
+from tables import gestor_snapshot
+from rollups import gestor_rollups, TABLA_ROLLUP
+from arranque import arranque
+from busqueda import DIMENSIONES as DIMENSIONES_BUSQUEDA, indice_juegos, resolutor
+import analitica
+import coalescencia
+import ventas
+
+router = APIRouter()
+
+# Los POST que cambian la configuración en caliente exigen la cabecera
+# X-Admin-Token con este valor; sin ADMIN_TOKEN quedan desactivados.
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+# Tablas de las que dependen las cachés de resultados
+TABLAS_CACHEADAS = TABLAS_BD + [TABLA_ROLLUP]
+
+
+async def requiere_admin(x_admin_token: str | None = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Operación de administración desactivada: define ADMIN_TOKEN")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="X-Admin-Token incorrecto")
+
+
+@router.get("/db/pool", tags=["Monitoreo"])
+async def get_pool_stats():
+    return estadisticas_pool()
+
+
+@router.get("/cache/stats", tags=["Monitoreo"])
+async def get_cache_stats():
+    return cache_resultados.estadisticas()
+
+
+@router.post("/cache/invalidar", tags=["Monitoreo"], dependencies=[Depends(requiere_admin)])
+async def invalidate_caches(tablas: list[str] | None = Query(None)):
+    """Descarta lo cacheado de `tablas` (por defecto todas) tras cambiar la base por fuera de la API (importar.py)."""
+    tablas = tablas or TABLAS_CACHEADAS
+    desconocidas = [t for t in tablas if t not in TABLAS_CACHEADAS]
+    if desconocidas:
+        raise HTTPException(status_code=404, detail=f"Tablas desconocidas: {', '.join(desconocidas)}")
+    # Incrementa los contadores compartidos: con prefork.py se enteran todos los workers
+    cache_resultados.invalidar(*tablas)
+    for dimension in DIMENSIONES_BUSQUEDA:
+        if dimension in tablas:
+            resolutor.invalidar(dimension)
+    if "game" in tablas:
+        indice_juegos.invalidar()
+    return {"tablas": tablas, "cache": cache_resultados.estadisticas()}
+
+
+@router.get("/cache/graficas/stats", tags=["Monitoreo"])
+async def get_chart_cache_stats():
+    return renderizador.estadisticas()
+
+
+@router.get("/cache/sentencias/stats", tags=["Monitoreo"])
+async def get_statement_cache_stats():
+    """Sentencias compiladas de /sales/query."""
+    return ventas.sentencias.estadisticas()
+
+
+@router.get("/coalescencia", tags=["Monitoreo"])
+async def get_coalescing_stats():
+    """Cálculos ejecutados y compartidos por peticiones idénticas simultáneas, por coalescedor."""
+    return coalescencia.estadisticas()
+
+
+@router.get("/snapshot", tags=["Monitoreo"])
+async def get_snapshot_status():
+    return gestor_snapshot.estado()
+
+
+@router.get("/rollups", tags=["Monitoreo"])
+async def get_rollups_status():
+    return gestor_rollups.estado()
+
+
+def _metricas_subsistemas():
+    pool = estadisticas_pool()
+    cache = cache_resultados.estadisticas()
+    graficas = renderizador.estadisticas()
+    renders = graficas["hits"] + graficas["renders"]
+    snapshot = gestor_snapshot.estado()
+    rollups = gestor_rollups.estado()
+    coalescedores = coalescencia.estadisticas()
+    sentencias = ventas.sentencias.estadisticas()
+    return [
+        metricas.serie("db_pool_connections", "Conexiones del pool por estado",
+                       [({"state": "checked_out"}, pool["checked_out"]), ({"state": "checked_in"}, pool["checked_in"]),
+                        ({"state": "overflow"}, pool["overflow"])]),
+        metricas.serie("db_pool_timeouts_total", "Esperas del pool que acabaron en timeout", [({}, pool.get("timeouts", 0))], "counter"),
+        metricas.serie("cache_requests_total", "Consultas a las cachés por resultado",
+                       [({"cache": "resultados", "result": "hit"}, cache["hits"]),
+                        ({"cache": "resultados", "result": "miss"}, cache["misses"]),
+                        ({"cache": "graficas", "result": "hit"}, graficas["hits"]),
+                        ({"cache": "graficas", "result": "miss"}, graficas["renders"]),
+                        ({"cache": "sentencias", "result": "hit"}, sentencias["hits"]),
+                        ({"cache": "sentencias", "result": "miss"}, sentencias["misses"])], "counter"),
+        metricas.serie("cache_hit_ratio", "Proporción de aciertos de cada caché",
+                       [({"cache": "resultados"}, cache["hit_ratio"]),
+                        ({"cache": "graficas"}, round(graficas["hits"] / renders, 4) if renders else 0.0),
+                        ({"cache": "sentencias"}, sentencias["hit_ratio"])]),
+        metricas.serie("cache_entries", "Entradas en cada caché",
+                       [({"cache": "resultados"}, cache["entradas"]), ({"cache": "graficas"}, graficas["pngs_cacheados"]),
+                        ({"cache": "sentencias"}, sentencias["entradas"])]),
+        metricas.serie("snapshot_reloads_total", "Recargas y errores del snapshot de data/",
+                       [({"result": "ok"}, snapshot["recargas"]), ({"result": "error"}, snapshot["errores"])], "counter"),
+        metricas.serie("rollups_refreshes_total", "Refrescos y errores de los rollups de ventas",
+                       [({"result": "ok"}, rollups["refrescos"]), ({"result": "error"}, rollups["errores"])], "counter"),
+        metricas.serie("coalescing_requests_total", "Peticiones que ejecutaron el cálculo o compartieron uno en curso",
+                       [({"coalescer": n, "result": r}, c[clave]) for n, c in coalescedores.items()
+                        for r, clave in (("executed", "ejecuciones"), ("shared", "compartidas"))], "counter"),
+        metricas.serie("coalescing_failures_total", "Cálculos fallidos y esperas agotadas",
+                       [({"coalescer": n, "result": r}, c[clave]) for n, c in coalescedores.items()
+                        for r, clave in (("error", "errores"), ("timeout", "timeouts"))], "counter"),
+        metricas.serie("coalescing_in_flight", "Cálculos en curso", [({"coalescer": n}, c["en_curso"]) for n, c in coalescedores.items()]),
+        metricas.serie("rollups_in_use", "1 si los endpoints de ventas leen de los rollups", [({}, int(rollups["en_uso"]))]),
+    ]
+
+
+@router.get("/metrics", tags=["Monitoreo"], response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metricas.exponer(_metricas_subsistemas()),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/perfil", tags=["Monitoreo"])
+async def get_profiler_status():
+    return metricas.perfilador.estado()
+
+
+@router.post("/perfil", tags=["Monitoreo"], dependencies=[Depends(requiere_admin)])
+async def set_profiler(umbral_ms: float = Query(..., ge=0)):
+    """Activa el volcado de perfiles de las peticiones que tarden más de `umbral_ms` (0 = desactivar)."""
+    metricas.perfilador.configurar(umbral_ms)
+    return metricas.perfilador.estado()
+
+
+@router.get("/analitica", tags=["Monitoreo"])
+async def get_analytics_backends():
+    return analitica.selector.estado()
+
+
+@router.post("/analitica", tags=["Monitoreo"], dependencies=[Depends(requiere_admin)])
+async def set_analytics_backend(endpoint: str, backend: str = Query(..., pattern="^(sql|memory)$")):
+    """Cambia el backend (sql | memory) de un endpoint analítico sin reiniciar."""
+    try:
+        analitica.selector.configurar(endpoint, backend)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Endpoint analítico desconocido: {endpoint}")
+    return analitica.selector.estado()
+
+
+@router.get("/ready", tags=["Monitoreo"])
+async def get_readiness():
+    """200 cuando los subsistemas requeridos (LISTO_REQUIERE) están cargados; 503 mientras tanto."""
+    estado = arranque.estado()
+    return JSONResponse(estado, status_code=200 if estado["listo"] else 503)
@@ -0,0 +1,155 @@
+# prefork.py
+# Servidor multiproceso: el maestro carga la API una vez (conexión, pandas,
+# matplotlib, snapshot de data/, índice de búsqueda, motor analítico y rollups)
+# y después hace fork de WORKERS workers de uvicorn que comparten el socket.
+# Las páginas cargadas antes del fork se comparten entre workers por
+# copy-on-write (gc.freeze evita que el recolector las toque y las duplique).
+#
+# Cada worker tiene su pool de conexiones, sus cachés y su /metrics; las
+# escrituras de un worker invalidan las cachés y el índice de búsqueda de los
+# demás con los contadores compartidos de cache.generaciones. Si un worker
+# muere, el maestro hace fork de otro desde el estado precargado.
+#   python prefork.py --workers 4 --host 0.0.0.0 --port 8000   # WORKERS=0: uno por núcleo
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import asyncio
+import logging
+import argparse
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv('WORKERS', '1'))
+WORKERS_TIMEOUT_CIERRE = float(os.getenv('WORKERS_TIMEOUT_CIERRE', '30'))
+
+
+def numero_workers(workers=WORKERS):
+    return workers if workers > 0 else (len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count())
+
+
+def abrir_socket(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def precargar(app_modulo="main"):
+    """Importa la API y carga en el maestro todo lo que los workers van a compartir."""
+    from cache import generaciones
+    # Antes de importar nada que cree cachés: los contadores viven en memoria compartida
+    generaciones.activar()
+    modulo = __import__(app_modulo)
+    from arranque import arranque
+    from rollups import gestor_rollups
+    from database import engine
+
+    inicio = time.perf_counter()
+    asyncio.run(arranque.precargar())
+    if gestor_rollups.activo:
+        try:
+            gestor_rollups.refrescar()
+        except Exception as e:
+            # Sin rollups los workers calculan en vivo, como con un solo proceso
+            logger.warning("Rollups no disponibles al precargar: %s", e)
+    for nombre, estado in arranque.estado()["subsistemas"].items():
+        if estado["error"]:
+            logger.warning("Precarga de %s fallida (se reintentará en los workers): %s", nombre, estado["error"])
+    logger.info("Precarga en %.2f s", time.perf_counter() - inicio)
+
+    # Las conexiones abiertas no pueden compartirse entre procesos
+    engine.dispose()
+    gc.collect()
+    gc.freeze()
+    return modulo.app
+
+
+def _worker(app, sock, numero, args):
+    import uvicorn
+    from database import engine
+    from rollups import gestor_rollups
+
+    os.environ["WORKER_ID"] = str(numero)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # Por si el maestro dejó conexiones en el pool: que este proceso no las use
+    engine.dispose(close=False)
+    # Un solo worker recalcula los rollups; los demás leen la misma tabla
+    gestor_rollups.periodico = numero == 0
+    config = uvicorn.Config(app, log_level=args.log_level, timeout_graceful_shutdown=WORKERS_TIMEOUT_CIERRE)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _fork(app, sock, numero, args):
+    pid = os.fork()
+    if pid == 0:
+        codigo = 0
+        try:
+            _worker(app, sock, numero, args)
+        except BaseException:
+            logger.exception("Worker %s terminado con error", numero)
+            codigo = 1
+        finally:
+            os._exit(codigo)
+    return pid
+
+
+def servir(args):
+    workers = numero_workers(args.workers)
+    sock = abrir_socket(args.host, args.port)
+    app = precargar(args.app)
+    hijos = {}  # pid -> número de worker
+    parando = False
+
+    def parar(signum, frame):
+        nonlocal parando
+        parando = True
+        for pid in hijos:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, parar)
+    signal.signal(signal.SIGINT, parar)
+    for numero in range(workers):
+        hijos[_fork(app, sock, numero, args)] = numero
+    logger.info("%d workers escuchando en %s:%d", workers, args.host, args.port)
+
+    while hijos:
+        try:
+            pid, estado = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        numero = hijos.pop(pid, None)
+        if numero is None:
+            continue
+        if not parando:
+            logger.warning("Worker %d (pid %d) terminó con estado %d; se reemplaza", numero, pid, estado)
+            time.sleep(0.5)  # sin bucle de forks si el worker falla al arrancar
+            hijos[_fork(app, sock, numero, args)] = numero
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API con varios workers que comparten el snapshot precargado")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="0 = uno por núcleo")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv('API_PORT', '8000')))
+    parser.add_argument("--app", default="main", help="módulo con la app de FastAPI")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(process)d %(name)s %(message)s")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    servir(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# respuestas.py
+# Serialización de resultados de consultas directamente desde las filas del cursor.
+#
+# Los endpoints leen (columnas, filas) con database.leer_filas y responden con
+# `responder`, que codifica con orjson (o con json si no está instalado). Los
+# valores se tratan igual en todos los formatos: NaN e infinito -> null,
+# Decimal -> float, tipos de numpy -> su valor de Python.
+#
+# Formatos (?format=):
+#   records  [{"col": valor, ...}, ...]            (por defecto, el de siempre)
+#   columns  {"columns": [...], "data": {"col": [valores...]}}
+#   arrow    flujo IPC de Apache Arrow (requiere pyarrow)
+import sys
+import json
+import math
+from decimal import Decimal
+
+from fastapi import HTTPException, Response
+
+from metricas import span
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson está en requirements.txt
+    orjson = None
+
+FORMATOS = ("records", "columns", "arrow")
+PATRON_FORMATO = "^(records|columns|arrow)$"
+MEDIA_ARROW = "application/vnd.apache.arrow.stream"
+
+# Resultado vacío (cuando el filtro no encuentra ids y no hace falta consultar)
+VACIO = ((), [])
+
+
+def _es_numpy(valor):
+    # Sin importar numpy: si no está cargado, ningún valor puede ser de numpy
+    np = sys.modules.get("numpy")
+    return np is not None and isinstance(valor, np.generic)
+
+
+def _por_defecto(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if _es_numpy(valor):
+        return valor.item()
+    if isinstance(valor, (bytes, bytearray)):
+        return valor.decode("utf-8", "replace")
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def _valor_json(valor):
+    """Normalización para el json de la biblioteca estándar (orjson ya hace esto)."""
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return None
+    if isinstance(valor, Decimal) or _es_numpy(valor):
+        return _valor_json(_por_defecto(valor))
+    return valor
+
+
+def _limpiar(obj):
+    if isinstance(obj, dict):
+        return {k: _limpiar(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_limpiar(v) for v in obj]
+    return _valor_json(obj)
+
+
+def dumps(contenido) -> bytes:
+    """Codifica `contenido` a JSON con las mismas reglas en todos los endpoints."""
+    if orjson is not None:
+        return orjson.dumps(contenido, default=_por_defecto, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(_limpiar(contenido), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class RespuestaJSON(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        with span("serialize"):
+            return dumps(content)
+
+
+def registros(columnas, filas):
+    """Lista de dicts (formato records) a partir de las filas del cursor."""
+    return [dict(zip(columnas, fila)) for fila in filas]
+
+
+def _columnas(columnas, filas):
+    valores = list(zip(*filas)) if filas else [()] * len(columnas)
+    return {"columns": list(columnas), "data": dict(zip(columnas, valores))}
+
+
+def _arrow(columnas, filas):
+    # pyarrow es opcional y pesado: se importa con la primera petición ?format=arrow
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise HTTPException(status_code=406, detail="format=arrow requires pyarrow")
+    datos = _columnas(columnas, filas)["data"]
+    tabla = pa.table({c: [_por_defecto(v) if isinstance(v, Decimal) or _es_numpy(v) else v for v in datos[c]]
+                      for c in columnas})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    return sink.getvalue().to_pybytes()
+
+
+def responder(resultado, formato="records"):
+    """Respuesta HTTP para un resultado (columnas, filas) en el formato pedido."""
+    columnas, filas = resultado
+    if formato == "arrow":
+        with span("serialize"):
+            return Response(content=_arrow(columnas, filas), media_type=MEDIA_ARROW)
+    with span("serialize"):
+        contenido = _columnas(columnas, filas) if formato == "columns" else registros(columnas, filas)
+    return RespuestaJSON(contenido)
@@ -0,0 +1,245 @@
+# rollups.py
+# Ventas precalculadas por dimensión × año × región en la tabla rollup_ventas.
+#
+# La tabla la crea migraciones.py. Un hilo la recalcula entera cada
+# ROLLUPS_INTERVALO segundos (y al arrancar), y las escrituras de crud.py la
+# ajustan en la misma transacción: se restan las ventas del juego antes de
+# modificarlo y se vuelven a sumar después, así que un cambio de género (o el
+# borrado del juego) mueve sus ventas sin recalcular nada más.
+import os
+import time
+import logging
+import threading
+from collections import defaultdict
+from decimal import Decimal
+from sqlalchemy import Numeric, bindparam, inspect, text
+
+from database import engine, registrar_consulta
+from cache import cache_resultados
+
+logger = logging.getLogger(__name__)
+
+# VENTAS_ROLLUP=0 vuelve a calcular las ventas en vivo sobre region_sales
+VENTAS_ROLLUP = os.getenv('VENTAS_ROLLUP', '1') == '1'
+ROLLUPS_INTERVALO = float(os.getenv('ROLLUPS_INTERVALO', '3600'))
+
+TABLA_ROLLUP = "rollup_ventas"
+
+CREATE_ROLLUP = f"""
+CREATE TABLE IF NOT EXISTS {TABLA_ROLLUP} (
+  dimension VARCHAR(16) NOT NULL,
+  valor_id INT NOT NULL,
+  release_year INT NOT NULL,
+  region_id INT NOT NULL,
+  num_sales DECIMAL(14,2) NOT NULL,
+  PRIMARY KEY (dimension, valor_id, release_year, region_id)
+)
+"""
+
+# region_sales.num_sales es DECIMAL(5,2): con DECIMAL también aquí los rollups dan
+# las mismas sumas exactas que las consultas en vivo, por muchos ajustes que acumulen
+VENTAS = Numeric(14, 2)
+CENTESIMAS = Decimal("0.01")
+
+# Un año o región desconocidos se guardan como 0 para que formen parte de la clave
+# dimensión -> (columna con el valor, joins desde region_sales)
+DIMENSIONES = {
+    'genre': ("g.genre_id", """
+        JOIN game_platform gpl ON gpl.id = rs.game_platform_id
+        JOIN game_publisher gp ON gp.id = gpl.game_publisher_id
+        JOIN game g ON g.id = gp.game_id"""),
+    'publisher': ("gp.publisher_id", """
+        JOIN game_platform gpl ON gpl.id = rs.game_platform_id
+        JOIN game_publisher gp ON gp.id = gpl.game_publisher_id"""),
+    'platform': ("gpl.platform_id", """
+        JOIN game_platform gpl ON gpl.id = rs.game_platform_id"""),
+}
+
+def _insertar_dimension(dimension):
+    columna, joins = DIMENSIONES[dimension]
+    return f"""
+    INSERT INTO {TABLA_ROLLUP} (dimension, valor_id, release_year, region_id, num_sales)
+    SELECT '{dimension}', {columna}, COALESCE(gpl.release_year, 0), COALESCE(rs.region_id, 0), SUM(rs.num_sales)
+    FROM region_sales rs {joins}
+    WHERE {columna} IS NOT NULL AND rs.num_sales IS NOT NULL
+    GROUP BY {columna}, COALESCE(gpl.release_year, 0), COALESCE(rs.region_id, 0)
+    """
+
+
+# Ventas de unos juegos concretos, con el valor de cada dimensión. Se parte de
+# game_publisher (LEFT JOIN a game) igual que las consultas en vivo: si el juego
+# desaparece, sus ventas dejan de contar para el género pero no para el resto.
+VENTAS_JUEGOS = text("""
+    SELECT g.genre_id, gp.publisher_id, gpl.platform_id,
+           COALESCE(gpl.release_year, 0) AS release_year, COALESCE(rs.region_id, 0) AS region_id,
+           SUM(rs.num_sales) AS num_sales
+    FROM game_publisher gp
+    LEFT JOIN game g ON g.id = gp.game_id
+    JOIN game_platform gpl ON gpl.game_publisher_id = gp.id
+    JOIN region_sales rs ON rs.game_platform_id = gpl.id
+    WHERE gp.game_id IN :ids AND rs.num_sales IS NOT NULL
+    GROUP BY g.genre_id, gp.publisher_id, gpl.platform_id, COALESCE(gpl.release_year, 0), COALESCE(rs.region_id, 0)
+    """).bindparams(bindparam("ids", expanding=True))
+
+SUMAR = text(f"""
+    UPDATE {TABLA_ROLLUP} SET num_sales = num_sales + :delta
+    WHERE dimension = :dimension AND valor_id = :valor_id AND release_year = :release_year AND region_id = :region_id
+    """).bindparams(bindparam("delta", type_=VENTAS))
+
+INSERTAR = text(f"""
+    INSERT INTO {TABLA_ROLLUP} (dimension, valor_id, release_year, region_id, num_sales)
+    VALUES (:dimension, :valor_id, :release_year, :region_id, :delta)
+    """).bindparams(bindparam("delta", type_=VENTAS))
+
+
+# Lecturas: misma forma de resultado que las consultas en vivo de routes.py y visualizations.py
+VENTAS_POR_PUBLISHER = registrar_consulta("rollup:/games/publisher-sales", f"""
+    SELECT pub.publisher_name, SUM(r.num_sales) AS total_sales
+    FROM {TABLA_ROLLUP} r
+    JOIN publisher pub ON pub.id = r.valor_id
+    WHERE r.dimension = 'publisher'
+    GROUP BY pub.publisher_name
+    ORDER BY total_sales DESC
+    """)
+
+VENTAS_POR_GENERO = registrar_consulta("rollup:/Graficas_panda/ventas_por_genero", f"""
+    SELECT g.genre_name, SUM(r.num_sales) AS num_sales
+    FROM {TABLA_ROLLUP} r
+    JOIN genre g ON g.id = r.valor_id
+    WHERE r.dimension = 'genre'
+    GROUP BY g.genre_name
+    ORDER BY num_sales DESC
+    """)
+
+VENTAS_POR_PLATAFORMA = registrar_consulta("rollup:/Graficas_panda/ventas_por_plataforma", f"""
+    SELECT p.platform_name, SUM(r.num_sales) AS num_sales
+    FROM {TABLA_ROLLUP} r
+    JOIN platform p ON p.id = r.valor_id
+    WHERE r.dimension = 'platform'
+    GROUP BY p.platform_name
+    ORDER BY num_sales DESC
+    """)
+
+# Cada fila de region_sales está una vez en la dimensión platform, así que sus
+# filas sirven para totalizar por año (o por región) sin otra tabla
+VENTAS_POR_ANIO = registrar_consulta("rollup:/Graficas_panda/ventas_por_año", f"""
+    SELECT NULLIF(r.release_year, 0) AS release_year, SUM(r.num_sales) AS num_sales
+    FROM {TABLA_ROLLUP} r
+    WHERE r.dimension = 'platform'
+    GROUP BY r.release_year
+    ORDER BY r.release_year
+    """)
+
+
+def _decimal(valor):
+    # MySQL devuelve el SUM de un DECIMAL como Decimal; SQLite, como float
+    return valor if isinstance(valor, Decimal) else Decimal(str(valor)).quantize(CENTESIMAS)
+
+
+def _sumar(conn, claves, signo):
+    for (dimension, valor_id, anio, region_id), total in claves.items():
+        params = {"dimension": dimension, "valor_id": valor_id, "release_year": anio,
+                  "region_id": region_id, "delta": signo * total}
+        if conn.execute(SUMAR, params).rowcount == 0 and signo > 0:
+            conn.execute(INSERTAR, params)
+
+
+class GestorRollups:
+    """Recalcula rollup_ventas periódicamente y la mantiene al día con las escrituras."""
+
+    def __init__(self, intervalo=ROLLUPS_INTERVALO, activo=VENTAS_ROLLUP):
+        self.intervalo = intervalo
+        self.activo = activo
+        self.listo = False          # hay un refresco completo hecho en este proceso
+        self.periodico = True       # prefork.py deja el refresco periódico a un solo worker
+        self.refrescos = 0
+        self.ajustes = 0
+        self.errores = 0
+        self.ultimo_refresco = None
+        self._existe = None
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def existe(self):
+        if self._existe is None:
+            self._existe = inspect(engine).has_table(TABLA_ROLLUP)
+        return self._existe
+
+    def usar(self):
+        """True si los endpoints deben leer de los rollups en vez de calcular en vivo."""
+        return self.activo and self.listo
+
+    def refrescar(self):
+        """Recalcula la tabla completa en una sola transacción."""
+        self._existe = None  # por si se acaba de aplicar la migración
+        if not self.existe():
+            raise RuntimeError(f"No existe {TABLA_ROLLUP}: ejecuta 'python migraciones.py aplicar'")
+        with engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {TABLA_ROLLUP}"))
+            for dimension in DIMENSIONES:
+                conn.execute(text(_insertar_dimension(dimension)))
+        self.refrescos += 1
+        self.listo = True
+        self.ultimo_refresco = time.time()
+        cache_resultados.invalidar(TABLA_ROLLUP)
+
+    def ajustar(self, conn, game_ids, signo):
+        """Suma (signo=1) o resta (signo=-1) las ventas actuales de `game_ids` en la tabla."""
+        game_ids = [i for i in set(game_ids) if i is not None]
+        if not game_ids or not self.existe():
+            return
+        claves = defaultdict(Decimal)
+        for fila in conn.execute(VENTAS_JUEGOS, {"ids": game_ids}).mappings():
+            for dimension, columna in (("genre", "genre_id"), ("publisher", "publisher_id"), ("platform", "platform_id")):
+                if fila[columna] is not None:
+                    claves[(dimension, fila[columna], fila["release_year"], fila["region_id"])] += _decimal(fila["num_sales"])
+        if claves:
+            _sumar(conn, claves, signo)
+            self.ajustes += 1
+
+    def escribir(self, conn, query, params):
+        """Ejecuta una escritura sobre `game` ajustando los rollups de los juegos afectados."""
+        lista = params if isinstance(params, list) else [params]
+        ids = [p.get("game_id") for p in lista]
+        self.ajustar(conn, ids, -1)
+        resultado = conn.execute(text(query), params)
+        self.ajustar(conn, ids, 1)
+        return resultado
+
+    def _vigilar(self):
+        while True:
+            try:
+                self.refrescar()
+            except Exception:
+                self.errores += 1
+                logger.exception("No se pudieron refrescar los rollups de ventas")
+            if self.intervalo <= 0 or self._parar.wait(self.intervalo):
+                return
+
+    def iniciar(self):
+        if not self.activo or not self.periodico or (self._hilo and self._hilo.is_alive()):
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._vigilar, name="rollups", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._parar.set()
+        if self._hilo:
+            self._hilo.join()
+            self._hilo = None
+
+    def estado(self):
+        return {
+            "activo": self.activo,
+            "listo": self.listo,
+            "en_uso": self.usar(),
+            "refrescos": self.refrescos,
+            "ultimo_refresco": self.ultimo_refresco,
+            "ajustes": self.ajustes,
+            "errores": self.errores,
+            "intervalo": self.intervalo,
+        }
+
+
+gestor_rollups = GestorRollups()
@@ -1,34 +1,50 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse  # Cambiado a JSONResponse
-import pandas as pd
-from database import engine
+from fastapi import APIRouter, HTTPException, Query
+from database import leer_filas, registrar_consulta
+from respuestas import responder, RespuestaJSON, VACIO, PATRON_FORMATO
+from cache import cache_resultados
+from busqueda import resolutor, indice_juegos
+import rollups
+from rollups import gestor_rollups
+import analitica
 
 router = APIRouter()
 
-@router.get("/games/genre", tags=["Consultas"])
-async def get_games_by_genre(genre: str):
-    query = """
+
+# Todas las consultas responden desde las filas del cursor (respuestas.py);
+# ?format=columns|arrow cambia el formato para resultados grandes.
+FORMATO = Query("records", alias="format", pattern=PATRON_FORMATO)
+
+
+# El término se resuelve a ids en memoria (busqueda.py) y la consulta filtra con
+# IN (ids) sobre columnas indexadas, en lugar de LIKE '%term%'.
+GAMES_BY_GENRE = registrar_consulta("/games/genre", """
     SELECT game.game_name AS nombre_juego, 
            platform.platform_name AS plataforma,
-           release_year AS año_lanzamiento
+           game_platform.release_year AS año_lanzamiento
     FROM game
-    JOIN genre ON genre.id = game.genre_id
     JOIN game_publisher ON game_publisher.game_id = game.id
     JOIN game_platform ON game_platform.game_publisher_id = game_publisher.id
     JOIN platform ON platform.id = game_platform.platform_id
-    WHERE genre.genre_name LIKE %s
-    LIMIT 50;
-    """
+    WHERE game.genre_id IN :genre_ids
+    ORDER BY game.id, game_platform.id
+    LIMIT :limit OFFSET :offset;
+    """,
+    {"genre_ids": [1, 2], "limit": 50, "offset": 0}, expandir=("genre_ids",))
+
+@router.get("/games/genre", tags=["Consultas"])
+async def get_games_by_genre(genre: str, offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500),
+                             formato: str = FORMATO):
+    query = GAMES_BY_GENRE
     try:
-        genre_param = f"%{genre}%"
-        df = pd.read_sql(query, con=engine, params=(genre_param,))
-        return JSONResponse(content=df.to_dict(orient='records'))
+        genre_ids = await resolutor.resolver("genre", genre)
+        if not genre_ids:
+            return responder(VACIO, formato)
+        resultado = await leer_filas(query, {"genre_ids": genre_ids, "limit": limit, "offset": offset})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return responder(resultado, formato)
 
-@router.get("/games/year", tags=["Consultas"])
-async def get_games_by_year_and_platform(year: int, platform: str):
-    query = """
+GAMES_BY_YEAR_AND_PLATFORM = registrar_consulta("/games/year", """
     SELECT 
         g.game_name, 
         p.platform_name, 
@@ -37,19 +53,28 @@ async def get_games_by_year_and_platform(year: int, platform: str):
     INNER JOIN game_publisher gp ON g.id = gp.game_id
     INNER JOIN game_platform gpl ON gp.id = gpl.game_publisher_id
     INNER JOIN platform p ON gpl.platform_id = p.id
-    WHERE gpl.release_year = %s
-    AND p.platform_name LIKE %s
-    LIMIT 50;
-    """
+    WHERE gpl.release_year = :year
+    AND gpl.platform_id IN :platform_ids
+    ORDER BY gpl.id
+    LIMIT :limit OFFSET :offset;
+    """,
+    {"year": 2008, "platform_ids": [1], "limit": 50, "offset": 0}, expandir=("platform_ids",))
+
+@router.get("/games/year", tags=["Consultas"])
+async def get_games_by_year_and_platform(year: int, platform: str,
+                                         offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500),
+                                         formato: str = FORMATO):
+    query = GAMES_BY_YEAR_AND_PLATFORM
     try:
-        df = pd.read_sql(query, con=engine, params=(year, f"%{platform}%"))
-        return JSONResponse(content=df.to_dict(orient='records'))
+        platform_ids = await resolutor.resolver("platform", platform)
+        if not platform_ids:
+            return responder(VACIO, formato)
+        resultado = await leer_filas(query, {"year": year, "platform_ids": platform_ids, "limit": limit, "offset": offset})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return responder(resultado, formato)
 
-@router.get("/games/publisher-sales", tags=["Consultas"])
-async def get_sales_by_publisher():
-    query = """
+SALES_BY_PUBLISHER = registrar_consulta("/games/publisher-sales", """
     SELECT pub.publisher_name, SUM(rs.num_sales) AS total_sales
     FROM publisher pub
     JOIN game_publisher gp ON pub.id = gp.publisher_id
@@ -57,31 +82,48 @@ async def get_sales_by_publisher():
     JOIN region_sales rs ON gpl.id = rs.game_platform_id
     GROUP BY pub.publisher_name
     ORDER BY total_sales DESC
-    """
+    """)
+
+@router.get("/games/publisher-sales", tags=["Consultas"])
+async def get_sales_by_publisher(formato: str = FORMATO):
+    # Con los rollups listos se suma por grupos ya agregados (VENTAS_ROLLUP=0 para calcular en vivo)
+    query = rollups.VENTAS_POR_PUBLISHER if gestor_rollups.usar() else SALES_BY_PUBLISHER
     try:
-        df = pd.read_sql(query, con=engine)
-        return JSONResponse(content=df.to_dict(orient="records"))
+        if analitica.selector.en_memoria("/games/publisher-sales"):
+            return responder(await analitica.leer_filas("/games/publisher-sales"), formato)
+        resultado = await cache_resultados.obtener_o_calcular(
+            "/games/publisher-sales", {},
+            ("publisher", "game_publisher", "game_platform", "region_sales", rollups.TABLA_ROLLUP),
+            lambda: leer_filas(query),
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return responder(resultado, formato)
 
-@router.get("/games/platform-count", tags=["Consultas"])  # Corregido el nombre
-async def get_game_count_per_platform():
-    query = """
+GAME_COUNT_PER_PLATFORM = registrar_consulta("/games/platform-count", """
     SELECT p.platform_name, COUNT(*) AS total_games
     FROM platform p
     JOIN game_platform gpl ON p.id = gpl.platform_id
     GROUP BY p.platform_name
     ORDER BY total_games DESC
-    """
+    """)
+
+@router.get("/games/platform-count", tags=["Consultas"])  # Corregido el nombre
+async def get_game_count_per_platform(formato: str = FORMATO):
+    query = GAME_COUNT_PER_PLATFORM
     try:
-        df = pd.read_sql(query, con=engine)
-        return JSONResponse(content=df.to_dict(orient="records"))
+        if analitica.selector.en_memoria("/games/platform-count"):
+            return responder(await analitica.leer_filas("/games/platform-count"), formato)
+        resultado = await cache_resultados.obtener_o_calcular(
+            "/games/platform-count", {},
+            ("platform", "game_platform"),
+            lambda: leer_filas(query),
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return responder(resultado, formato)
 
-@router.get("/games/top-release-year", tags=["Consultas"])  # Corregido el nombre
-async def get_year_with_most_releases():
-    query = """
+YEAR_WITH_MOST_RELEASES = registrar_consulta("/games/top-release-year", """
     SELECT gp.release_year, COUNT(*) AS total_games
     FROM game g
     JOIN game_publisher gpub ON g.id = gpub.game_id
@@ -90,9 +132,30 @@ async def get_year_with_most_releases():
     GROUP BY gp.release_year
     ORDER BY total_games DESC
     LIMIT 20;
-    """
+    """)
+
+@router.get("/games/top-release-year", tags=["Consultas"])  # Corregido el nombre
+async def get_year_with_most_releases(formato: str = FORMATO):
+    query = YEAR_WITH_MOST_RELEASES
     try:
-        df = pd.read_sql(query, con=engine)
-        return JSONResponse(content=df.to_dict(orient="records"))
+        if analitica.selector.en_memoria("/games/top-release-year"):
+            return responder(await analitica.leer_filas("/games/top-release-year"), formato)
+        resultado = await cache_resultados.obtener_o_calcular(
+            "/games/top-release-year", {},
+            ("game", "game_publisher", "game_platform"),
+            lambda: leer_filas(query),
+        )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    return responder(resultado, formato)
+
+# Búsqueda por nombre con el índice invertido en memoria (busqueda.py): tolera
+# errores de tecleo y prefijos, y se actualiza con cada escritura de crud.py.
+@router.get("/games/search", tags=["Consultas"])
+async def search_games(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=100)):
+    try:
+        indice = await indice_juegos.indice()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    resultados = indice.buscar(q, limit)
+    return RespuestaJSON([{"id": id_, "game_name": nombre, "score": puntuacion} for id_, nombre, puntuacion in resultados])
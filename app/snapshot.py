@@ -0,0 +1,129 @@
+# snapshot.py
+# Recarga en caliente de los datos que sirven las tablas HTML.
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_INTERVALO = float(os.getenv('SNAPSHOT_INTERVALO', '5'))
+
+
+class Snapshot:
+    """Datos cargados y los índices derivados de ellos. Nunca se modifica tras crearse."""
+
+    def __init__(self, data, indice, firma):
+        self.data = data
+        self.indice = indice
+        self.firma = firma
+        self.cargado_en = time.time()
+
+
+def firma_directorio(directorio, patrones=("*.csv",)):
+    """(ruta, mtime, tamaño) de cada archivo: cambia en cuanto se reexporta una tabla."""
+    directorio = Path(directorio)
+    archivos = sorted({a for patron in patrones for a in directorio.glob(patron)})
+    firma = []
+    for a in archivos:
+        try:
+            stat = a.stat()
+        except FileNotFoundError:  # se está reemplazando justo ahora
+            continue
+        firma.append((str(a.relative_to(directorio)), stat.st_mtime_ns, stat.st_size))
+    return tuple(firma)
+
+
+class GestorSnapshot:
+    """Vigila la carpeta de datos y sustituye el snapshot completo cuando cambia.
+
+    El snapshot nuevo se construye en un hilo aparte y se publica con una sola
+    asignación, así que cada petición ve el snapshot anterior o el nuevo, nunca
+    uno a medio cargar. Para no leer archivos que se están escribiendo, la firma
+    tiene que repetirse en dos sondeos seguidos antes de recargar.
+    """
+
+    def __init__(self, directorio, construir, intervalo=SNAPSHOT_INTERVALO, patrones=("*.csv",)):
+        self.directorio = Path(directorio)
+        self.construir = construir  # directorio -> (data, indice)
+        self.intervalo = intervalo
+        self.patrones = patrones
+        self.recargas = 0
+        self.errores = 0
+        self._actual = None
+        self._pendiente = None
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def _cargar(self, firma):
+        data, indice = self.construir(self.directorio)
+        return Snapshot(data, indice, firma)
+
+    @property
+    def cargado(self):
+        return self._actual is not None
+
+    def actual(self) -> Snapshot:
+        snapshot = self._actual
+        if snapshot is None:
+            with self._lock:
+                if self._actual is None:
+                    self._actual = self._cargar(firma_directorio(self.directorio, self.patrones))
+                snapshot = self._actual
+        return snapshot
+
+    def recargar_si_cambio(self):
+        """Recarga si la firma cambió y ya es estable. Devuelve True si hubo recarga."""
+        firma = firma_directorio(self.directorio, self.patrones)
+        if self._actual is not None and firma == self._actual.firma:
+            self._pendiente = None
+            return False
+        if firma != self._pendiente:
+            self._pendiente = firma
+            return False
+        try:
+            nuevo = self._cargar(firma)
+        except Exception:
+            self.errores += 1
+            logger.exception("No se pudo recargar el snapshot de %s", self.directorio)
+            return False
+        with self._lock:
+            self._actual = nuevo
+            self._pendiente = None
+            self.recargas += 1
+        logger.info("Snapshot de %s recargado", self.directorio)
+        return True
+
+    def _vigilar(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.recargar_si_cambio()
+            except Exception:
+                logger.exception("Error vigilando %s", self.directorio)
+
+    def iniciar(self):
+        if self.intervalo <= 0 or (self._hilo and self._hilo.is_alive()):
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._vigilar, name="snapshot", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._parar.set()
+        if self._hilo:
+            self._hilo.join()
+            self._hilo = None
+
+    def estado(self):
+        snapshot = self._actual
+        return {
+            "directorio": str(self.directorio),
+            "cargado": snapshot is not None,
+            "cargado_en": snapshot.cargado_en if snapshot else None,
+            "archivos": len(snapshot.firma) if snapshot else 0,
+            "recargas": self.recargas,
+            "errores": self.errores,
+            "vigilando": bool(self._hilo and self._hilo.is_alive()),
+        }
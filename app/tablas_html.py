@@ -0,0 +1,156 @@
+# tablas_html.py
+# Renderizado de tablas HTML en streaming para los endpoints de /Tablas.
+#
+# La página se envía por trozos: la cabecera (con el estilo, que se genera una
+# vez por título y se reutiliza), las filas en bloques de HTML_LOTE desde un
+# generador, y el pie con la paginación. Nunca se construye la página entera en
+# memoria, así que el tiempo hasta el primer byte y la memoria no dependen del
+# número de filas.
+import os
+import math
+from functools import lru_cache
+from html import escape
+from urllib.parse import urlencode
+
+from fastapi import HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from metricas import span
+
+HTML_LOTE = int(os.getenv('HTML_LOTE', '500'))
+HTML_PAGINA_MAX = int(os.getenv('HTML_PAGINA_MAX', '10000'))
+
+ESTILO = """
+    <style>
+        body { font-family: Arial, sans-serif; padding: 20px; background-color: #f4f4f4; }
+        .table {
+            border-collapse: collapse;
+            width: 80%;
+            margin: auto;
+            background-color: white;
+            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+        }
+        .table th, .table td {
+            border: 1px solid #ddd;
+            padding: 8px;
+            text-align: left;
+        }
+        .table th {
+            background-color: #4CAF50;
+            color: white;
+        }
+        .table th a { color: white; text-decoration: none; }
+        .table tr:nth-child(even){background-color: #f2f2f2;}
+        .table tr:hover {background-color: #ddd;}
+        .paginas { text-align: center; margin: 16px; }
+        .paginas a { margin: 0 8px; }
+    </style>
+    """
+
+
+@lru_cache(maxsize=64)
+def cabecera(titulo: str) -> bytes:
+    """<head> con el estilo y el título; igual para todas las páginas de una tabla."""
+    titulo = escape(titulo)
+    return f"""
+    <html>
+        <head>
+            <title>{titulo}</title>
+            {ESTILO}
+        </head>
+        <body>
+            <h2 style="text-align:center;">{titulo}</h2>
+    """.encode()
+
+
+class ParametrosTabla:
+    """Orden y paginación del servidor: ?sort=columna&order=asc|desc&page=1&page_size=20 (0 = todas)."""
+
+    def __init__(
+        self,
+        page: int = Query(1, ge=1),
+        page_size: int = Query(20, ge=0, le=HTML_PAGINA_MAX),
+        sort: str | None = None,
+        order: str = Query("desc", pattern="^(asc|desc)$"),
+    ):
+        self.page = page
+        self.page_size = page_size
+        self.sort = sort
+        self.order = order
+
+
+# Las celdas llegan de .tolist(): tipos de Python, no de numpy
+def _celda(valor):
+    if isinstance(valor, float):
+        return "" if math.isnan(valor) else f"{valor:.2f}"
+    return escape(str(valor))
+
+
+def _orden(df: "pd.DataFrame", parametros: ParametrosTabla) -> "np.ndarray | None":
+    """Posiciones de las filas en el orden pedido (None = el orden del DataFrame)."""
+    if parametros.sort is None:
+        return None
+    if parametros.sort not in df.columns:
+        raise HTTPException(status_code=400, detail=f"Unknown sort column: {parametros.sort}")
+    columna = df[parametros.sort].reset_index(drop=True)
+    return columna.sort_values(ascending=parametros.order == "asc", kind="stable").index.to_numpy()
+
+
+def _enlace(request: Request, **cambios):
+    params = dict(request.query_params)
+    params.update({k: str(v) for k, v in cambios.items()})
+    return f"{request.url.path}?{escape(urlencode(params))}"
+
+
+def _filas(df: "pd.DataFrame", posiciones, lote):
+    """Genera el HTML de las filas en bloques de `lote` sin copiar el DataFrame entero."""
+    columnas = list(df.columns)
+    for inicio in range(0, len(posiciones), lote):
+        # El span mide solo la construcción del bloque, no la espera a que se envíe
+        with span("render"):
+            bloque = df.iloc[posiciones[inicio:inicio + lote]]
+            valores = [bloque[c].tolist() for c in columnas]
+            html = "".join(
+                "<tr>" + "".join(f"<td>{_celda(v)}</td>" for v in fila) + "</tr>\n"
+                for fila in zip(*valores)
+            ).encode()
+        yield html
+
+
+def _pagina(request, df, titulo, parametros, posiciones, total, desde, hasta):
+    yield cabecera(titulo)
+    encabezados = "".join(
+        f'<th><a href="{_enlace(request, sort=c, order="asc" if parametros.sort == c and parametros.order == "desc" else "desc", page=1)}">'
+        f"{escape(str(c))}</a></th>"
+        for c in df.columns
+    )
+    yield f'<table class="table"><thead><tr>{encabezados}</tr></thead><tbody>\n'.encode()
+    yield from _filas(df, posiciones, HTML_LOTE)
+    yield b"</tbody></table>\n"
+
+    navegacion = [f"Filas {desde + 1 if total else 0}-{hasta} de {total}"]
+    if parametros.page_size and parametros.page > 1:
+        navegacion.insert(0, f'<a href="{_enlace(request, page=parametros.page - 1)}">&laquo; Anterior</a>')
+    if parametros.page_size and hasta < total:
+        navegacion.append(f'<a href="{_enlace(request, page=parametros.page + 1)}">Siguiente &raquo;</a>')
+    yield f'<div class="paginas">{" ".join(navegacion)}</div>\n</body>\n</html>\n'.encode()
+
+
+def tabla_html(request: Request, df: "pd.DataFrame", titulo: str, parametros: ParametrosTabla) -> StreamingResponse:
+    """Respuesta HTML en streaming con la página pedida de `df`."""
+    import numpy as np
+    orden = _orden(df, parametros)
+    total = len(df)
+    if parametros.page_size:
+        desde = (parametros.page - 1) * parametros.page_size
+        if parametros.page > 1 and desde >= total:
+            paginas = max(math.ceil(total / parametros.page_size), 1)
+            raise HTTPException(status_code=404, detail=f"Page {parametros.page} out of range (last page: {paginas})")
+        hasta = min(desde + parametros.page_size, total)
+    else:
+        desde, hasta = 0, total
+    posiciones = orden[desde:hasta] if orden is not None else np.arange(desde, hasta)
+    return StreamingResponse(
+        _pagina(request, df, titulo, parametros, posiciones, total, desde, hasta),
+        media_type="text/html; charset=utf-8",
+    )
@@ -0,0 +1,64 @@
+# Las pruebas corren contra la réplica SQLite de benchmarks.standin, sin MySQL.
+# database.py crea el engine al importarse, así que DATABASE_URL se fija aquí,
+# antes de que ningún test importe los módulos de la API.
+#   cd app && python -m pytest -q tests
+import os
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+APP_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(APP_DIR))
+
+from benchmarks.standin import construir_sqlite, url_sqlite  # noqa: E402
+
+_TMP = Path(tempfile.mkdtemp(prefix="api_consultas_tests_"))
+REPLICA = construir_sqlite(_TMP / "video_games.sqlite")
+os.environ["DATABASE_URL"] = url_sqlite(REPLICA)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_TMP, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def replica():
+    """Ruta de la réplica SQLite que usa database.engine."""
+    return REPLICA
+
+
+@pytest.fixture
+def sqlite_vacia(tmp_path):
+    """Engine de una copia de la réplica con el esquema y sin filas."""
+    import sqlite3
+    from database import crear_engine
+    ruta = tmp_path / "vacia.sqlite"
+    shutil.copy(REPLICA, ruta)
+    conn = sqlite3.connect(ruta)
+    tablas = [t for (t,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    for tabla in tablas:
+        conn.execute(f"DELETE FROM {tabla}")
+    conn.commit()
+    conn.close()
+    motor = crear_engine(url_sqlite(ruta))
+    yield motor
+    motor.dispose()
+
+
+@pytest.fixture(scope="session")
+def api(replica):
+    """TestClient de la API sobre la réplica migrada, con rollups y data/ exportada (sin lifespan)."""
+    from fastapi.testclient import TestClient
+    from database import engine, extraer_tablas, tablas
+    from migraciones import aplicar
+    from rollups import gestor_rollups
+    aplicar(engine)
+    gestor_rollups.refrescar()
+    extraer_tablas(tablas, str(_TMP / "data"))
+    # tables.py y analitica.py leen ./data
+    os.chdir(_TMP)
+    from main import app
+    return TestClient(app)
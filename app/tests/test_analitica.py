@@ -0,0 +1,12 @@
+import pytest
+
+import analitica
+
+
+@pytest.mark.parametrize("origen", ["sql", "rollup"])
+def test_memoria_coincide_con_sql(api, origen):
+    """El motor en memoria da lo mismo que las consultas en vivo y que las de rollup_ventas."""
+    consultas = [c for c in analitica.consultas_comparables(con_rollups=True) if c[1] == origen]
+    assert len(consultas) == (len(analitica.CONSULTAS_MEMORIA) if origen == "sql" else 4)
+    diferencias = {endpoint: analitica.comparar(endpoint, sql) for endpoint, _, sql in consultas}
+    assert diferencias == {endpoint: [] for endpoint, _, _ in consultas}
@@ -0,0 +1,62 @@
+import pytest
+
+from busqueda import IndiceJuegos, distancia_edicion
+
+JUEGOS = [
+    (1, "The Legend of Zelda"),
+    (2, "Super Mario Bros."),
+    (3, "Mario Kart Wii"),
+    (4, "Pokémon Red"),
+    (5, "Final Fantasy VII"),
+    (6, "Halo 3"),
+    (7, "Grand Theft Auto V"),
+]
+
+
+@pytest.fixture(scope="module")
+def indice():
+    return IndiceJuegos(JUEGOS)
+
+
+def _ids(indice, consulta):
+    return [id_ for id_, _, _ in indice.buscar(consulta)]
+
+
+@pytest.mark.parametrize("consulta, esperado", [
+    ("zelada", 1),            # letra de más
+    ("zelda", 1),
+    ("marjo", 2),             # letra cambiada
+    ("super marjo bros", 2),
+    ("pokemn", 4),            # letra de menos, sin acento
+    ("final fantsy", 5),
+    ("fianl fantasy", 5),     # dos letras cambiadas de sitio
+    ("grnad theft", 7),
+])
+def test_errores_de_tecleo(indice, consulta, esperado):
+    assert esperado in _ids(indice, consulta)[:2]
+
+
+def test_sin_parecido_no_devuelve_nada(indice):
+    assert _ids(indice, "xyzzy") == []
+    # Tres ediciones en una palabra corta ya no es un error de tecleo
+    assert _ids(indice, "hola") == []
+
+
+def test_prefijo_y_exacto_antes_que_el_error(indice):
+    assert set(_ids(indice, "mario")[:2]) == {2, 3}
+    assert _ids(indice, "hal") == [6]
+
+
+def test_distancia_edicion():
+    assert distancia_edicion("zelada", "zelda", 2) == 1
+    assert distancia_edicion("marjo", "mario", 2) == 1
+    assert distancia_edicion("fianl", "final", 2) == 2
+    assert distancia_edicion("abc", "xyzuvw", 2) == 3
+
+
+def test_eliminar_quita_las_variantes():
+    indice = IndiceJuegos(JUEGOS)
+    indice.eliminar(1)
+    assert _ids(indice, "zelada") == []
+    indice.agregar(1, "The Legend of Zelda")
+    assert _ids(indice, "zelada") == [1]
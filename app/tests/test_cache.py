@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+import coalescencia
+from cache import CacheResultados
+
+
+@pytest.fixture(autouse=True)
+def _coalescedores(monkeypatch):
+    # Cada CacheResultados registra su coalescedor; que no sustituya al de la API
+    monkeypatch.setattr(coalescencia, "COALESCEDORES", dict(coalescencia.COALESCEDORES))
+
+
+def test_lectura_tras_escritura_no_recibe_el_calculo_anterior():
+    cache = CacheResultados()
+    datos = {"valor": "viejo"}
+
+    async def calcular():
+        valor = datos["valor"]
+        await asyncio.sleep(0.05)
+        return valor
+
+    async def escenario():
+        anterior = asyncio.ensure_future(cache.obtener_o_calcular("/x", {}, ["game"], calcular))
+        await asyncio.sleep(0.01)
+        # Escritura mientras el primer cálculo sigue en curso
+        datos["valor"] = "nuevo"
+        cache.invalidar("game")
+        posterior = await cache.obtener_o_calcular("/x", {}, ["game"], calcular)
+        return await anterior, posterior
+
+    anterior, posterior = asyncio.run(escenario())
+    assert (anterior, posterior) == ("viejo", "nuevo")
+    assert asyncio.run(cache.obtener_o_calcular("/x", {}, ["game"], calcular)) == "nuevo"
+
+
+def test_peticiones_simultaneas_comparten_el_calculo():
+    cache = CacheResultados()
+    llamadas = []
+
+    async def calcular():
+        llamadas.append(1)
+        await asyncio.sleep(0.01)
+        return 1
+
+    async def escenario():
+        return await asyncio.gather(*(cache.obtener_o_calcular("/x", {}, ["game"], calcular) for _ in range(5)))
+
+    assert asyncio.run(escenario()) == [1] * 5
+    assert len(llamadas) == 1
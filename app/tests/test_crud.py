@@ -0,0 +1,44 @@
+from sqlalchemy import text
+
+from database import engine
+
+
+def _juego(game_id):
+    with engine.connect() as conn:
+        fila = conn.execute(text("SELECT game_name, genre_id FROM game WHERE id = :id"), {"id": game_id}).first()
+    return tuple(fila) if fila else None
+
+
+def _ids_desde(api, after_id):
+    return [g["id"] for g in api.get(f"/games?fields=id&after_id={after_id}").json()["games"]]
+
+
+def test_escrituras_sueltas(api):
+    max_id = _ids_desde(api, 0)[-1]
+    assert api.post("/games", json={"game_name": "Prueba suelta", "genre_id": 3}).status_code == 200
+    [nuevo] = _ids_desde(api, max_id)
+    assert _juego(nuevo) == ("Prueba suelta", 3)
+
+    assert api.put(f"/games/{nuevo}", json={"genre_id": 5}).status_code == 200
+    assert _juego(nuevo) == ("Prueba suelta", 5)
+
+    assert api.delete(f"/games/{nuevo}").status_code == 200
+    assert _juego(nuevo) is None
+
+
+def test_escrituras_masivas(api):
+    max_id = _ids_desde(api, 0)[-1]
+    r = api.post("/games/bulk", json=[{"game_name": f"Prueba {i}", "genre_id": 1 + i} for i in range(3)]
+                 + [{"game_name": "Sin género"}])
+    assert (r.json()["ok"], r.json()["errors"]) == (3, 1)
+    ids = _ids_desde(api, max_id)
+    assert [_juego(i) for i in ids] == [("Prueba 0", 1), ("Prueba 1", 2), ("Prueba 2", 3)]
+
+    r = api.patch("/games/bulk", json=[{"id": ids[0], "game_name": "Renombrado"}, {"id": ids[1], "genre_id": 7},
+                                       {"id": 10 ** 9, "genre_id": 1}])
+    assert [x["status"] for x in r.json()["results"]] == ["ok", "ok", "error"]
+    assert [_juego(i) for i in ids] == [("Renombrado", 1), ("Prueba 1", 7), ("Prueba 2", 3)]
+
+    r = api.request("DELETE", "/games/bulk", json=[{"id": i} for i in ids])
+    assert r.json()["ok"] == 3
+    assert _ids_desde(api, max_id) == []
@@ -0,0 +1,62 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as TimeoutPool
+
+from database import PoolMedido, _firma_tabla
+
+
+def test_solo_el_pool_agotado_cuenta_como_timeout():
+    pool = PoolMedido(lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=0, timeout=0.01)
+    conexion = pool.connect()
+    with pytest.raises(TimeoutPool):
+        pool.connect()
+    conexion.close()
+    assert pool.timeouts == 1
+
+
+def test_fallo_al_conectar_no_es_timeout():
+    def conectar():
+        raise sqlite3.OperationalError("unable to open database file")
+
+    pool = PoolMedido(conectar, pool_size=1, max_overflow=0, timeout=0.01)
+    with pytest.raises(sqlite3.OperationalError):
+        pool.connect()
+    assert pool.timeouts == 0 and pool.esperas == 1
+
+
+def test_firma_de_region_sales_cambia_al_reemplazar_ventas(sqlite_vacia):
+    insertar = text("INSERT INTO region_sales (region_id, game_platform_id, num_sales) VALUES (:r, 7, 1.5)")
+    with sqlite_vacia.begin() as conn:
+        conn.execute(insertar, [{"r": 1}, {"r": 2}])
+        antes = _firma_tabla(conn, "region_sales")
+        # Mismo número de filas y mismo game_platform_id máximo
+        conn.execute(text("DELETE FROM region_sales WHERE region_id = 1"))
+        conn.execute(insertar, {"r": 3})
+        assert _firma_tabla(conn, "region_sales") != antes
+
+
+def test_abrir_conexiones_no_cuenta_como_espera():
+    import time
+
+    def lenta():
+        time.sleep(0.05)
+        return sqlite3.connect(":memory:")
+
+    pool = PoolMedido(lenta, pool_size=1, max_overflow=1, timeout=1)
+    primera, segunda = pool.connect(), pool.connect()  # la segunda abre una de overflow
+    assert pool.conexiones == 2 and pool.conexion_total >= 0.1
+    assert pool.espera_max < 0.05
+    primera.close()
+    segunda.close()
+
+
+def test_espera_por_una_conexion_ocupada():
+    import threading
+
+    pool = PoolMedido(lambda: sqlite3.connect(":memory:", check_same_thread=False), pool_size=1, max_overflow=0, timeout=1)
+    ocupada = pool.connect()
+    threading.Timer(0.05, ocupada.close).start()
+    pool.connect().close()
+    assert pool.espera_max >= 0.04 and pool.conexiones == 1
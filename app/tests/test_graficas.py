@@ -0,0 +1,27 @@
+import pytest
+
+from graficas import coincide_etag
+
+ETAG = '"abc123"'
+
+
+@pytest.mark.parametrize("cabecera, esperado", [
+    ('"abc123"', True),
+    ('W/"abc123"', True),
+    ('"otra", W/"abc123"', True),
+    ('"otra",W/"abc123" ,"mas"', True),
+    ("*", True),
+    ('"otra"', False),
+    ('W/"abc1234"', False),
+    ("", False),
+])
+def test_coincide_etag(cabecera, esperado):
+    assert coincide_etag(cabecera, ETAG) is esperado
+
+
+def test_304_con_etag_debil(api):
+    r = api.get("/Graficas_panda/ventas_por_genero")
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    assert api.get("/Graficas_panda/ventas_por_genero", headers={"If-None-Match": f'"x", W/{etag}'}).status_code == 304
+    assert api.get("/Graficas_panda/ventas_por_genero", headers={"If-None-Match": '"x"'}).status_code == 200
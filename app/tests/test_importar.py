@@ -0,0 +1,148 @@
+import io
+
+import pytest
+from sqlalchemy import text
+
+from importar import Importador, estado, fuentes
+
+# mysqldump parte las tablas grandes en varios INSERT
+DUMP = """
+DROP TABLE IF EXISTS video_games.genre;
+INSERT INTO video_games.genre VALUES (1,'Action'),
+(2,'Adventure');
+INSERT INTO video_games.genre VALUES (3,'Fighting'),
+(4,'Misc');
+"""
+
+
+def _genres(motor):
+    with motor.connect() as conn:
+        return [tuple(f) for f in conn.execute(text("SELECT id, genre_name FROM genre ORDER BY id"))]
+
+
+def _importador(motor):
+    return Importador(motor=motor, lote=1, salida=io.StringIO())
+
+
+def test_varios_insert_de_la_misma_tabla(sqlite_vacia, tmp_path):
+    dump = tmp_path / "01_genre.sql"
+    dump.write_text(DUMP, encoding="utf-8")
+
+    _importador(sqlite_vacia).importar(fuentes(dump), reconstruir_indices=False)
+
+    assert _genres(sqlite_vacia) == [(1, "Action"), (2, "Adventure"), (3, "Fighting"), (4, "Misc")]
+
+
+def test_reanuda_en_el_segundo_insert(sqlite_vacia, tmp_path):
+    dump = tmp_path / "01_genre.sql"
+    dump.write_text(DUMP, encoding="utf-8")
+
+    def cortar(lista):
+        # El segundo INSERT se interrumpe tras confirmar su primera fila
+        for n, fuente in enumerate(lista):
+            if n == 1:
+                filas = fuente.filas
+
+                def una_y_fallo():
+                    yield next(filas)
+                    raise KeyboardInterrupt
+                fuente.filas = una_y_fallo()
+            yield fuente
+
+    with pytest.raises(KeyboardInterrupt):
+        _importador(sqlite_vacia).importar(cortar(fuentes(dump)), reconstruir_indices=False)
+    assert [f[:4] for f in estado(sqlite_vacia)] == [("01_genre.sql", "genre", 2, 1), ("01_genre.sql#2", "genre", 1, 0)]
+
+    salida = io.StringIO()
+    importador = Importador(motor=sqlite_vacia, lote=1, salida=salida)
+    importador.importar(fuentes(dump), reconstruir_indices=False)
+
+    assert _genres(sqlite_vacia) == [(1, "Action"), (2, "Adventure"), (3, "Fighting"), (4, "Misc")]
+    assert "ya importada" in salida.getvalue() and "se reanuda tras 1 filas" in salida.getvalue()
+    assert estado(sqlite_vacia) == []
+
+
+def test_claves_ajenas_con_tablas_que_no_existen(sqlite_vacia, tmp_path):
+    with sqlite_vacia.begin() as conn:
+        conn.execute(text("DROP TABLE game"))
+    dump = tmp_path / "01_genre.sql"
+    dump.write_text(DUMP, encoding="utf-8")
+
+    sin_referencia = _importador(sqlite_vacia).importar(fuentes(dump), reconstruir_indices=False)
+
+    assert sin_referencia == {}
+    assert len(_genres(sqlite_vacia)) == 4
+
+
+def test_invalida_las_caches_de_la_api(api, monkeypatch):
+    import socket
+    import threading
+    import uvicorn
+    import monitoreo
+    from main import app
+    from cache import cache_resultados
+
+    monkeypatch.setattr(monitoreo, "ADMIN_TOKEN", "secreto")
+    monkeypatch.setenv("ADMIN_TOKEN", "secreto")
+    assert api.get("/games/platform-count").status_code == 200
+    assert any(e[0] == "/games/platform-count" for e in cache_resultados._entradas)
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    servidor = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="off"))
+    hilo = threading.Thread(target=servidor.run, kwargs={"sockets": [sock]}, daemon=True)
+    hilo.start()
+    try:
+        while not servidor.started:
+            hilo.join(0.05)
+        salida = io.StringIO()
+        Importador(salida=salida).avisar_api({"game_platform"}, f"http://127.0.0.1:{sock.getsockname()[1]}")
+    finally:
+        servidor.should_exit = True
+        hilo.join()
+
+    assert "cachés de la API invalidadas" in salida.getvalue()
+    assert not any(e[0] == "/games/platform-count" for e in cache_resultados._entradas)
+
+
+def test_sin_api_avisa_de_las_caches(sqlite_vacia):
+    salida = io.StringIO()
+    Importador(motor=sqlite_vacia, salida=salida, api_url="").avisar_api({"genre"})
+    assert "desde sus cachés" in salida.getvalue()
+
+
+def test_anexar_sobre_filas_existentes_explica_el_error(sqlite_vacia, tmp_path):
+    dump = tmp_path / "01_genre.sql"
+    dump.write_text(DUMP, encoding="utf-8")
+    _importador(sqlite_vacia).importar(fuentes(dump), reconstruir_indices=False)
+
+    salida = io.StringIO()
+    with pytest.raises(RuntimeError, match="--modo reemplazar"):
+        Importador(motor=sqlite_vacia, lote=1, salida=salida).importar(fuentes(dump), reconstruir_indices=False)
+    assert "genre ya tiene filas" in salida.getvalue()
+
+    # Lo que propone el error funciona a continuación
+    Importador(motor=sqlite_vacia, lote=1, modo="reemplazar", salida=io.StringIO()).importar(
+        fuentes(dump), reconstruir_indices=False)
+    assert len(_genres(sqlite_vacia)) == 4
+
+
+def test_restaura_las_comprobaciones_de_la_sesion(sqlite_vacia, tmp_path):
+    from sqlalchemy import event
+
+    @event.listens_for(sqlite_vacia, "connect")
+    def activar(dbapi, _):
+        dbapi.execute("PRAGMA foreign_keys = ON")
+
+    devueltas = []
+
+    @event.listens_for(sqlite_vacia, "checkin")
+    def comprobar(dbapi, _):
+        devueltas.append(dbapi.execute("PRAGMA foreign_keys").fetchone()[0])
+
+    sqlite_vacia.dispose()
+    dump = tmp_path / "01_genre.sql"
+    dump.write_text(DUMP, encoding="utf-8")
+    _importador(sqlite_vacia).importar(fuentes(dump), reconstruir_indices=False)
+
+    assert devueltas and all(devueltas)
@@ -0,0 +1,44 @@
+import re
+
+from metricas import Contador, serie
+
+# Valor de etiqueta válido en el formato de exposición: sin " ni saltos de línea sin escapar
+VALOR = r'"(?:[^"\\\n]|\\[\\"n])*"'
+LINEA = re.compile(rf'^\w+\{{\w+={VALOR}(?:,\w+={VALOR})*\}} \S+$')
+
+
+def test_etiquetas_escapadas():
+    contador = Contador("prueba_total", "Prueba")
+    contador.sumar(route='/items/"raro"', method="GET")
+    contador.sumar(route="C:\\ruta\ncon salto", method="GET")
+    lineas = contador.exponer()[2:] + serie("prueba", "Prueba", [({"nombre": 'a"b'}, 1)])[2:]
+    assert all(LINEA.match(linea) for linea in lineas), lineas
+    texto = "\n".join(lineas)
+    assert 'route="/items/\\"raro\\""' in texto
+    assert 'route="C:\\\\ruta\\ncon salto"' in texto
+
+
+def test_volcado_fuera_del_event_loop(monkeypatch):
+    import threading
+    import anyio
+    import metricas
+
+    hilos = {}
+
+    async def lenta(scope, receive, send):
+        hilos["peticion"] = threading.get_ident()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def enviar(mensaje):
+        pass
+
+    def volcar(ruta, inicio, fin):
+        hilos["volcado"] = threading.get_ident()
+        return None
+
+    monkeypatch.setattr(metricas.perfilador, "umbral_ms", 0.000001)
+    monkeypatch.setattr(metricas.perfilador, "volcar", volcar)
+    anyio.run(metricas.MiddlewareMetricas(lenta), {"type": "http", "path": "/", "method": "GET"}, None, enviar)
+
+    assert hilos["volcado"] != hilos["peticion"]
@@ -0,0 +1,14 @@
+import pytest
+
+import monitoreo
+
+
+@pytest.mark.parametrize("ruta", ["/perfil?umbral_ms=0", "/analitica?endpoint=/games/platform-count&backend=sql"])
+def test_post_de_administracion(api, monkeypatch, ruta):
+    monkeypatch.setattr(monitoreo, "ADMIN_TOKEN", "")
+    assert api.post(ruta, headers={"X-Admin-Token": ""}).status_code == 403
+
+    monkeypatch.setattr(monitoreo, "ADMIN_TOKEN", "secreto")
+    assert api.post(ruta).status_code == 401
+    assert api.post(ruta, headers={"X-Admin-Token": "otro"}).status_code == 401
+    assert api.post(ruta, headers={"X-Admin-Token": "secreto"}).status_code == 200
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import text
+
+from database import engine
+from rollups import TABLA_ROLLUP, gestor_rollups
+
+
+def _rollups():
+    with engine.connect() as conn:
+        filas = conn.execute(text(f"SELECT dimension, valor_id, release_year, region_id, num_sales FROM {TABLA_ROLLUP}"))
+        # Un grupo que se queda sin ventas queda a 0 en vez de desaparecer
+        return {tuple(f[:4]): round(f[4], 6) for f in filas if round(f[4], 6) != 0}
+
+
+@pytest.fixture
+def juegos_restaurados():
+    """Deja game como estaba al terminar (las pruebas de la API comparten la réplica)."""
+    with engine.connect() as conn:
+        antes = conn.execute(text("SELECT id, genre_id, game_name FROM game")).all()
+    yield
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM game"))
+        conn.execute(text("INSERT INTO game (id, genre_id, game_name) VALUES (:id, :genre_id, :game_name)"),
+                     [dict(f._mapping) for f in antes])
+    gestor_rollups.refrescar()
+
+
+def test_escrituras_de_la_api_mantienen_los_rollups(api, juegos_restaurados):
+    antes = _rollups()
+    # Juegos con ventas en varias plataformas y regiones
+    assert api.put("/games/6516", json={"genre_id": 2}).status_code == 200
+    r = api.patch("/games/bulk", json=[{"id": 7663, "genre_id": 12}, {"id": 5112, "game_name": "Renombrado"}])
+    assert r.json()["ok"] == 2
+    assert api.delete("/games/3040").status_code == 200
+    assert api.request("DELETE", "/games/bulk", json=[{"id": 9863}]).json()["ok"] == 1
+    assert api.post("/games/bulk", json=[{"game_name": "Sin ventas", "genre_id": 1}]).json()["ok"] == 1
+
+    incrementales = _rollups()
+    assert incrementales != antes
+    gestor_rollups.refrescar()
+    assert incrementales == _rollups()
+
+
+def test_ajustes_en_decimal(monkeypatch):
+    from decimal import Decimal
+    import rollups
+
+    deltas = []
+    monkeypatch.setattr(rollups, "_sumar", lambda conn, claves, signo: deltas.extend(claves.values()))
+    with engine.connect() as conn:
+        gestor_rollups.ajustar(conn, [6516, 7663], 1)
+    # Las sumas de DECIMAL(5,2) no arrastran ruido de coma flotante
+    assert deltas and all(isinstance(d, Decimal) and d == d.quantize(rollups.CENTESIMAS) for d in deltas)
+    assert "DECIMAL(14,2)" in rollups.CREATE_ROLLUP
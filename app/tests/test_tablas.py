@@ -0,0 +1,21 @@
+import re
+
+
+def _filas(html):
+    return re.search(r"Filas (\d+)-(\d+) de (\d+)", html).groups()
+
+
+def test_ultima_pagina(api):
+    total = int(_filas(api.get("/Tablas/tabla/regions").text)[2])
+    ultima = -(-total // 2)
+    respuesta = api.get("/Tablas/tabla/regions", params={"page": ultima, "page_size": 2})
+    assert respuesta.status_code == 200
+    desde, hasta, _ = map(int, _filas(respuesta.text))
+    assert desde <= hasta == total and "Siguiente" not in respuesta.text
+
+
+def test_pagina_fuera_de_rango(api):
+    total = int(_filas(api.get("/Tablas/tabla/regions").text)[2])
+    respuesta = api.get("/Tablas/tabla/regions", params={"page": total + 1, "page_size": 1})
+    assert respuesta.status_code == 404
+    assert f"last page: {total}" in respuesta.json()["detail"]
@@ -0,0 +1,235 @@
+# ventas.py
+# /sales/query: ventas agrupadas por las dimensiones pedidas (genre, publisher,
+# platform, region, year) con filtros de rango de años, conjuntos de ids y top-N,
+# en una sola consulta SQL parametrizada.
+#
+# Cada combinación de dimensiones y filtros presentes se compila una vez a una
+# cláusula text() y se guarda en una caché LRU; los valores van siempre como
+# parámetros, así que las peticiones con la misma forma reutilizan la sentencia.
+# Si como mucho interviene una de genre/publisher/platform y los rollups están
+# listos, la consulta lee rollup_ventas en vez de recorrer region_sales.
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy import bindparam, text
+
+from database import leer_filas, registrar_consulta
+from respuestas import responder, PATRON_FORMATO
+from cache import cache_resultados
+import rollups
+from rollups import gestor_rollups
+
+router = APIRouter()
+
+VENTAS_SENTENCIAS_MAX = int(os.getenv('VENTAS_SENTENCIAS_MAX', '256'))
+
+# Joins desde region_sales, en orden: alias -> (join, alias del que depende)
+JOINS = {
+    'gpl': ("JOIN game_platform gpl ON gpl.id = rs.game_platform_id", None),
+    'gp': ("JOIN game_publisher gp ON gp.id = gpl.game_publisher_id", 'gpl'),
+    'g': ("JOIN game g ON g.id = gp.game_id", 'gp'),
+}
+
+# dimensión -> (columna del id en vivo, alias que la aporta, tabla del nombre, alias, columna del nombre)
+# year no tiene tabla de nombres; region sale de region_sales sin más joins.
+DIMENSIONES = {
+    'genre': ("g.genre_id", 'g', "genre", "ge", "genre_name"),
+    'publisher': ("gp.publisher_id", 'gp', "publisher", "pub", "publisher_name"),
+    'platform': ("gpl.platform_id", 'gpl', "platform", "pla", "platform_name"),
+    'region': ("rs.region_id", None, "region", "re", "region_name"),
+    'year': ("gpl.release_year", 'gpl', None, None, None),
+}
+
+# Dimensiones que tienen su propia fila en rollup_ventas (las demás son columnas de todas)
+DIMENSIONES_ROLLUP = tuple(rollups.DIMENSIONES)
+
+# Filtros por conjunto de ids: parámetro -> dimensión
+FILTROS_IDS = {'genre_ids': 'genre', 'publisher_ids': 'publisher', 'platform_ids': 'platform', 'region_ids': 'region'}
+
+
+class CacheSentencias:
+    """Sentencias compiladas por forma de consulta, con expulsión LRU."""
+
+    def __init__(self, max_entradas=VENTAS_SENTENCIAS_MAX):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()  # forma -> (text(), tablas)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def obtener(self, forma):
+        with self._lock:
+            sentencia = self._entradas.get(forma)
+            if sentencia is not None:
+                self._entradas.move_to_end(forma)
+                self.hits += 1
+                return sentencia
+            self.misses += 1
+        # Compilar fuera del lock; si dos hilos compilan la misma forma gana el último
+        sentencia = compilar(*forma)
+        with self._lock:
+            self._entradas[forma] = sentencia
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return sentencia
+
+    def estadisticas(self):
+        total = self.hits + self.misses
+        return {
+            "entradas": len(self._entradas),
+            "max_entradas": self.max_entradas,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def _sql(dimensiones, filtros, anios, top, dimension_rollup):
+    """SQL, parámetros expandidos y tablas leídas de una forma de consulta."""
+    rollup = dimension_rollup is not None
+    columnas, grupos, orden, joins, where = [], [], [], [], []
+    tablas = {rollups.TABLA_ROLLUP} if rollup else {"region_sales"}
+    necesarios = set()
+
+    def columna(dim):
+        if rollup:
+            if dim == dimension_rollup:
+                return "r.valor_id"
+            return "r.release_year" if dim == 'year' else "r.region_id"
+        viva, alias = DIMENSIONES[dim][:2]
+        if alias:
+            necesarios.add(alias)
+        return viva
+
+    for dim in dimensiones:
+        col = columna(dim)
+        _, _, tabla, alias, nombre = DIMENSIONES[dim]
+        if tabla is None:
+            # Año desconocido: NULL en vivo, 0 en los rollups
+            columnas.append(f"NULLIF({col}, 0) AS release_year" if rollup else f"{col} AS release_year")
+            grupos.append(col)
+        else:
+            joins.append(f"JOIN {tabla} {alias} ON {alias}.id = {col}")
+            tablas.add(tabla)
+            columnas += [f"{col} AS {dim}_id", f"{alias}.{nombre}"]
+            grupos += [col, f"{alias}.{nombre}"]
+        orden.append(col)
+
+    if rollup:
+        where.append(f"r.dimension = '{dimension_rollup}'")
+    for parametro in filtros:
+        where.append(f"{columna(FILTROS_IDS[parametro])} IN :{parametro}")
+    if anios:
+        col = columna('year')
+        if anios == ('desde', 'hasta'):
+            where.append(f"{col} BETWEEN :anio_desde AND :anio_hasta")
+        elif anios == ('desde',):
+            where.append(f"{col} >= :anio_desde")
+        else:
+            # En los rollups el año desconocido es 0 y no debe entrar en el rango
+            where.append(f"{col} BETWEEN 1 AND :anio_hasta" if rollup else f"{col} <= :anio_hasta")
+
+    if not rollup:
+        # Cada join trae el anterior de la cadena region_sales -> game_platform -> game_publisher -> game
+        for alias in ('g', 'gp'):
+            if alias in necesarios:
+                necesarios.add(JOINS[alias][1])
+        tablas.update({'gpl': "game_platform", 'gp': "game_publisher", 'g': "game"}[a] for a in necesarios)
+        joins = [JOINS[a][0] for a in JOINS if a in necesarios] + joins
+
+    total = "SUM(r.num_sales)" if rollup else "SUM(rs.num_sales)"
+    sql = f"SELECT {', '.join(columnas + [f'{total} AS total_sales'])}\n"
+    sql += f"    FROM {rollups.TABLA_ROLLUP} r\n" if rollup else "    FROM region_sales rs\n"
+    sql += "".join(f"    {j}\n" for j in joins)
+    if where:
+        sql += f"    WHERE {' AND '.join(where)}\n"
+    if grupos:
+        sql += f"    GROUP BY {', '.join(grupos)}\n"
+    if top:
+        sql += f"    ORDER BY {', '.join(['total_sales DESC'] + orden)}\n    LIMIT :top\n"
+    elif orden:
+        sql += f"    ORDER BY {', '.join(orden)}\n"
+    return sql, tuple(filtros), tuple(sorted(tablas))
+
+
+def compilar(dimensiones, filtros, anios, top, dimension_rollup):
+    """Compila una forma de consulta a (text(), tablas de las que depende)."""
+    sql, expandir, tablas = _sql(dimensiones, filtros, anios, top, dimension_rollup)
+    return text(sql).bindparams(*[bindparam(p, expanding=True) for p in expandir]), tablas
+
+
+def forma_consulta(dimensiones, filtros, anios, top, rollups_listos):
+    """Clave de la caché de sentencias; decide si la consulta puede leer de los rollups."""
+    entidades = {d for d in dimensiones if d in DIMENSIONES_ROLLUP}
+    entidades |= {FILTROS_IDS[f] for f in filtros if FILTROS_IDS[f] in DIMENSIONES_ROLLUP}
+    dimension_rollup = None
+    if rollups_listos and len(entidades) <= 1:
+        # Sin ninguna de las tres, las filas de platform cuentan cada venta una vez (como rollups.VENTAS_POR_ANIO)
+        dimension_rollup = next(iter(entidades), 'platform')
+    return tuple(dimensiones), tuple(sorted(filtros)), anios, bool(top), dimension_rollup
+
+
+sentencias = CacheSentencias()
+
+# Para migraciones.py explicar: la forma más ancha, en vivo y desde los rollups
+_EJEMPLO = {"genre_ids": [1, 2], "platform_ids": [1], "region_ids": [1, 2], "anio_desde": 2000, "anio_hasta": 2010, "top": 20}
+registrar_consulta("/sales/query",
+                   _sql(('genre', 'platform', 'region', 'year'), ('genre_ids', 'platform_ids', 'region_ids'),
+                        ('desde', 'hasta'), True, None)[0],
+                   _EJEMPLO, expandir=('genre_ids', 'platform_ids', 'region_ids'))
+registrar_consulta("rollup:/sales/query",
+                   _sql(('genre', 'region', 'year'), ('genre_ids', 'region_ids'), ('desde', 'hasta'), True, 'genre')[0],
+                   {k: v for k, v in _EJEMPLO.items() if k != "platform_ids"}, expandir=('genre_ids', 'region_ids'))
+
+
+def _dimensiones(group_by):
+    dimensiones = []
+    for valor in group_by:
+        for dim in valor.split(","):
+            dim = dim.strip()
+            if dim not in DIMENSIONES:
+                raise HTTPException(status_code=400,
+                                    detail=f"Unknown dimension: {dim} (expected {', '.join(DIMENSIONES)})")
+            if dim not in dimensiones:
+                dimensiones.append(dim)
+    return dimensiones
+
+
+@router.get("/sales/query", tags=["Consultas"])
+async def query_sales(group_by: List[str] = Query([]),
+                      year_from: Optional[int] = Query(None, ge=1),
+                      year_to: Optional[int] = Query(None, ge=1),
+                      genre_ids: Optional[List[int]] = Query(None),
+                      publisher_ids: Optional[List[int]] = Query(None),
+                      platform_ids: Optional[List[int]] = Query(None),
+                      region_ids: Optional[List[int]] = Query(None),
+                      top: Optional[int] = Query(None, ge=1, le=10000),
+                      formato: str = Query("records", alias="format", pattern=PATRON_FORMATO)):
+    """Ventas totales agrupadas por `group_by` (genre, publisher, platform, region, year; repetido o separado por comas)."""
+    dimensiones = _dimensiones(group_by)
+    if year_from is not None and year_to is not None and year_from > year_to:
+        raise HTTPException(status_code=400, detail="year_from must be <= year_to")
+    ids = {"genre_ids": genre_ids, "publisher_ids": publisher_ids,
+           "platform_ids": platform_ids, "region_ids": region_ids}
+    params = {p: tuple(sorted(set(v))) for p, v in ids.items() if v}
+    anios = tuple(n for n, v in (("desde", year_from), ("hasta", year_to)) if v is not None)
+    if year_from is not None:
+        params["anio_desde"] = year_from
+    if year_to is not None:
+        params["anio_hasta"] = year_to
+    if top:
+        params["top"] = top
+
+    forma = forma_consulta(dimensiones, [p for p in FILTROS_IDS if p in params], anios, top, gestor_rollups.usar())
+    try:
+        sentencia, tablas = sentencias.obtener(forma)
+        resultado = await cache_resultados.obtener_o_calcular(
+            "/sales/query", dict(params, group_by=forma[0], rollup=forma[4]), tablas,
+            lambda: leer_filas(sentencia, {p: list(v) if isinstance(v, tuple) else v for p, v in params.items()}),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return responder(resultado, formato)